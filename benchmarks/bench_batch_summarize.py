@@ -0,0 +1,46 @@
+"""
+Wall-time comparison of one-LLM-call-per-snippet vs batched snippet summarization
+in generate_learning_materials. Runs offline: Serper and the model are replaced by fakes
+with a configurable per-call overhead and per-item generation cost.
+
+    python -m benchmarks.bench_batch_summarize --topics 5 --per-topic 3 --batch-sizes 1,4,8
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('TOPIC_INDEX_DISABLED', '1')
+
+import src.agents.learning_agent as learning_agent
+from benchmarks.fakes import fake_search_batch, install_fake_model, summarize_with_llm_only
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topics', type=int, default=5)
+    parser.add_argument('--per-topic', type=int, default=3)
+    parser.add_argument('--batch-sizes', type=str, default='1,2,4,8')
+    parser.add_argument('--call-overhead', type=float, default=0.05,
+                        help='Simulated fixed cost per LLM call in seconds (spawn, prompt eval)')
+    parser.add_argument('--per-item', type=float, default=0.01,
+                        help='Simulated generation cost per summarized snippet in seconds')
+    args = parser.parse_args()
+
+    summarize_with_llm_only()
+    topics = [f'Topic {i}' for i in range(args.topics)]
+    learning_agent.search_serper_batch = fake_search_batch(args.per_topic)
+    print(f'{"batch_size":>10} {"llm_calls":>10} {"wall_s":>8} {"speedup":>8}')
+    baseline = None
+    for bs in [int(b) for b in args.batch_sizes.split(',') if b.strip()]:
+        calls = install_fake_model(latency=args.call_overhead, per_item=args.per_item)
+        t0 = time.perf_counter()
+        materials = learning_agent.generate_learning_materials(topics, max_per_topic=args.per_topic, summary_batch_size=bs)
+        wall = time.perf_counter() - t0
+        assert len(materials) == args.topics * args.per_topic
+        baseline = baseline or wall
+        print(f'{bs:>10} {calls["n"]:>10} {wall:>8.3f} {baseline / wall:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Question bank (src/tools/question_bank.py): sampling latency with per-learner exclusion at
+large bank sizes, and model calls per quiz when repeat learners take quizzes on the same
+topics with the bank (deficit-only generation) vs without it (a full quiz per request).
+
+    python -m benchmarks.bench_question_bank --bank-size 200000 --learners 20 --rounds 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+
+from benchmarks.fakes import install_fake_model
+from src.agents import quiz_agent
+from src.models.quiz_models import MCQ
+from src.tools.question_bank import QuestionBank
+from src.utils import llm_backends
+
+
+def _mcq(i):
+    return MCQ(question=f'Synthetic question number {i}?', options=['A', 'B', 'C', 'D'], answer_index=i % 4,
+               explanation='Because.', difficulty=('easy', 'medium', 'hard')[i % 3])
+
+
+def _fill(bank, size, topics):
+    per_topic = size // len(topics)
+    for t, topic in enumerate(topics):
+        bank.add(topic, [_mcq(t * per_topic + i) for i in range(per_topic)])
+
+
+def _sampling(bank, topics, learners, n=5, reps=200):
+    rnd = random.Random(0)
+    # every learner has already seen a good part of one topic
+    for learner in learners:
+        seen = bank.sample(topics[0], 300, learner=None)
+        bank.mark_seen(learner, [i for i, _ in seen])
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        bank.sample(rnd.choice(topics), n)
+    plain = 1000 * (time.perf_counter() - t0) / reps
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        bank.sample(topics[0], n, difficulty='hard', learner=rnd.choice(learners))
+    excluded = 1000 * (time.perf_counter() - t0) / reps
+    return plain, excluded
+
+
+def _quizzes(use_bank, topics, learners, rounds, n):
+    calls = {'n': 0}
+    stub = llm_backends._stub_response
+
+    def counting(prompt):
+        calls['n'] += 1
+        return stub(prompt)
+
+    llm_backends._stub_response = counting
+    try:
+        t0 = time.perf_counter()
+        quizzes = 0
+        for _ in range(rounds):
+            for learner in learners:
+                for topic in topics:
+                    quiz_agent.generate_quiz_for_topic(topic, n_questions=n, learner=learner, use_bank=use_bank)
+                    quizzes += 1
+        return quizzes, calls['n'], time.perf_counter() - t0
+    finally:
+        llm_backends._stub_response = stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bank-size', type=int, default=200000)
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=3, help='Quizzes per learner and topic')
+    parser.add_argument('--model-latency', type=float, default=0.01, help='Seconds per fake model call')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as work:
+        os.chdir(work)
+        bank = QuestionBank(os.path.join(work, 'bank.sqlite3'))
+        topics = [f'synthetic topic {i}' for i in range(50)]
+        t0 = time.perf_counter()
+        _fill(bank, args.bank_size, topics)
+        fill_s = time.perf_counter() - t0
+        learners = [f'learner-{i}' for i in range(args.learners)]
+        plain, excluded = _sampling(bank, topics, learners)
+        print(f'bank of {args.bank_size} questions (filled in {fill_s:.1f} s): sample 5 in {plain:.2f} ms, '
+              f'5 hard unseen by a learner in {excluded:.2f} ms')
+        bank.close()
+
+        # runs in a scratch directory, so the fake questions may go into the bank
+        install_fake_model(latency=args.model_latency, cacheable=True)
+        print(f'{"mode":<8}{"quizzes":>8}{"llm_calls":>10}{"wall s":>8}')
+        for name, use_bank in (('fresh', False), ('bank', True)):
+            quizzes, calls, wall = _quizzes(use_bank, ['Python generators', 'SQL joins', 'Git rebase'],
+                                            learners[:5], args.rounds, 5)
+            print(f'{name:<8}{quizzes:>8}{calls:>10}{wall:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
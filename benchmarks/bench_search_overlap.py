@@ -0,0 +1,71 @@
+"""
+Wall time of generate_learning_materials with searching and summarizing overlapped
+(producer/consumer, the current code) vs one after the other (the previous code: all
+searches first, then all summaries), against the fake Serper server and fake model.
+
+    python -m benchmarks.bench_search_overlap --topics 16 --batch-size 4 --search-latency 0.2
+
+With --batch-size 4 and 16 topics the search takes 4 requests; the overlapped run
+should take roughly max(search, summarize) instead of their sum.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import os
+import tempfile
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('TOPIC_INDEX_DISABLED', '1')
+os.environ.setdefault('SERPER_CACHE_DISABLED', '1')
+
+import src.agents.learning_agent as learning_agent
+import src.tools.serper_tool as serper_tool
+from benchmarks.fakes import FakeSerperServer, install_fake_model, summarize_with_llm_only
+from src.utils.fanout import fan_out
+
+
+def _sequential(topics, max_per_topic, summary_batch_size, workers):
+    searched = learning_agent._search_topics(topics, max_per_topic, None)
+    snippets = [r.get('snippet') or '' for res in searched if res.ok for r in res.value]
+    chunks = [snippets[i:i + summary_batch_size] for i in range(0, len(snippets), summary_batch_size)]
+    fan_out(functools.partial(learning_agent._summarize_chunk, summary_batch_size=summary_batch_size),
+            chunks, workers=workers)
+    return len(snippets)
+
+
+def _overlapped(topics, max_per_topic, summary_batch_size, workers):
+    materials = learning_agent.generate_learning_materials(topics, max_per_topic=max_per_topic,
+                                                           summary_batch_size=summary_batch_size, workers=workers)
+    return len(materials)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topics', type=int, default=16)
+    parser.add_argument('--per-topic', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=4, help='Queries per Serper request')
+    parser.add_argument('--summary-batch-size', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1, help='Summarizer workers')
+    parser.add_argument('--search-latency', type=float, default=0.2, help='Seconds per fake Serper request')
+    parser.add_argument('--model-latency', type=float, default=0.05, help='Seconds per fake model call')
+    args = parser.parse_args()
+
+    summarize_with_llm_only()
+    serper_tool.SERPER_BATCH_SIZE = args.batch_size
+    install_fake_model(latency=args.model_latency)
+    print(f'{"mode":<12}{"snippets":>9}{"wall s":>9}')
+    with tempfile.TemporaryDirectory(prefix='bench-') as work, FakeSerperServer(latency=args.search_latency):
+        os.chdir(work)
+        for rep, (name, fn) in enumerate((('sequential', _sequential), ('overlapped', _overlapped))):
+            # fresh topics per mode so nothing is served from a cache
+            topics = [f'Overlap topic {i} [{rep}]' for i in range(args.topics)]
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                n = fn(topics, args.per_topic, args.summary_batch_size, args.workers)
+            print(f'{name:<12}{n:>9}{time.perf_counter() - t0:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
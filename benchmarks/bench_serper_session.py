@@ -0,0 +1,103 @@
+"""
+Connections and per-query latency of search_serper against a local fake Serper server,
+with a dead endpoint (accepts TCP but never answers) listed first - the case where the
+old code paid the full timeout on every query.
+
+    python -m benchmarks.bench_serper_session --queries 20 --timeout 0.5
+
+'legacy' replays the previous behaviour (bare requests.post per query, walking the URL
+list in order); 'pooled' is the current search_serper (keep-alive session, sticky
+endpoint, failing endpoints cooled down); 'batched' sends the same queries through
+search_serper_batch, SERPER_BATCH_SIZE queries per request.
+"""
+import argparse
+import os
+import socket
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('SERPER_CACHE_DISABLED', '1')
+
+import requests
+
+import src.tools.serper_tool as serper_tool
+from benchmarks.fakes import FakeSerperServer
+
+
+def _dead_endpoint():
+    # listening socket that is never accepted from: connects succeed, reads time out
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(64)
+    return sock, f'http://127.0.0.1:{sock.getsockname()[1]}/search'
+
+
+def _legacy_search(query, max_results=5):
+    for url in serper_tool.SERPER_SEARCH_URLS:
+        try:
+            resp = requests.post(url, json={'q': query, 'num': max_results},
+                                 headers={'X-API-KEY': 'bench'}, timeout=serper_tool.SERPER_TIMEOUT)
+            if resp.status_code == 200:
+                return resp.json().get('organic', [])
+        except Exception:
+            pass
+    raise RuntimeError('all endpoints failed')
+
+
+def _pooled_search(query, max_results=5):
+    return serper_tool.search_serper(query, api_key='bench', max_results=max_results)
+
+
+def _batched_search(queries, max_results=5):
+    results = serper_tool.search_serper_batch(queries, api_key='bench', max_results=max_results)
+    assert not any(isinstance(r, Exception) for r in results)
+    return results
+
+
+def _run(name, search, queries, latency, dead_url, batch=False):
+    with FakeSerperServer(latency=latency, extra_urls=[dead_url] if dead_url else []) as server:
+        times = []
+        if batch:
+            t0 = time.perf_counter()
+            search([f'bench query {i}' for i in range(queries)])
+            # spread over the queries so the columns stay comparable
+            times = [(time.perf_counter() - t0) / queries] * queries
+        for i in range(0 if batch else queries):
+            t0 = time.perf_counter()
+            search(f'bench query {i}')
+            times.append(time.perf_counter() - t0)
+        times.sort()
+        return {
+            'mode': name,
+            'requests': server.requests,
+            'connections': server.connections,
+            'mean_ms': 1000 * sum(times) / len(times),
+            'p50_ms': 1000 * times[len(times) // 2],
+            'total_s': sum(times),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.005, help='Fake server time per request in seconds')
+    parser.add_argument('--timeout', type=float, default=0.5, help='Per-request timeout (stands in for the 10 s default)')
+    parser.add_argument('--no-dead-endpoint', dest='dead', action='store_false',
+                        help='Only the healthy endpoint (measures keep-alive alone)')
+    args = parser.parse_args()
+
+    serper_tool.SERPER_TIMEOUT = args.timeout
+    sock, dead_url = _dead_endpoint() if args.dead else (None, None)
+    try:
+        print(f'{"mode":<8}{"requests":>9}{"connections":>12}{"mean ms":>10}{"p50 ms":>9}{"total s":>9}')
+        for name, fn in (('legacy', _legacy_search), ('pooled', _pooled_search), ('batched', _batched_search)):
+            r = _run(name, fn, args.queries, args.latency, dead_url, batch=name == 'batched')
+            print(f'{r["mode"]:<8}{r["requests"]:>9}{r["connections"]:>12}{r["mean_ms"]:>10.1f}{r["p50_ms"]:>9.1f}'
+                  f'{r["total_s"]:>9.2f}')
+    finally:
+        if sock is not None:
+            sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Cost of summarizing search snippets per tier: the extractive summarizer alone, and
+safe_summarize_batch with SUMMARY_TIER=llm vs auto against the fake model (each model
+call sleeps --model-latency seconds, standing in for local inference).
+
+    python -m benchmarks.bench_summary_tier --texts 60 --long 10
+
+With the defaults, auto keeps the 50 one- or two-sentence snippets local and only the
+10 long texts reach the model.
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+
+import src.utils.extractive as extractive
+from benchmarks.fakes import install_fake_model
+from src.utils.llm import safe_summarize_batch
+
+_WORDS = ('python loops functions variables lists data pandas frames numpy arrays plots charts models '
+          'training tests errors files classes objects methods strings values tutorial exercises').split()
+
+
+def _sentence(rnd, words=_WORDS):
+    return ' '.join(rnd.choice(words) for _ in range(rnd.randint(8, 16))).capitalize() + '.'
+
+
+def _texts(n, n_long, seed=0):
+    rnd = random.Random(seed)
+    # Serper snippets: one or two sentences; long texts: a few paragraphs with a wider vocabulary
+    short = [' '.join(_sentence(rnd) for _ in range(rnd.randint(1, 2))) for _ in range(n - n_long)]
+    vocab = _WORDS + [f'term{i}' for i in range(300)]
+    return short + [' '.join(_sentence(rnd, vocab) for _ in range(rnd.randint(15, 30))) for _ in range(n_long)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=60)
+    parser.add_argument('--long', type=int, default=10, help='How many of the texts are long documents')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--model-latency', type=float, default=0.05, help='Seconds per fake model call')
+    args = parser.parse_args()
+
+    texts = _texts(args.texts, args.long)
+    t0 = time.perf_counter()
+    for t in texts:
+        extractive.extractive_summary(t)
+    per_text = (time.perf_counter() - t0) / len(texts)
+    print(f'extractive only: {1e6 * per_text:.0f} us per text')
+
+    install_fake_model(latency=args.model_latency)
+    print(f'{"tier":<8}{"extractive":>11}{"llm":>6}{"wall s":>9}')
+    for tier in ('llm', 'auto'):
+        extractive.SUMMARY_TIER = tier
+        before = extractive.summary_tier_stats()
+        t0 = time.perf_counter()
+        safe_summarize_batch(texts, batch_size=args.batch_size, use_cache=False)
+        wall = time.perf_counter() - t0
+        after = extractive.summary_tier_stats()
+        print(f'{tier:<8}{after["extractive"] - before["extractive"]:>11}{after["llm"] - before["llm"]:>6}{wall:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Scale of the similar-topic index (src/utils/topic_index.py): add throughput, reload time
+and lookup latency at tens of thousands of topics, plus which near-duplicates it reuses.
+
+    python -m benchmarks.bench_topic_index --entries 20000 --queries 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.utils.topic_index import TopicIndex
+
+_SUBJECTS = ('python', 'pandas', 'numpy', 'sql', 'javascript', 'react', 'docker', 'git', 'rust', 'go',
+             'statistics', 'linear algebra', 'machine learning', 'css', 'bash', 'excel', 'spark', 'kafka')
+_ASPECTS = ('data manipulation', 'dataframes', 'joins', 'testing', 'decorators', 'closures', 'hooks',
+            'networking', 'regression', 'indexing', 'performance', 'error handling', 'async io',
+            'packaging', 'plotting', 'window functions', 'generators', 'pointers', 'traits', 'volumes')
+
+_PAIRS = [
+    ('pandas dataframe manipulation', 'Pandas data manipulation'),
+    ('python list', 'Python lists'),
+    ('Intro to SQL joins', 'SQL joins'),
+    ('Python lists', 'Python sets'),
+    ('Linear regression', 'Logistic regression'),
+    ('Python 2 migration', 'Python 3 migration'),
+]
+
+
+def _topic(rnd):
+    return f'{rnd.choice(_SUBJECTS)} {rnd.choice(_ASPECTS)} {rnd.randint(0, 10 ** 6):x}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    materials = [{'title': 'A tutorial', 'url': 'https://example.com/a', 'source': 'example.com', 'type': 'article',
+                  'summary': 'A short summary.', 'estimated_time_minutes': None}]
+    with tempfile.TemporaryDirectory(prefix='bench-') as work:
+        path = os.path.join(work, 'topic_index.sqlite3')
+        index = TopicIndex(path, max_entries=args.entries)
+        t0 = time.perf_counter()
+        for _ in range(args.entries):
+            index.add(_topic(rnd), materials)
+        add_s = time.perf_counter() - t0
+        index.close()
+
+        t0 = time.perf_counter()
+        index = TopicIndex(path, max_entries=args.entries)
+        load_s = time.perf_counter() - t0
+
+        queries = [_topic(rnd) for _ in range(args.queries)]
+        t0 = time.perf_counter()
+        for q in queries:
+            index.nearest([q])
+        single_ms = 1000 * (time.perf_counter() - t0) / len(queries)
+        t0 = time.perf_counter()
+        index.nearest(queries)
+        batch_ms = 1000 * (time.perf_counter() - t0) / len(queries)
+
+        print(f'entries {len(index)}: add {1000 * add_s / args.entries:.2f} ms/topic, reload {load_s:.2f} s, '
+              f'lookup {single_ms:.2f} ms (one at a time) / {batch_ms:.3f} ms (batched) per topic')
+        index.close()
+
+    # each pair on its own: would `query` reuse the materials of `indexed`?
+    for indexed, query in _PAIRS:
+        index = TopicIndex(':memory:')
+        index.add(indexed, materials)
+        match = index.nearest([query])[0]
+        verdict = f'reuses "{match.topic}" ({match.similarity:.2f})' if match else 'searched'
+        print(f'  {query!r:<28} after {indexed!r:<32} {verdict}')
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
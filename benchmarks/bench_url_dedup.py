@@ -0,0 +1,42 @@
+"""
+LLM calls and wall time of generate_learning_materials when overlapping topics get the
+same pages back (under http/https, www, trailing-slash and utm_* variants), with URL
+dedup (the current code) vs one summary per result (the previous code).
+
+    python -m benchmarks.bench_url_dedup --topics 12 --per-topic 5 --pool 20
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('TOPIC_INDEX_DISABLED', '1')
+
+import src.agents.learning_agent as learning_agent
+from benchmarks.fakes import fake_search_batch, install_fake_model, summarize_with_llm_only
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topics', type=int, default=12)
+    parser.add_argument('--per-topic', type=int, default=5)
+    parser.add_argument('--pool', type=int, default=20, help='Distinct pages shared by all topics')
+    parser.add_argument('--model-latency', type=float, default=0.02, help='Seconds per fake model call')
+    args = parser.parse_args()
+
+    summarize_with_llm_only()
+    topics = [f'Topic {i}' for i in range(args.topics)]
+    learning_agent.search_serper_batch = fake_search_batch(args.per_topic, pool_size=args.pool)
+    dedup_key = learning_agent._dedup_key
+    print(f'{"mode":<10}{"materials":>10}{"llm_calls":>10}{"wall_s":>8}')
+    for name, key in (('per-result', lambda r: None), ('dedup', dedup_key)):
+        learning_agent._dedup_key = key
+        calls = install_fake_model(latency=args.model_latency)
+        t0 = time.perf_counter()
+        materials = learning_agent.generate_learning_materials(topics, max_per_topic=args.per_topic)
+        print(f'{name:<10}{len(materials):>10}{calls["n"]:>10}{time.perf_counter() - t0:>8.2f}')
+    learning_agent._dedup_key = dedup_key
+
+
+if __name__ == '__main__':
+    main()
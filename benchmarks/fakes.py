@@ -0,0 +1,201 @@
+"""
+Deterministic stand-ins for the external services, so benchmarks run offline:
+
+- install_fake_model(): registers a 'bench' LLM backend (src/utils/llm_backends.py) with a
+  configurable latency and output shape and makes call_ollama use it
+- FakeSerperServer: a local HTTP server speaking the Serper /search API, which
+  src/tools/serper_tool.py is pointed at for the duration of a `with` block
+- fake_search_batch(): an in-process search_serper_batch, for benchmarks of what happens
+  to the results (dedup, summarizing) rather than of the search itself
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import src.tools.serper_tool as serper_tool
+import src.utils.extractive as extractive
+import src.utils.llm as llm
+from src.utils import llm_backends
+
+SHAPES = ('json', 'prose', 'garbage')
+
+
+def _shaped(prompt: str, shape: str) -> str:
+    answer = llm_backends._stub_response(prompt)
+    if shape == 'json':
+        return answer
+    if shape == 'prose':
+        # what small models often do: chatter around a fenced JSON block
+        return f'Sure! Here is what you asked for:\n\n```json\n{answer}\n```\n\nLet me know if you need more.'
+    if shape == 'garbage':
+        rnd = random.Random(zlib.crc32(prompt.encode('utf-8')))
+        words = ['lorem', 'ipsum', '{', 'dolor', '[', 'sit', 'amet', '"', ':', 'null']
+        return ' '.join(rnd.choice(words) for _ in range(40))
+    raise ValueError(f"Unknown output shape '{shape}'. Allowed: {', '.join(SHAPES)}")
+
+
+def install_fake_model(latency: float = 0.02, shape: str = 'json', name: str = 'bench',
+                       cacheable: bool = False, per_item: float = 0.0) -> Dict[str, int]:
+    """
+    Route every model call to an in-process backend that sleeps `latency` s per call, plus
+    `per_item` s per text of a batched summary prompt (or once for any other prompt).
+    Its answers are kept out of the caches and stores unless cacheable=True.
+    Returns {'n': model calls so far}.
+    """
+    _shaped('', shape)  # validate early
+    calls = {'n': 0}
+    lock = threading.Lock()
+
+    def respond(prompt: str, model: str) -> str:
+        with lock:
+            calls['n'] += 1
+        time.sleep(latency + per_item * max(len(re.findall(r'^### TEXT \d+$', prompt, re.M)), 1))
+        return _shaped(prompt, shape)
+
+    backend = llm_backends.StubBackend(responder=respond, cacheable=cacheable)
+    llm_backends.register_backend(name, lambda: backend, probe=False)
+    llm.OLLAMA_BACKEND = name
+    return calls
+
+
+def summarize_with_llm_only() -> None:
+    """
+    Send every summary to the model (SUMMARY_TIER=llm unless set otherwise), for benchmarks
+    that measure the LLM path and must not have texts taken by the extractive tier.
+    """
+    extractive.SUMMARY_TIER = os.getenv('SUMMARY_TIER', 'llm')
+
+
+_URL_VARIANTS = ('https://www.{}/', 'http://{}', 'https://{}?utm_source=serper&utm_medium=search', 'https://{}#intro')
+
+
+def fake_search_batch(per_topic: int, pool_size: Optional[int] = None, seed: int = 0):
+    """
+    Stand-in for search_serper_batch answering every query with `per_topic` results at once.
+    Without pool_size each query gets pages of its own; with it, all queries draw theirs
+    from one pool of pool_size pages, each listed under a random URL variant (www, http,
+    utm_* parameters, fragment), the way related topics find the same pages.
+    """
+    pages = [f'example.com/guide/{i}' for i in range(pool_size or 0)]
+
+    def search(queries, api_key=None, max_results=5, on_result=None):
+        out = []
+        for i, query in enumerate(queries):
+            n = min(per_topic, max_results)
+            rnd = random.Random(f'{seed}-{query}')
+            if pool_size:
+                found = [(p, rnd.choice(_URL_VARIANTS).format(p)) for p in rnd.sample(pages, min(n, len(pages)))]
+            else:
+                key = zlib.crc32(query.encode('utf-8')) % 100000
+                found = [(f'{query} result {j}', f'https://example.com/{key}/{j}') for j in range(n)]
+            results = [{
+                'title': title,
+                'link': link,
+                # different queries get different snippets for the same page
+                'snippet': f'{title} as seen from {query}. It explains the idea in a sentence.',
+                'source': 'example.com',
+            } for title, link in found]
+            out.append(results)
+            if on_result is not None:
+                on_result(i, results)
+        return out
+    return search
+
+
+class _SerperHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive (every response has a Content-Length)
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes; without this, Nagle + delayed ACK add
+    # ~40 ms to every response on a reused connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+    reject_batches = None
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.server.requests += 1
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+        queries = payload if isinstance(payload, list) else [payload]
+        time.sleep(self.latency)
+        status = 200
+        if isinstance(payload, list) and self.reject_batches is not None:
+            status = self.reject_batches
+            data = json.dumps({'message': 'Expected an object', 'statusCode': status}).encode('utf-8')
+        else:
+            answers = [self._answer(q.get('q', ''), int(q.get('num') or 5)) for q in queries]
+            data = json.dumps(answers if isinstance(payload, list) else answers[0]).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def _answer(query: str, num: int):
+        key = zlib.crc32(query.encode('utf-8')) % 100000
+        return {'organic': [{
+            'title': f'{query} - result {i}' + (' (video)' if i % 3 == 2 else ''),
+            'link': f'https://example.com/{key}/{i}',
+            'snippet': f'{query} explained, part {i}. It covers the basics in a couple of sentences.',
+            'source': 'example.com',
+        } for i in range(num)]}
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSerperServer:
+    """
+    Local Serper look-alike on 127.0.0.1 with `latency` seconds per request. Inside the
+    `with` block src/tools/serper_tool.py only talks to this server (plus `extra_urls`
+    placed in front of it, e.g. a dead endpoint). `connections` counts accepted TCP
+    connections, `requests` answered POSTs. With `reject_batches` set, array bodies are
+    answered with that status and an error object (with 200, an unexpected shape), like
+    an endpoint that takes one query per request.
+    """
+
+    def __init__(self, latency: float = 0.02, extra_urls=(), reject_batches: Optional[int] = None):
+        handler = type('Handler', (_SerperHandler,), {'latency': latency, 'reject_batches': reject_batches})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.requests = 0
+        self.extra_urls = list(extra_urls)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/search'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._saved_urls = None
+
+    def __enter__(self):
+        self._thread.start()
+        self._saved_urls = serper_tool.SERPER_SEARCH_URLS
+        serper_tool.SERPER_SEARCH_URLS = self.extra_urls + [self.url]
+        serper_tool.reset_serper_endpoints()
+        return self
+
+    @property
+    def connections(self) -> int:
+        return self.server.connections
+
+    @property
+    def requests(self) -> int:
+        return self.server.requests
+
+    def __exit__(self, *exc):
+        serper_tool.SERPER_SEARCH_URLS = self._saved_urls
+        serper_tool.reset_serper_endpoints()
+        self.server.shutdown()
+        self.server.server_close()
+        return False
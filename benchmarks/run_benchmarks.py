@@ -0,0 +1,195 @@
+"""
+Offline benchmark suite: throughput and p50/p95 latency of the main entry points across
+topic counts and model output shapes, using the fakes in benchmarks/fakes.py (no Ollama,
+no network). Results are written as JSON so runs can be compared between commits.
+
+    python -m benchmarks.run_benchmarks --topics 1,4,16 --shapes json,prose,garbage
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<older>.json
+
+Everything runs inside a temporary working directory, so generated files, caches and
+checkpoints never touch data/.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault('LLM_CACHE_DISABLED', '1')
+os.environ.setdefault('TOPIC_INDEX_DISABLED', '1')
+os.environ.setdefault('QUESTION_BANK_DISABLED', '1')
+os.environ.setdefault('SERPER_CACHE_DISABLED', '1')
+
+from benchmarks.fakes import SHAPES, FakeSerperServer, install_fake_model
+from src.agents.learning_agent import generate_learning_materials
+from src.agents.project_agent import generate_project_ideas
+from src.agents.quiz_agent import generate_quiz_for_topic
+from src.models.project_models import ProjectIdea
+from src.pipeline.sequential_pipeline import run_pipeline
+from src.tools.project_template import create_project_template
+from src.utils.llm_policy import reset_policies
+
+BENCHES = ('run_pipeline', 'generate_learning_materials', 'generate_quiz_for_topic',
+           'generate_project_ideas', 'create_project_template')
+
+
+def _percentile(data, q):
+    data = sorted(data)
+    return data[min(len(data) - 1, max(0, math.ceil(q / 100.0 * len(data)) - 1))]
+
+
+def _topics(n, tag):
+    # unique per repetition so no cache (LLM, project file cache, checkpoints) is ever hit
+    return [f'Bench topic {i} [{tag}]' for i in range(n)]
+
+
+def _project(i):
+    return ProjectIdea(title=f'Bench project {i}', description='A benchmark project.', difficulty='beginner',
+                       estimated_hours=4, steps=['Plan', 'Build', 'Review'], required_skills=['python'])
+
+
+def _units(bench, topics, tag):
+    """Callables whose individual latencies are measured for one repetition."""
+    if bench == 'run_pipeline':
+        return [lambda: run_pipeline(topics, checkpoint_path=None, max_per_topic=3)]
+    if bench == 'generate_learning_materials':
+        return [lambda: generate_learning_materials(topics, max_per_topic=3)]
+    if bench == 'generate_quiz_for_topic':
+        return [lambda t=t: generate_quiz_for_topic(t, n_questions=5) for t in topics]
+    if bench == 'generate_project_ideas':
+        return [lambda: generate_project_ideas(topics, level='beginner', n=3, use_cache=False)]
+    if bench == 'create_project_template':
+        return [lambda i=i: create_project_template(_project(f'{tag}-{i}'), base_dir='data/generated_projects')
+                for i in range(len(topics))]
+    raise ValueError(f'Unknown benchmark {bench}')
+
+
+def run_case(bench, n_topics, shape, reps, quiet=True):
+    latencies = []
+    total = 0.0
+    for rep in range(reps):
+        tag = f'{shape}-{rep}'
+        units = _units(bench, _topics(n_topics, tag), tag)
+        t0 = time.perf_counter()
+        for unit in units:
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                unit()
+            latencies.append(time.perf_counter() - t)
+        total += time.perf_counter() - t0
+    return {
+        'bench': bench,
+        'shape': shape,
+        'topics': n_topics,
+        'reps': reps,
+        'calls': len(latencies),
+        'p50_s': round(_percentile(latencies, 50), 4),
+        'p95_s': round(_percentile(latencies, 95), 4),
+        'mean_s': round(sum(latencies) / len(latencies), 4),
+        'topics_per_s': round(n_topics * reps / total, 2) if total > 0 else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _key(r):
+    return r['bench'], r['shape'], r['topics']
+
+
+def compare(old_path, results, threshold):
+    """Print p50 ratios against an earlier results file; returns the number of regressions."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = {_key(r): r for r in json.load(f)['results']}
+    print(f'\nCompared with {old_path} (ratio = new p50 / old p50; > {threshold:.2f} is a regression)')
+    regressions = 0
+    for r in results:
+        o = old.get(_key(r))
+        if not o or not o['p50_s']:
+            continue
+        ratio = r['p50_s'] / o['p50_s']
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f'{r["bench"]:<28}{r["shape"]:<9}{r["topics"]:>4}  {o["p50_s"]:>8.4f} -> {r["p50_s"]:>8.4f}  {ratio:>5.2f}x{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--benches', type=str, default=','.join(BENCHES))
+    parser.add_argument('--topics', type=str, default='1,4,16', help='Comma separated topic counts')
+    parser.add_argument('--shapes', type=str, default='json', help=f'Model output shapes: {", ".join(SHAPES)}')
+    parser.add_argument('--reps', type=int, default=3)
+    parser.add_argument('--model-latency', type=float, default=0.02, help='Seconds per fake model call')
+    parser.add_argument('--search-latency', type=float, default=0.02, help='Seconds per fake Serper request')
+    parser.add_argument('--out', type=str, default=None,
+                        help='Results file (default benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', type=str, default=None, help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2, help='p50 ratio counted as a regression')
+    parser.add_argument('--verbose', action='store_true', help='Show the pipeline output')
+    args = parser.parse_args()
+
+    benches = [b.strip() for b in args.benches.split(',') if b.strip()]
+    counts = [int(n) for n in args.topics.split(',') if n.strip()]
+    shapes = [s.strip() for s in args.shapes.split(',') if s.strip()]
+    commit = _git_commit()
+    out = args.out or str(ROOT / 'benchmarks' / 'results' / f'{time.strftime("%Y%m%d-%H%M%S")}-{commit or "nogit"}.json')
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    results = []
+    print(f'{"bench":<28}{"shape":<9}{"topics":>6}{"calls":>7}{"p50 s":>9}{"p95 s":>9}{"topics/s":>10}')
+    with tempfile.TemporaryDirectory(prefix='bench-') as work:
+        cwd = os.getcwd()
+        os.chdir(work)
+        try:
+            with FakeSerperServer(latency=args.search_latency):
+                for shape in shapes:
+                    install_fake_model(latency=args.model_latency, shape=shape)
+                    for bench in benches:
+                        for n in counts:
+                            # breaker/latency state from a previous shape must not leak into this one
+                            reset_policies()
+                            r = run_case(bench, n, shape, args.reps, quiet=not args.verbose)
+                            results.append(r)
+                            print(f'{bench:<28}{shape:<9}{n:>6}{r["calls"]:>7}{r["p50_s"]:>9.4f}{r["p95_s"]:>9.4f}'
+                                  f'{r["topics_per_s"] or 0:>10.2f}')
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults written to {out}')
+
+    if compare_path and compare(compare_path, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,277 @@
-from src.tools.serper_tool import search_serper
-from src.utils.llm import safe_summarize
+from src.tools.serper_tool import search_serper_batch
+from src.utils.llm import FallbackSummary, answers_cacheable, safe_summarize_batch
+from src.utils.fanout import FanOutResult, stream_fan_out
+from src.utils.topic_index import TopicIndex, get_topic_index
+from src.utils.tracing import count, span
+from src.utils.urls import canonical_url
 from src.models.learning_models import LearningMaterial
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
+import functools
 import os
+import threading
 
-def generate_learning_materials(topics: List[str], max_per_topic: int = 3, serper_key: str = None) -> List[LearningMaterial]:
-    out = []
-    for topic in topics:
-        query = f"{topic} tutorial tutorial video exercises"
-        results = search_serper(query, api_key=serper_key, max_results=max_per_topic)
-        for r in results:
-            summary = None
-            # try summarizing the snippet via local LLM (best-effort)
-            snippet = r.get('snippet') or ''
+class FallbackMaterials(list):
+    """
+    Materials of a topic where some summaries fell back to the raw snippet because the
+    model failed. They are returned as usual but not indexed or checkpointed.
+    """
+
+def _search_query(topic: str) -> str:
+    return f"{topic} tutorial tutorial video exercises"
+
+def _topic_result(topic: str, answer) -> FanOutResult:
+    if isinstance(answer, Exception):
+        return FanOutResult(topic, False, None, answer)
+    return FanOutResult(topic, True, answer)
+
+def _search_topics(topics: List[str], max_per_topic: int, serper_key: Optional[str],
+                   on_result: Optional[Callable[[FanOutResult], None]] = None) -> List[FanOutResult]:
+    """
+    One result per topic, searched with a few multi-query Serper requests instead of one
+    per topic. on_result gets each topic's result as soon as its request has answered.
+    """
+    with span('materials.search', topics=len(topics)) as sp:
+        callback = None
+        if on_result is not None:
+            callback = lambda i, answer: on_result(_topic_result(topics[i], answer))
+        answers = search_serper_batch([_search_query(t) for t in topics], api_key=serper_key,
+                                      max_results=max_per_topic, on_result=callback)
+        out = [_topic_result(t, a) for t, a in zip(topics, answers)]
+        sp.set(results=sum(len(r.value) for r in out if r.ok), failed=sum(not r.ok for r in out))
+        return out
+
+def _summarize_chunk(snippets: List[str], summary_batch_size: int) -> List[str]:
+    with span('materials.summarize', snippets=len(snippets), snippet_chars=sum(len(s) for s in snippets)):
+        return safe_summarize_batch(snippets, batch_size=summary_batch_size)
+
+def _summarize_slots(chunk: Tuple[int, List[str]], summary_batch_size: int) -> List[str]:
+    # chunk = (first summary slot, snippets); module level so process pools can pickle it
+    return _summarize_chunk(chunk[1], summary_batch_size)
+
+def generate_learning_materials(
+    topics: List[str],
+    max_per_topic: int = 3,
+    serper_key: str = None,
+    summary_batch_size: int = 1,
+    workers: Optional[int] = None,
+    pool: Optional[str] = None,
+    reuse_similar: bool = True,
+) -> List[LearningMaterial]:
+    """Flat list of materials for all topics; see generate_learning_materials_by_topic."""
+    by_topic = generate_learning_materials_by_topic(topics, max_per_topic=max_per_topic, serper_key=serper_key,
+                                                    summary_batch_size=summary_batch_size, workers=workers, pool=pool,
+                                                    reuse_similar=reuse_similar)
+    return [m for topic in dict.fromkeys(topics) for m in by_topic.get(topic, [])]
+
+def generate_learning_materials_by_topic(
+    topics: List[str],
+    max_per_topic: int = 3,
+    serper_key: str = None,
+    summary_batch_size: int = 1,
+    workers: Optional[int] = None,
+    pool: Optional[str] = None,
+    reuse_similar: bool = True,
+    on_topic: Optional[Callable[[str, List[LearningMaterial]], None]] = None,
+) -> Dict[str, List[LearningMaterial]]:
+    """
+    Search each topic and summarize every result snippet with the local LLM.
+    Returns {topic: materials} for every topic whose search succeeded.
+    With reuse_similar, a topic close enough to one produced earlier (e.g. 'Pandas data
+    manipulation' after 'pandas dataframe manipulation') reuses its materials instead of
+    being searched, and new materials are indexed for later runs (see
+    src/utils/topic_index.py; TOPIC_INDEX_DISABLED=1 turns this off everywhere).
+    summary_batch_size > 1 packs that many snippets into one LLM prompt
+    (see safe_summarize_batch); 1 keeps one call per snippet.
+
+    Searching and summarizing overlap: all topics are searched together (see
+    search_serper_batch) and snippets are queued for summarization as each request
+    answers, so the model starts on the first topics while later ones are still being
+    searched. `workers` summarizer threads (at least one) drain the queue, or feed a
+    process pool with pool='process' (see stream_fan_out in src/utils/fanout.py).
+    A page returned for several topics (compared by canonical URL, see
+    src/utils/urls.py) is summarized once and every topic's copy gets that summary.
+    Results keep topic order. A topic whose search fails is skipped; if every topic
+    fails (and none was reused) the first error is raised so callers can retry. A topic
+    with fallback summaries gets a FallbackMaterials list, which is not indexed.
+
+    on_topic(topic, materials), if given, receives each topic as soon as its last summary
+    is ready (reused topics first, then completion order; calls are serialized) and the
+    returned dict stays empty, so a caller writing the materials out does not hold every
+    topic in memory. Only one summary string per distinct page is kept for the dedup.
+    """
+    # canned (stub backend) summaries must never be reused by a run against the real model
+    index = get_topic_index() if reuse_similar and answers_cacheable() else None
+    reused = _reuse_similar(index, topics)
+    out = {}
+
+    def deliver(topic: str, materials: List[LearningMaterial]) -> None:
+        if on_topic is not None:
+            on_topic(topic, materials)
+        else:
+            out[topic] = materials
+
+    for topic, materials in reused.items():
+        deliver(topic, materials)
+    fresh = [t for t in dict.fromkeys(topics) if t not in reused]
+    if fresh:
+        def searched(topic: str, materials: List[LearningMaterial]) -> None:
+            _index_materials(index, {topic: materials})
+            deliver(topic, materials)
+
+        try:
+            _search_and_summarize(fresh, max_per_topic, serper_key, summary_batch_size, workers, pool, searched)
+        except Exception:
+            # the failed topics were reported; still return what could be reused
+            if not reused:
+                raise
+    return {t: out[t] for t in dict.fromkeys(topics) if t in out}
+
+def _reuse_similar(index: Optional[TopicIndex], topics: List[str]) -> Dict[str, List[LearningMaterial]]:
+    if index is None:
+        return {}
+    unique = list(dict.fromkeys(topics))
+    with span('materials.reuse', topics=len(unique)) as sp:
+        try:
+            matches = index.nearest(unique)
+        except Exception as e:
+            # the index is best-effort
+            print('  - Topic index lookup failed:', e)
+            return {}
+        reused = {}
+        for topic, match in zip(unique, matches):
+            if match is None:
+                continue
             try:
-                if snippet:
-                    summary = safe_summarize(snippet)
-            except Exception as e:
-                summary = None
-            mat = LearningMaterial(
-                title=r.get('title') or topic,
-                url=r.get('link'),
-                source=r.get('source'),
-                type='article' if 'video' not in (r.get('title') or '').lower() else 'video',
-                summary=summary,
-                estimated_time_minutes=None
-            )
-            out.append(mat)
+                reused[topic] = [LearningMaterial(**m) for m in match.materials]
+            except Exception:
+                continue
+            if match.topic != topic:
+                print(f'  - Reusing materials of "{match.topic}" for "{topic}" (similarity {match.similarity:.2f})')
+        sp.set(reused=len(reused))
+        if reused:
+            count('materials.reused_topics', len(reused))
+        return reused
+
+def _index_materials(index: Optional[TopicIndex], by_topic: Dict[str, List[LearningMaterial]]) -> None:
+    if index is None:
+        return
+    for topic, materials in by_topic.items():
+        if not materials or isinstance(materials, FallbackMaterials):
+            continue
+        try:
+            index.add(topic, [m.model_dump(mode='json') for m in materials])
+        except Exception as e:
+            print(f'  - Could not index materials for "{topic}":', e)
+
+def _dedup_key(r: Dict) -> Optional[str]:
+    # the same page found under several queries (or with tracking params) is summarized once
+    url = canonical_url(r.get('link'))
+    if url:
+        return url
+    snippet = ' '.join((r.get('snippet') or '').lower().split())
+    return f'snippet:{snippet}' if snippet else None
+
+def _search_and_summarize(topics: List[str], max_per_topic: int, serper_key: Optional[str],
+                          summary_batch_size: int, workers: Optional[int], pool: Optional[str],
+                          on_topic: Callable[[str, List[LearningMaterial]], None]) -> None:
+    """
+    Search all topics together, summarize each distinct page once, and call
+    on_topic(topic, materials) for every topic whose search succeeded as soon as all of its
+    summaries are ready.
+    """
+    chunk = max(1, summary_batch_size)
+    lock = threading.Lock()     # serializes the state below and the on_topic calls
+    summaries: Dict[int, str] = {}          # summary slot (one per distinct page) -> summary
+    waiting: Dict[int, List[str]] = {}      # slot not summarized yet -> topics waiting for it
+    open_topics: Dict[str, Tuple[List[Tuple[Dict, int]], set]] = {}   # topic -> (results with slots, missing slots)
+    searched = []
+
+    def finish(topic: str) -> None:
+        rows, _ = open_topics.pop(topic)
+        on_topic(topic, _to_materials(topic, rows, summaries))
+
+    def produce(emit):
+        # each chunk of snippets is one unit of work for the summarizers
+        snippets = []
+        unique = {}     # dedup key -> summary slot
+        emitted = [0]   # slots handed to the summarizers so far
+        results = [0]
+
+        def flush(force: bool = False) -> None:
+            while len(snippets) >= chunk or (force and snippets):
+                part = snippets[:chunk]
+                del snippets[:chunk]
+                emit((emitted[0], part))
+                emitted[0] += len(part)
+
+        def on_search(res: FanOutResult):
+            searched.append(res)
+            if not res.ok:
+                return
+            rows = []
+            seen = set()    # a topic lists each page once
+            for r in res.value:
+                # results without a usable link or snippet are never merged
+                key = _dedup_key(r) or ('result', results[0])
+                results[0] += 1
+                if key in seen:
+                    continue
+                seen.add(key)
+                slot = unique.get(key)
+                if slot is None:
+                    slot = unique[key] = len(unique)
+                    snippets.append(r.get('snippet') or '')
+                rows.append((r, slot))
+            with lock:
+                missing = {slot for _, slot in rows if slot not in summaries}
+                open_topics[res.item] = (rows, missing)
+                for slot in missing:
+                    waiting.setdefault(slot, []).append(res.item)
+                if not missing:
+                    finish(res.item)
+            # queued only now, so no summary can arrive before its topic waits for it
+            flush()
+
+        _search_topics(topics, max_per_topic, serper_key, on_result=on_search)
+        flush(force=True)
+        if len(unique) < results[0]:
+            count('materials.duplicate_results', results[0] - len(unique))
+
+    def on_summaries(res: FanOutResult):
+        first, snippets = res.item
+        # safe_summarize_batch does not raise; keep the raw snippets if a worker died
+        values = res.value if res.ok else [FallbackSummary(s) for s in snippets]
+        with lock:
+            for slot, summary in enumerate(values, first):
+                summaries[slot] = summary
+                for topic in waiting.pop(slot, ()):
+                    missing = open_topics[topic][1]
+                    missing.discard(slot)
+                    if not missing:
+                        finish(topic)
+
+    # summarize all snippets across topics (best-effort, falls back to the snippet itself)
+    stream_fan_out(produce, functools.partial(_summarize_slots, summary_batch_size=summary_batch_size),
+                   workers=workers, mode=pool, on_result=on_summaries)
+    failures = [res for res in searched if not res.ok]
+    for res in failures:
+        print(f'  - Search failed for topic "{res.item}":', res.error)
+    if failures and len(failures) == len(searched):
+        raise failures[0].error
+
+def _to_materials(topic: str, rows: List[Tuple[Dict, int]], summaries: Dict[int, str]) -> List[LearningMaterial]:
+    out = []
+    for r, slot in rows:
+        # every copy of a page shares the one summary
+        summary = summaries[slot]
+        if isinstance(summary, FallbackSummary) and not isinstance(out, FallbackMaterials):
+            out = FallbackMaterials(out)
+        out.append(LearningMaterial(
+            title=r.get('title') or topic,
+            url=r.get('link'),
+            source=r.get('source'),
+            type='article' if 'video' not in (r.get('title') or '').lower() else 'video',
+            summary=summary or None,
+            estimated_time_minutes=None
+        ))
     return out
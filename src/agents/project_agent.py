@@ -2,11 +2,13 @@
 from typing import List, Optional
 import json
 import os
-import time
 import hashlib
 
-from src.tools.project_suggester import suggest_projects
+from src.tools.project_suggester import FallbackProjects, suggest_projects
+from src.utils.llm import answers_cacheable
 from src.models.project_models import ProjectIdea
+from src.utils.retry import call_with_retry
+from src.utils.tracing import current_span, span
 
 # Allowed expertise levels
 _ALLOWED_LEVELS = {"beginner", "intermediate", "advanced"}
@@ -72,47 +74,56 @@ def generate_project_ideas(topics: List[str], level: str = "beginner", n: int =
     - use_cache: whether to use local cache to avoid repeated LLM calls
     - model: model name passed to the underlying suggester (keeps backward compatibility)
 
-    Returns a list of ProjectIdea Pydantic models.
+    Returns a list of ProjectIdea Pydantic models. When the model could not provide ideas
+    this is a FallbackProjects list of placeholders, which is never cached.
     """
     level = _validate_level(level)
+    with span('projects.generate', topics=len(topics), level=level, n=n):
+        return _generate_project_ideas(topics, level, n, use_cache, model)
+
+def _generate_project_ideas(topics: List[str], level: str, n: int, use_cache: bool, model: str) -> List[ProjectIdea]:
     cache_path = _cache_key(topics, level, n)
+    # ideas from a stand-in backend (stub) are never cached
+    use_cache = use_cache and answers_cacheable()
 
     # Try cache first
     if use_cache:
         cached = _read_cache(cache_path)
         if cached:
+            current_span().set(cache_hit=1)
             return _to_project_models(cached)
 
-    # Call the suggestor with a small retry loop
-    last_exc = None
-    attempts = 2
-    for attempt in range(attempts):
-        try:
-            # suggest_projects returns List[ProjectIdea] in your earlier implementation,
-            # but it may also return Pydantic models or dicts depending on implementation.
-            raw = suggest_projects(topics, level=level, n=n, model=model)
-            # Normalize to list of dicts
-            normalized = []
-            for item in raw:
-                # If it's already a ProjectIdea model, use model_dump
-                try:
-                    if hasattr(item, "model_dump"):
-                        normalized.append(item.model_dump(mode="json"))
-                    elif isinstance(item, dict):
-                        normalized.append(item)
-                    else:
-                        # fallback: try to convert via __dict__
-                        normalized.append(getattr(item, "__dict__", dict(item)))
-                except Exception:
-                    # last-ditch attempt: convert to string
-                    normalized.append({"title": str(item)})
-            # write cache (best-effort)
-            if use_cache:
-                _write_cache(cache_path, normalized)
-            # convert to ProjectIdea models and return
-            return _to_project_models(normalized)
-        except Exception as e:
-            last_exc = e
-            time.sleep(0.5 + attempt * 0.5)
-    # All attempts failed: raise last exception for caller to handle
-    raise RuntimeError("Failed to generate project ideas") from last_exc
+    def _attempt() -> List[ProjectIdea]:
+        # suggest_projects returns List[ProjectIdea] in your earlier implementation,
+        # but it may also return Pydantic models or dicts depending on implementation.
+        raw = suggest_projects(topics, level=level, n=n, model=model)
+        # Normalize to list of dicts
+        normalized = []
+        for item in raw:
+            # If it's already a ProjectIdea model, use model_dump
+            try:
+                if hasattr(item, "model_dump"):
+                    normalized.append(item.model_dump(mode="json"))
+                elif isinstance(item, dict):
+                    normalized.append(item)
+                else:
+                    # fallback: try to convert via __dict__
+                    normalized.append(getattr(item, "__dict__", dict(item)))
+            except Exception:
+                # last-ditch attempt: convert to string
+                normalized.append({"title": str(item)})
+        if isinstance(raw, FallbackProjects):
+            # placeholders: keep them out of the cache so the next call asks the model again
+            return FallbackProjects(_to_project_models(normalized))
+        # write cache (best-effort)
+        if use_cache:
+            _write_cache(cache_path, normalized)
+        # convert to ProjectIdea models and return
+        return _to_project_models(normalized)
+
+    # Retries share the run's backoff policy, retry budget and deadline (src/utils/retry.py)
+    try:
+        return call_with_retry(_attempt, attempts=2)
+    except Exception as e:
+        # All attempts failed: raise for caller to handle
+        raise RuntimeError("Failed to generate project ideas") from e
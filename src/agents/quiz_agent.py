@@ -1,59 +1,198 @@
 # Placeholder
-from typing import List
-from src.models.quiz_models import Quiz, MCQ
-from src.utils.llm import call_ollama
-import json
+from typing import Iterator, List, Optional, Sequence, Tuple
+from src.models.quiz_models import Difficulty, Quiz, MCQ
+from src.tools.question_bank import QuestionBank, get_question_bank
+from src.utils.llm import CircuitOpenError, DeadlineExceeded, answers_cacheable, call_ollama_async, stream_ollama
+from src.utils.json_stream import iter_json_array
+from src.utils.tracing import count, span
 
-def _build_prompt_for_quiz(topic: str, n_questions: int = 5):
+def _build_prompt_for_quiz(topic: str, n_questions: int = 5, difficulty: Optional[str] = None,
+                           avoid: Sequence[str] = ()):
+    if difficulty:
+        level = f"- Make every question {difficulty} difficulty, and keep questions clear and concise.\n"
+    else:
+        level = "- Make a mix of difficulties, and keep questions clear and concise.\n"
+    known = ""
+    if avoid:
+        known = "- Do not repeat or rephrase any of these existing questions:\n" + "".join(f"* {q}\n" for q in avoid)
     return (
         f"""You are an educational assistant. Create {n_questions} multiple-choice questions (MCQ) on the following topic."""
         f"Topic: {topic}\n\n"
         "Requirements:\n"
         "- Return output as a JSON array of objects with fields: question, options (array of 4), answer_index (0-3), explanation (short), difficulty (easy|medium|hard)\n"
-        "- Make a mix of difficulties, and keep questions clear and concise.\n\n"
+        f"{level}{known}\n"
         "Provide only the JSON array as the model output."
     )
 
-def generate_quiz_for_topic(topic: str, n_questions: int = 5, model: str = 'llama3.2:3b') -> Quiz:
-    prompt = _build_prompt_for_quiz(topic, n_questions)
-    resp = call_ollama(prompt, model=model)
-    # Attempt to parse JSON from model output
-    arr = None
+def _to_mcq(item) -> Optional[MCQ]:
     try:
-        arr = json.loads(resp)
+        return MCQ(
+            question=item.get('question',''),
+            options=item.get('options',[]),
+            answer_index=int(item.get('answer_index',0)),
+            explanation=item.get('explanation',''),
+            difficulty=item.get('difficulty','medium')
+        )
     except Exception:
-        # Try to locate first JSON substring
-        import re
-        m = re.search(r"\[\s*\{.*\}\s*\]", resp, re.S)
-        if m:
-            try:
-                arr = json.loads(m.group(0))
-            except Exception:
-                arr = None
-    if not arr:
-        # fallback: create simple placeholder questions
-        arr = []
-        for i in range(n_questions):
-            arr.append({
-                'question': f'What is a key concept of {topic}? (placeholder {i+1})',
-                'options': ['Option A','Option B','Option C','Option D'],
-                'answer_index': 0,
-                'explanation': 'Placeholder explanation',
-                'difficulty': 'easy' if i<2 else 'medium'
-            })
-    # Build MCQ objects
-    mcqs = []
-    for item in arr:
-        try:
-            mcq = MCQ(
-                question=item.get('question',''),
-                options=item.get('options',[]),
-                answer_index=int(item.get('answer_index',0)),
-                explanation=item.get('explanation',''),
-                difficulty=item.get('difficulty','medium')
-            )
-            mcqs.append(mcq)
-        except Exception:
+        return None
+
+def _placeholder_questions(topic: str, n_questions: int) -> List[MCQ]:
+    arr = []
+    for i in range(n_questions):
+        arr.append(MCQ(
+            question=f'What is a key concept of {topic}? (placeholder {i+1})',
+            options=['Option A','Option B','Option C','Option D'],
+            answer_index=0,
+            explanation='Placeholder explanation',
+            difficulty='easy' if i<2 else 'medium'
+        ))
+    return arr
+
+def _iter_mcqs(items, n_questions: int) -> Iterator[MCQ]:
+    produced = 0
+    for item in items:
+        mcq = _to_mcq(item) if isinstance(item, dict) else None
+        if mcq is None:
             continue
-    quiz = Quiz(topic=topic, questions=mcqs)
-    return quiz
+        yield mcq
+        produced += 1
+        if produced >= n_questions:
+            return
+
+class FallbackQuiz(Quiz):
+    """
+    Quiz made of placeholder questions, or shorter than asked, because the model was
+    unavailable or out of time. Callers must not checkpoint it, so it is generated again.
+    """
+
+def _build_quiz(topic: str, mcqs: List[MCQ], n_questions: int) -> Quiz:
+    if not mcqs:
+        # fallback: create simple placeholder questions
+        return FallbackQuiz(topic=topic, questions=_placeholder_questions(topic, n_questions))
+    if len(mcqs) < n_questions:
+        return FallbackQuiz(topic=topic, questions=mcqs)
+    return Quiz(topic=topic, questions=mcqs)
+
+def stream_quiz_questions(topic: str, n_questions: int = 5, model: str = 'llama3.2:3b',
+                          difficulty: Optional[str] = None, avoid: Sequence[str] = (),
+                          use_cache: bool = True) -> Iterator[MCQ]:
+    """
+    Yield validated MCQ objects as soon as each array element is complete in the model output.
+    Generation is stopped once the JSON array closes or n_questions have been produced,
+    so trailing prose from small models is never waited for.
+    Malformed elements are skipped; no placeholders are produced here.
+    difficulty asks for (and labels) questions of one level; avoid lists questions the
+    model should not repeat.
+    """
+    prompt = _build_prompt_for_quiz(topic, n_questions, difficulty, avoid)
+    chunks = stream_ollama(prompt, model=model, use_cache=use_cache, cache_partial=True, task='quiz')
+    try:
+        for mcq in _iter_mcqs(iter_json_array(chunks), n_questions):
+            yield mcq.model_copy(update={'difficulty': difficulty}) if difficulty else mcq
+    finally:
+        chunks.close()
+
+def _from_bank(bank: Optional[QuestionBank], topic: str, n_questions: int, difficulty: Optional[str],
+               learner: Optional[str]) -> Tuple[List[Tuple[int, MCQ]], List[str]]:
+    """Questions sampled from the bank, and the questions the model should not repeat."""
+    if bank is None:
+        return [], []
+    try:
+        picked = bank.sample(topic, n_questions, difficulty=difficulty, learner=learner)
+        avoid = [m.question for _, m in picked]
+        if len(picked) < n_questions:
+            avoid += [q for q in bank.known_questions(topic, learner=learner) if q not in avoid]
+        return picked, avoid
+    except Exception as e:
+        # the bank is best-effort: generate everything
+        print(f'  - Question bank lookup failed for "{topic}":', e)
+        return [], []
+
+def _add_to_bank(bank: Optional[QuestionBank], topic: str, picked: List[Tuple[int, MCQ]], new: List[MCQ],
+                 learner: Optional[str]) -> List[Tuple[Optional[int], MCQ]]:
+    """
+    Store generated questions and return the ones usable in this quiz: a question the bank
+    already had is dropped if it is in the quiz already or the learner has seen it.
+    """
+    if bank is None or not new:
+        return [(None, m) for m in new]
+    try:
+        ids = bank.add(topic, new)
+        taken = {i for i, _ in picked} | bank.seen_ids(learner, ids)
+    except Exception as e:
+        print(f'  - Could not store questions for "{topic}":', e)
+        return [(None, m) for m in new]
+    out = []
+    for i, m in zip(ids, new):
+        if i not in taken:
+            taken.add(i)
+            out.append((i, m))
+    return out
+
+def _mark_seen(bank: Optional[QuestionBank], learner: Optional[str], questions: List[Tuple[Optional[int], MCQ]]) -> None:
+    if bank is None or not learner:
+        return
+    try:
+        bank.mark_seen(learner, [i for i, _ in questions if i is not None])
+    except Exception as e:
+        print(f'  - Could not record seen questions for learner "{learner}":', e)
+
+def _finish_quiz(sp, bank: Optional[QuestionBank], topic: str, n_questions: int, picked: List[Tuple[int, MCQ]],
+                 new: List[MCQ], learner: Optional[str]) -> Quiz:
+    """Bank the generated questions and build the quiz from them and the ones picked from the bank."""
+    questions: List[Tuple[Optional[int], MCQ]] = list(picked) + _add_to_bank(bank, topic, picked, new, learner)
+    _mark_seen(bank, learner, questions)
+    mcqs = [m for _, m in questions]
+    sp.set(questions=len(mcqs), from_bank=len(picked), generated=len(mcqs) - len(picked))
+    if picked:
+        count('quiz.from_bank', len(picked))
+    if not mcqs:
+        sp.set(fallback=1)
+        count('fallback.quiz')
+    return _build_quiz(topic, mcqs, n_questions)
+
+def generate_quiz_for_topic(topic: str, n_questions: int = 5, model: str = 'llama3.2:3b',
+                            difficulty: Optional[Difficulty] = None, learner: Optional[str] = None,
+                            use_bank: bool = True) -> Quiz:
+    """
+    Quiz of n_questions on the topic. Questions are sampled from the persistent question bank
+    first (see src/tools/question_bank.py; for a learner only questions they have not seen);
+    the model is asked only for the deficit and its questions are added to the bank.
+    difficulty restricts the quiz to one level. use_bank=False (or QUESTION_BANK_DISABLED=1,
+    or a stub backend whose questions must not be banked) always generates the full quiz.
+    Returns a FallbackQuiz if fewer than n_questions could be served or generated (made of
+    placeholder questions when there were none).
+    """
+    with span('quiz.generate', topic=topic, n_questions=n_questions) as sp:
+        bank = get_question_bank() if use_bank and answers_cacheable() else None
+        picked, avoid = _from_bank(bank, topic, n_questions, difficulty, learner)
+        deficit = n_questions - len(picked)
+        new: List[MCQ] = []
+        if deficit > 0:
+            try:
+                # the bank keeps every question, so only go past the response cache when topping it up
+                new = list(stream_quiz_questions(topic, n_questions=deficit, model=model, difficulty=difficulty,
+                                                 avoid=avoid, use_cache=bank is None))
+            except (CircuitOpenError, DeadlineExceeded):
+                # model is known to be unhealthy or the run is out of time: use what the bank had
+                pass
+        return _finish_quiz(sp, bank, topic, n_questions, picked, new, learner)
+
+async def generate_quiz_for_topic_async(topic: str, n_questions: int = 5, model: str = 'llama3.2:3b',
+                                        difficulty: Optional[Difficulty] = None, learner: Optional[str] = None,
+                                        use_bank: bool = True) -> Quiz:
+    """Async counterpart of generate_quiz_for_topic; concurrency is capped by call_ollama_async."""
+    with span('quiz.generate', topic=topic, n_questions=n_questions) as sp:
+        bank = get_question_bank() if use_bank and answers_cacheable() else None
+        picked, avoid = _from_bank(bank, topic, n_questions, difficulty, learner)
+        deficit = n_questions - len(picked)
+        new: List[MCQ] = []
+        if deficit > 0:
+            try:
+                resp = await call_ollama_async(_build_prompt_for_quiz(topic, deficit, difficulty, avoid), model=model,
+                                               use_cache=bank is None, task='quiz')
+            except (CircuitOpenError, DeadlineExceeded):
+                resp = ''
+            new = [m.model_copy(update={'difficulty': difficulty}) if difficulty else m
+                   for m in _iter_mcqs(iter_json_array([resp]), deficit)]
+        return _finish_quiz(sp, bank, topic, n_questions, picked, new, learner)
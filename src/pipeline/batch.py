@@ -0,0 +1,193 @@
+# src/pipeline/batch.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from src.pipeline.checkpoint import DEFAULT_MANIFEST, CheckpointManifest
+from src.pipeline.sequential_pipeline import run_pipeline
+
+# run_pipeline options a job line may set; everything else is rejected per job
+_JOB_OPTIONS = {
+    'level', 'generate_templates', 'max_per_topic', 'summary_batch_size', 'deadline_s',
+    'retry_budget', 'concurrent', 'topic_workers', 'pool', 'learner',
+}
+
+def _parse_job(line: str, lineno: int) -> Dict[str, Any]:
+    job = json.loads(line)
+    if not isinstance(job, dict):
+        raise ValueError('job must be a JSON object')
+    topics = job.get('topics')
+    if isinstance(topics, str):
+        topics = [t.strip() for t in topics.split(',')]
+    topics = [t.strip() for t in (topics or []) if isinstance(t, str) and t.strip()]
+    if not topics:
+        raise ValueError("job has no 'topics'")
+    unknown = set(job) - _JOB_OPTIONS - {'id', 'topics'}
+    if unknown:
+        raise ValueError(f'unknown job options {sorted(unknown)}')
+    opts = {k: v for k, v in job.items() if k in _JOB_OPTIONS}
+    return {'id': job.get('id', lineno), 'topics': topics, 'options': opts}
+
+def iter_jobs(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Lazily yield (line number, job, error) for every non-blank line of a JSONL job file.
+    A job line looks like {"id": "...", "topics": [...], "level": "beginner", ...}; "topics"
+    may also be a comma separated string. Lines that cannot be parsed yield an error instead.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield lineno, _parse_job(line, lineno), None
+            except ValueError as e:
+                yield lineno, None, str(e)
+
+def _count_jobs(path: str) -> int:
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+class _Progress:
+    """Throttled done/failed/throughput reporting."""
+
+    def __init__(self, total: Optional[int], every_s: float):
+        self.total = total
+        self.every_s = every_s
+        self.done = 0
+        self.failed = 0
+        self.start = time.time()
+        self._last = 0.0
+
+    def update(self, ok: bool) -> None:
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        now = time.time()
+        if now - self._last >= self.every_s or self.done == self.total:
+            self._last = now
+            self.report()
+
+    def report(self) -> None:
+        elapsed = max(time.time() - self.start, 1e-9)
+        rate = self.done / elapsed
+        line = f'[batch] {self.done}' + (f'/{self.total}' if self.total else '')
+        line += f' jobs | {self.failed} failed | {rate:.2f} jobs/s | {elapsed:.0f}s elapsed'
+        left = (self.total or 0) - self.done
+        if rate > 0 and left > 0:
+            line += f' | eta {left / rate:.0f}s'
+        print(line, flush=True)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.time() - self.start
+        return {
+            'jobs': self.done,
+            'failed': self.failed,
+            'elapsed_s': round(elapsed, 1),
+            'jobs_per_s': round(self.done / elapsed, 3) if elapsed > 0 else None,
+        }
+
+def _run_job(job: Dict[str, Any], serper_key: Optional[str], manifest: Optional[CheckpointManifest],
+             resume: bool) -> Dict[str, Any]:
+    t0 = time.time()
+    try:
+        results = run_pipeline(job['topics'], serper_key=serper_key, manifest=manifest, resume=resume,
+                               checkpoint_path=None, write_outputs=False, **job['options'])
+        return {'id': job['id'], 'ok': True, 'topics': job['topics'], 'results': results,
+                'duration_s': round(time.time() - t0, 3)}
+    except Exception as e:
+        return {'id': job['id'], 'ok': False, 'topics': job['topics'], 'error': f'{type(e).__name__}: {e}',
+                'duration_s': round(time.time() - t0, 3)}
+
+def run_batch(
+    jobs_path: str,
+    out_path: str,
+    serper_key: Optional[str] = None,
+    max_in_flight: int = 2,
+    resume: bool = False,
+    force: bool = False,
+    checkpoint_path: Optional[str] = DEFAULT_MANIFEST,
+    progress_every_s: float = 10.0
+) -> Dict[str, Any]:
+    """
+    Run run_pipeline once per job line of `jobs_path` and append one result line per job
+    to `out_path` as soon as it finishes (completion order; match lines by "id", which
+    defaults to the job's line number).
+
+    Memory stays bounded for arbitrarily large job files: jobs are read lazily, at most
+    `max_in_flight` of them run at once, and each result is written and dropped instead of
+    being collected. Jobs run with write_outputs=False so they do not overwrite each
+    other's data/examples files. All jobs share one checkpoint manifest, in which units are
+    keyed by their inputs (topic, learner, topic set), so a job only reuses work of jobs
+    with the same inputs. Completed units are always recorded; resume reuses them and force
+    clears the manifest first, for the whole batch (checkpoint_path=None disables it).
+
+    Returns a summary dict (jobs, failed, elapsed_s, jobs_per_s).
+    """
+    if max_in_flight < 1:
+        raise ValueError('max_in_flight must be >= 1')
+    manifest = None
+    if checkpoint_path:
+        try:
+            manifest = CheckpointManifest(checkpoint_path)
+        except OSError as e:
+            print('[batch] could not open checkpoints:', e)
+    if manifest is not None and force:
+        manifest.reset()
+    resume = resume and not force
+
+    progress = _Progress(_count_jobs(jobs_path), progress_every_s)
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    out_lock = threading.Lock()
+
+    with open(out_path, 'a', encoding='utf-8') as out:
+        def _emit(record: Dict[str, Any]) -> None:
+            with out_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+            progress.update(record['ok'])
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='job') as pool:
+            for lineno, job, error in iter_jobs(jobs_path):
+                if error is not None:
+                    _emit({'id': lineno, 'ok': False, 'error': f'invalid job line {lineno}: {error}'})
+                    continue
+                # bounded window: wait for a slot before reading further
+                while len(running) >= max_in_flight:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        _emit(fut.result())
+                running.add(pool.submit(_run_job, job, serper_key, manifest, resume))
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    _emit(fut.result())
+
+    if manifest is not None:
+        try:
+            manifest.compact()
+        except OSError as e:
+            print('[batch] could not compact checkpoints:', e)
+    summary = progress.summary()
+    print('[batch] finished:', summary)
+    return summary
+
+if __name__ == '__main__':
+    import argparse
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Run the pipeline for every job in a JSONL file')
+    parser.add_argument('jobs', help='JSONL file with one job per line, e.g. {"id": "x", "topics": ["Pandas"], "level": "beginner"}')
+    parser.add_argument('--out', default='data/batch/results.jsonl', help='Output JSONL (appended to)')
+    parser.add_argument('--max-in-flight', type=int, default=2, help='Number of jobs running at once')
+    parser.add_argument('--progress-every', type=float, default=10.0, help='Seconds between progress lines')
+    parser.add_argument('--resume', action='store_true', help='Reuse units completed by earlier jobs and runs (always recorded)')
+    parser.add_argument('--force', action='store_true', help='Discard checkpoints before the batch')
+    args = parser.parse_args()
+
+    run_batch(args.jobs, args.out, serper_key=os.getenv('SERPER_API_KEY', None), max_in_flight=args.max_in_flight,
+              resume=args.resume, force=args.force, progress_every_s=args.progress_every)
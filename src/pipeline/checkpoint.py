@@ -0,0 +1,127 @@
+# src/pipeline/checkpoint.py
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MANIFEST = 'data/.checkpoints/manifest.jsonl'
+
+def input_hash(**inputs) -> str:
+    """Stable hash of the inputs that determine a unit's output."""
+    raw = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+class CheckpointManifest:
+    """
+    Per-(stage, unit) completion records for resumable pipeline runs.
+
+    The manifest is an append-only JSON Lines file: one line per completed unit with the
+    hash of its inputs and its JSON-serializable output. On load the last line for a unit
+    wins and a truncated final line (crash mid-write) is ignored, so a run can be killed at
+    any point without corrupting earlier progress.
+
+    Only the hash and file offset of each unit are kept in memory; an output is read from
+    the file when get() matches. Superseded lines are dropped by compact(), which runs on
+    load once they outnumber the live ones (callers also compact at the end of a run).
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        self.path = path
+        self._entries: Dict[str, Tuple[str, int]] = {}   # unit key -> (input hash, line offset)
+        self._lines = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+        if self._lines > 2 * len(self._entries):
+            self.compact()
+
+    @staticmethod
+    def _key(stage: str, unit: str) -> str:
+        return f'{stage}\x1f{unit}'
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                start, offset = offset, offset + len(line)
+                try:
+                    rec = json.loads(line)
+                    self._entries[self._key(rec['stage'], rec['unit'])] = (rec['hash'], start)
+                    self._lines += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+        if offset < os.path.getsize(self.path):
+            # drop the half-written line of a crashed run so the next put starts on a fresh line
+            os.truncate(self.path, offset)
+
+    def _read(self, offset: int) -> Dict[str, Any]:
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, stage: str, unit: str, hash_: str) -> Optional[Any]:
+        """Stored output of a completed unit, or None if missing or its inputs changed."""
+        with self._lock:
+            entry = self._entries.get(self._key(stage, unit))
+            if entry is None or entry[0] != hash_:
+                self.misses += 1
+                return None
+            try:
+                rec = self._read(entry[1])
+            except (OSError, ValueError):
+                rec = None
+            if not isinstance(rec, dict) or (rec.get('stage'), rec.get('unit'), rec.get('hash')) != (stage, unit, hash_):
+                # the file was rewritten by another process: treat the unit as not done
+                self.misses += 1
+                return None
+            self.hits += 1
+            return rec.get('output')
+
+    def put(self, stage: str, unit: str, hash_: str, output: Any) -> None:
+        rec = {'stage': stage, 'unit': unit, 'hash': hash_, 'completed_at': time.time(), 'output': output}
+        line = (json.dumps(rec, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[self._key(stage, unit)] = (hash_, offset)
+            self._lines += 1
+
+    def reset(self) -> None:
+        """Forget every unit (used by --force)."""
+        with self._lock:
+            self._entries.clear()
+            self._lines = 0
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest record per unit."""
+        with self._lock:
+            if self._lines == len(self._entries):
+                return
+            tmp = self.path + '.tmp'
+            entries = {}
+            with open(self.path, 'rb') as src, open(tmp, 'wb') as dst:
+                for key, (hash_, offset) in self._entries.items():
+                    src.seek(offset)
+                    entries[key] = (hash_, dst.tell())
+                    dst.write(src.readline())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, self.path)
+            self._entries = entries
+            self._lines = len(entries)
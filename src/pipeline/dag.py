@@ -0,0 +1,107 @@
+# src/pipeline/dag.py
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.utils.tracing import span
+
+class Stage:
+    """
+    One node of the pipeline graph. `fn` receives a dict with the results of the stages
+    listed in `deps` and returns this stage's result. It is not called when one of its
+    dependencies failed or was skipped.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+def _validate(stages: List[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names in {names}")
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stages {missing}")
+    # cycle check (Kahn)
+    indeg = {s.name: len(s.deps) for s in stages}
+    ready = [n for n, d in indeg.items() if d == 0]
+    seen = 0
+    while ready:
+        n = ready.pop()
+        seen += 1
+        for s in stages:
+            if n in s.deps:
+                indeg[s.name] -= 1
+                if indeg[s.name] == 0:
+                    ready.append(s.name)
+    if seen != len(stages):
+        raise ValueError("Stage graph has a cycle")
+
+def _run_stage(stage: Stage, results: Dict[str, Any], errors: Dict[str, BaseException], skipped: List[str]) -> None:
+    if any(d in errors or d in skipped for d in stage.deps):
+        # contain failures: nothing runs on the missing output of a failed stage
+        skipped.append(stage.name)
+        results[stage.name] = None
+        return
+    try:
+        with span(f'stage.{stage.name}'):
+            results[stage.name] = stage.fn({d: results[d] for d in stage.deps})
+    except Exception as e:
+        # isolate failures: independent stages carry on
+        errors[stage.name] = e
+        results[stage.name] = None
+
+def run_stages(stages: List[Stage], concurrent: bool = True, max_workers: Optional[int] = None,
+               on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+    """
+    Execute the stage graph and return {stage name: result}. A failing stage's result is
+    None and its exception is reported under the '_errors' key; stages depending on it
+    (directly or not) are skipped, with result None, and listed under '_skipped'.
+    With concurrent=True every stage whose dependencies are finished is
+    submitted to a thread pool, so independent stages overlap. Each stage runs in a copy
+    of the caller's contextvars (run deadline / retry budget carry over).
+    With concurrent=False stages run one after another in declaration order.
+    on_result(name, result), if given, is called in the calling thread as each stage finishes.
+    """
+    _validate(stages)
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+    skipped: List[str] = []
+
+    if not concurrent:
+        pending = list(stages)
+        while pending:
+            stage = next(s for s in pending if all(d in results for d in s.deps))
+            pending.remove(stage)
+            _run_stage(stage, results, errors, skipped)
+            if on_result is not None:
+                on_result(stage.name, results[stage.name])
+        results['_errors'] = errors
+        results['_skipped'] = skipped
+        return results
+
+    pending = {s.name: s for s in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix='stage') as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(d in results for d in stage.deps):
+                    del pending[name]
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, _run_stage, stage, results, errors, skipped)] = name
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                fut.result()
+                if on_result is not None:
+                    on_result(name, results[name])
+    results['_errors'] = errors
+    results['_skipped'] = skipped
+    return results
@@ -0,0 +1,121 @@
+# src/pipeline/outputs.py
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+OUTPUT_DIR = 'data/examples'
+RAW_DIR = os.path.join(OUTPUT_DIR, 'raw')
+# 'json' keeps the historical <name>.json array files; 'ndjson' writes one record per line
+OUTPUT_FORMAT = os.getenv('PIPELINE_OUTPUT_FORMAT', 'json')
+OUTPUT_COMPRESS = os.getenv('PIPELINE_OUTPUT_COMPRESS', '').lower() in ('1', 'true', 'yes')
+# raw debug copies under data/examples/raw are only written when this is set
+PIPELINE_DEBUG = os.getenv('PIPELINE_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+FORMATS = ('json', 'ndjson')
+
+class RecordWriter:
+    """
+    Write records one at a time to `path`, either as NDJSON (one JSON document per line)
+    or as a JSON array that is streamed element by element, optionally gzip-compressed.
+
+    Records go to a temporary file next to `path`; commit() fsyncs it and atomically
+    renames it into place, so readers only ever see the previous complete file or the new
+    complete file. Used as a context manager, the file is committed on success and the
+    temporary file discarded on error.
+    """
+
+    def __init__(self, path: str, fmt: str = 'ndjson', compress: bool = False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}'. Allowed: {', '.join(FORMATS)}")
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self._tmp = f'{path}.tmp-{os.getpid()}'
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._raw = open(self._tmp, 'wb')
+        self._f = gzip.open(self._raw, 'wt', encoding='utf-8') if compress else \
+            open(self._raw.fileno(), 'w', encoding='utf-8', closefd=False)
+        if fmt == 'json':
+            self._f.write('[')
+
+    def write(self, record: Any) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        if self.fmt == 'json':
+            self._f.write(('\n' if self.count == 0 else ',\n') + line)
+        else:
+            self._f.write(line + '\n')
+        self.count += 1
+
+    def commit(self) -> str:
+        if self.fmt == 'json':
+            self._f.write('\n]\n' if self.count else ']\n')
+        self._f.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        for f in (self._f, self._raw):
+            try:
+                f.close()
+            except Exception:
+                pass
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+def output_path(name: str, fmt: str = 'json', compress: bool = False, base_dir: str = OUTPUT_DIR) -> str:
+    """data/examples/<name>.json | .ndjson, plus .gz when compressed."""
+    return os.path.join(base_dir, f'{name}.{fmt}' + ('.gz' if compress else ''))
+
+class StageOutput:
+    """
+    The canonical output file of one stage plus, in debug mode, a raw NDJSON copy under
+    data/examples/raw. Both are written record by record as the stage produces them.
+    enabled=False turns it into a no-op that only counts records.
+    """
+
+    def __init__(self, name: str, fmt: Optional[str] = None, compress: Optional[bool] = None,
+                 debug: Optional[bool] = None, enabled: bool = True):
+        fmt = fmt or OUTPUT_FORMAT
+        compress = OUTPUT_COMPRESS if compress is None else compress
+        self.count = 0
+        self.writers: List[RecordWriter] = []
+        if enabled:
+            self.writers.append(RecordWriter(output_path(name, fmt, compress), fmt, compress))
+            if PIPELINE_DEBUG if debug is None else debug:
+                self.writers.append(RecordWriter(output_path(f'{name}_raw', 'ndjson', False, RAW_DIR), 'ndjson'))
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.writers[0].path if self.writers else None
+
+    def write(self, record: Any) -> None:
+        for w in self.writers:
+            w.write(record)
+        self.count += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {'path': self.path, 'records': self.count}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for w in self.writers:
+            w.__exit__(exc_type, exc, tb)
+        return False
@@ -47,189 +47,491 @@
 #     }
 
 
-from src.agents.learning_agent import generate_learning_materials
-from src.agents.quiz_agent import generate_quiz_for_topic
+from src.agents.learning_agent import FallbackMaterials, generate_learning_materials, generate_learning_materials_by_topic
+from src.agents.quiz_agent import FallbackQuiz, generate_quiz_for_topic
 from src.agents.project_agent import generate_project_ideas
+from src.tools.project_suggester import FallbackProjects
 from src.tools.project_template import create_project_template
-from typing import List, Optional, Dict, Any
-import os, json, time, traceback
+from src.pipeline.checkpoint import DEFAULT_MANIFEST, CheckpointManifest, input_hash
+from src.pipeline.dag import Stage, run_stages
+from src.pipeline.outputs import StageOutput
+from src.utils.fanout import fan_out
+from src.utils.llm import answers_cacheable, llm_health
+from src.utils.retry import DeadlineExceeded, RunContext, current_context, run_context, with_retry
+from src.utils.tracing import Tracer, span, tracing
+from typing import Callable, List, Optional, Dict, Any
+from contextlib import nullcontext
+import os, time, traceback, functools, threading
 
-# Simple retry decorator (lightweight)
+# Retry wrapper kept for backward compatibility; retries now go through the shared
+# policy in src/utils/retry.py (jittered backoff, per-run retry budget and deadline).
 def retry(fn, tries=2):
-    def wrapper(*a, **kw):
-        last_exc = None
-        for i in range(tries):
-            try:
-                return fn(*a, **kw)
-            except Exception as e:
-                last_exc = e
-                # quick backoff
-                time.sleep(0.5 + i * 0.5)
-        # final raise
-        raise last_exc
-    return wrapper
-
-# Wrap potentially flaky functions
+    return with_retry(fn, attempts=tries)
+
+# Wrap potentially flaky functions. generate_project_ideas already retries internally,
+# so it is not wrapped a second time.
 generate_learning_materials_safe = retry(generate_learning_materials, tries=2)
+generate_learning_materials_by_topic_safe = retry(generate_learning_materials_by_topic, tries=2)
 generate_quiz_for_topic_safe = retry(generate_quiz_for_topic, tries=2)
-generate_project_ideas_safe = retry(generate_project_ideas, tries=2)
+generate_project_ideas_safe = generate_project_ideas
 
 def _ensure_dirs():
     os.makedirs('data/examples', exist_ok=True)
-    os.makedirs('data/examples/raw', exist_ok=True)
     os.makedirs('data/generated_projects', exist_ok=True)
 
-def _dump_raw(name: str, content: Any):
-    path = os.path.join('data/examples/raw', f'{name}.txt')
-    try:
-        with open(path, 'w', encoding='utf-8') as f:
-            if isinstance(content, (dict, list)):
-                json.dump(content, f, indent=2, ensure_ascii=False)
-            else:
-                f.write(str(content))
-    except Exception:
-        # best-effort; do not crash pipeline for logging issues
-        pass
+# Default model used by the agents; part of every checkpoint input hash
+_MODEL = 'llama3.2:3b'
+
+# Write a Chrome trace of every run to this path when set (same as trace_path=...)
+PIPELINE_TRACE = os.getenv('PIPELINE_TRACE') or None
+
+# With keep_results=False, quizzes are generated and written this many topics at a time
+# (0 = max(4, 2 * topic_workers)); same as topic_group=...
+PIPELINE_TOPIC_GROUP = int(os.getenv('PIPELINE_TOPIC_GROUP', '0'))
+
+class _RunOptions:
+    """Settings of one pipeline run, shared by the stage functions."""
+
+    def __init__(self, topics: List[str], serper_key: Optional[str], level: str, max_per_topic: int,
+                 summary_batch_size: int, topic_workers: Optional[int], pool: Optional[str],
+                 manifest: Optional[CheckpointManifest], resume: bool, write_outputs: bool = True,
+                 output_format: Optional[str] = None, compress: Optional[bool] = None,
+                 debug: Optional[bool] = None, keep_results: bool = True, learner: Optional[str] = None,
+                 topic_group: Optional[int] = None):
+        self.topics = topics
+        self.serper_key = serper_key
+        self.level = level
+        self.max_per_topic = max_per_topic
+        self.summary_batch_size = summary_batch_size
+        self.topic_workers = topic_workers
+        self.pool = pool
+        self.manifest = manifest
+        self.resume = resume
+        self.write_outputs = write_outputs
+        self.output_format = output_format
+        self.compress = compress
+        self.debug = debug
+        self.keep_results = keep_results
+        self.learner = learner
+        self.topic_group = topic_group or PIPELINE_TOPIC_GROUP
+        self.outputs: Dict[str, Dict[str, Any]] = {}
+        # model part of the input hashes; output of a stand-in backend (stub) gets its own
+        # checkpoints, so a run against the real model never resumes from canned answers
+        self.model_key = _MODEL if answers_cacheable() else _MODEL + '+stand-in'
+
+    def checkpointed(self, stage: str, unit: str, hash_: str):
+        """Output of a completed unit when resuming, else None."""
+        if not self.resume or self.manifest is None:
+            return None
+        return self.manifest.get(stage, unit, hash_)
+
+    def checkpoint(self, stage: str, unit: str, hash_: str, output) -> None:
+        if self.manifest is not None:
+            try:
+                self.manifest.put(stage, unit, hash_, output)
+            except Exception as e:
+                # best-effort; a broken manifest only costs resumability
+                print('  - Could not write checkpoint:', e)
+
+    def quiz_unit(self, topic: str) -> str:
+        # learners get separate units, so jobs for different learners never replace each other's quiz
+        return f'{topic}\x1flearner={self.learner}' if self.learner else topic
+
+    def output(self, name: str) -> StageOutput:
+        return StageOutput(name, fmt=self.output_format, compress=self.compress, debug=self.debug,
+                           enabled=self.write_outputs)
+
+    def topic_groups(self) -> List[List[str]]:
+        """
+        Unique topics in order, split into the groups whose quizzes are computed and written
+        together. When results are kept that is a single group; otherwise groups of
+        topic_group topics (default max(4, 2 * topic_workers)) bound memory, at the cost of
+        idle workers while the slowest topic of each group finishes.
+        """
+        topics = list(dict.fromkeys(self.topics))
+        step = len(topics) if self.keep_results else self.topic_group or max(4, 2 * (self.topic_workers or 1))
+        return [topics[i:i + step] for i in range(0, len(topics), max(step, 1))]
+
+class _InTopicOrder:
+    """
+    Passes per-topic values to `write` in topic order as they arrive in any order: a value
+    is held only until every earlier topic has arrived. finish() writes what is still held,
+    skipping topics that never arrived (e.g. failed searches). A topic's first value wins.
+    """
+
+    def __init__(self, topics: List[str], write: Callable[[Any], None]):
+        self._topics = topics
+        self._write = write
+        self._held: Dict[str, Any] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def put(self, topic: str, value) -> None:
+        with self._lock:
+            if topic in self._held or topic in self._topics[:self._next]:
+                return
+            self._held[topic] = value
+            while self._next < len(self._topics) and self._topics[self._next] in self._held:
+                self._write(self._held.pop(self._topics[self._next]))
+                self._next += 1
+
+    def finish(self) -> None:
+        with self._lock:
+            for topic in self._topics[self._next:]:
+                if topic in self._held:
+                    self._write(self._held.pop(topic))
+            self._next = len(self._topics)
 
 def run_pipeline(
     topics: List[str],
     serper_key: Optional[str] = None,
     level: str = 'beginner',
     generate_templates: bool = True,
-    max_per_topic: int = 3
+    max_per_topic: int = 3,
+    summary_batch_size: int = 1,
+    deadline_s: Optional[float] = None,
+    retry_budget: Optional[int] = None,
+    concurrent: bool = False,
+    topic_workers: Optional[int] = None,
+    pool: Optional[str] = None,
+    resume: bool = False,
+    force: bool = False,
+    checkpoint_path: Optional[str] = DEFAULT_MANIFEST,
+    manifest: Optional[CheckpointManifest] = None,
+    write_outputs: bool = True,
+    output_format: Optional[str] = None,
+    compress: Optional[bool] = None,
+    debug: Optional[bool] = None,
+    keep_results: bool = True,
+    topic_group: Optional[int] = None,
+    learner: Optional[str] = None,
+    trace_path: Optional[str] = None,
+    on_stage: Optional[Callable[[str, Any], None]] = None
 ) -> Dict[str, Any]:
     """
-    Run the full sequential pipeline:
+    Run the full pipeline:
       1) Learning materials (uses Serper + local LLM)
       2) Quizzes (per topic)
       3) Project ideas (based on topics + level)
       4) Optionally generate small project templates
 
-    Returns a dictionary with JSON-serializable lists for materials/quizzes/projects.
+    summary_batch_size > 1 summarizes that many search snippets per LLM call.
+    deadline_s bounds the whole run: model/search timeouts are clipped to the time left and
+    steps that run out of time fall back to placeholder content. retry_budget caps the total
+    number of retries across all steps (None = unlimited).
+    concurrent=True runs steps 1-3 in parallel (they are independent) and starts the
+    templates as soon as the projects are ready; outputs and error handling are unchanged.
+    topic_workers > 1 additionally fans the per-topic work inside the materials and quiz steps
+    out over a 'thread' or 'process' pool (see src/utils/fanout.py); results keep topic order.
+
+    Every completed unit (materials/quiz per topic, the project set, each template) is
+    recorded with a hash of its inputs in the checkpoint manifest at checkpoint_path, so
+    any run, including one that crashes, can be resumed. resume=True reuses the units whose
+    inputs are unchanged, so only missing or stale ones are computed; force=True clears the
+    manifest first. Units that fell back to placeholder content are not recorded, so a
+    resumed run retries them. checkpoint_path=None disables the manifest. An already open
+    `manifest` can be passed instead of checkpoint_path (batch runs share one).
+
+    Stage outputs are streamed record by record to data/examples/<stage>.json (a JSON
+    array) or .ndjson with output_format='ndjson', gzip-compressed with compress=True, and
+    atomically renamed into place when the stage finishes (see src/pipeline/outputs.py).
+    Raw copies under data/examples/raw are only written with debug=True (or PIPELINE_DEBUG).
+    write_outputs=False skips these files, so several runs can execute side by side (see
+    src/pipeline/batch.py); templates are still created.
+
+    Returns a dictionary with JSON-serializable lists for materials/quizzes/projects, plus
+    {stage: {path, records}} under 'outputs' when files were written. keep_results=False
+    leaves the materials/quizzes lists empty so memory stays flat however many topics the
+    run covers (the output files are the result): materials are still searched, deduplicated
+    and summarized across all topics, but each topic is written out and dropped as soon as
+    it is ready; quizzes are generated topic_group topics at a time (PIPELINE_TOPIC_GROUP,
+    default max(4, 2 * topic_workers); larger groups keep the workers busier but hold more
+    quizzes in memory).
+
+    Quizzes are drawn from the persistent question bank and only topped up by the model
+    (see generate_quiz_for_topic); with a `learner` id, questions that learner has already
+    seen are skipped and the ones served are recorded.
+
+    trace_path (or PIPELINE_TRACE) records timing spans for the stages, agents, searches and
+    model calls (latency, prompt/response sizes, cache hits, retries, fallbacks), writes them
+    as a Chrome trace-event JSON file (open in chrome://tracing or ui.perfetto.dev) and
+    prints a per-span summary table; see src/utils/tracing.py.
+
+    on_stage(name, result), if given, is called as each stage ('materials', 'quizzes',
+    'projects', 'templates') finishes, e.g. to stream partial results.
     """
-    _ensure_dirs()
-    results = {"materials": [], "quizzes": [], "projects": []}
-    print(f'Running pipeline for topics: {topics} | level={level}')
-    start_all = time.time()
+    owned = manifest is None and bool(checkpoint_path)
+    if owned:
+        try:
+            manifest = CheckpointManifest(checkpoint_path)
+        except OSError as e:
+            # best-effort like every checkpoint write: the run only loses resumability
+            print('  - Could not open checkpoints:', e)
+            owned = False
+    if manifest is not None and force:
+        manifest.reset()
+    opts = _RunOptions(topics, serper_key, level, max_per_topic, summary_batch_size, topic_workers, pool,
+                       manifest, resume and not force, write_outputs=write_outputs, output_format=output_format,
+                       compress=compress, debug=debug, keep_results=keep_results, learner=learner,
+                       topic_group=topic_group)
+    ctx = RunContext(deadline_s=deadline_s, retry_budget=retry_budget)
+    trace_path = trace_path or PIPELINE_TRACE
+    tracer = Tracer() if trace_path else None
+    with run_context(ctx), tracing(tracer) if tracer else nullcontext():
+        with span('pipeline.run', topics=len(topics)):
+            results = _run_pipeline(opts, generate_templates=generate_templates, concurrent=concurrent,
+                                    on_stage=on_stage)
+    if tracer is not None:
+        print(tracer.format_summary())
+        try:
+            print('Trace written to', tracer.write_chrome_trace(trace_path))
+        except Exception as e:
+            print('Could not write trace:', e)
+    if ctx.retries_used or ctx.retries_denied or ctx.deadline is not None:
+        print('Retry/deadline:', ctx.stats())
+    if manifest is not None and opts.resume:
+        print(f'Checkpoints: reused {manifest.hits} units, computed {manifest.misses}')
+    if owned:
+        try:
+            manifest.compact()
+        except OSError as e:
+            print('  - Could not compact checkpoints:', e)
+    return results
+
+def _to_jsonable(obj) -> Dict[str, Any]:
+    try:
+        return obj.model_dump(mode='json')
+    except Exception:
+        # fallback to dict() if model_dump not available
+        return getattr(obj, '__dict__', dict(obj))
 
+def _stage_materials(opts: _RunOptions) -> List[Dict[str, Any]]:
     # --- STEP 1: Learning materials ---
     try:
         t0 = time.time()
         print('> Generating learning materials...')
-        materials = generate_learning_materials_safe(topics, max_per_topic=max_per_topic, serper_key=serper_key)
-        dur = time.time() - t0
-        print(f'  - Retrieved {len(materials)} materials in {dur:.1f}s')
-        # model_dump as JSON-serializable dicts
         jo_materials = []
-        for i, m in enumerate(materials):
-            try:
-                jo = m.model_dump(mode='json')
-            except Exception:
-                # fallback to dict() if model_dump not available
-                jo = getattr(m, '__dict__', dict(m))
-            jo_materials.append(jo)
-        results['materials'] = jo_materials
-
-        # save raw pydantic repr just for debugging
-        _dump_raw('materials_raw', jo_materials)
-        # write canonical file
-        with open('data/examples/learning_materials.json', 'w', encoding='utf-8') as f:
-            json.dump(jo_materials, f, indent=2, ensure_ascii=False)
-        print('  - Wrote learning_materials.json')
+        reused = 0
+        with opts.output('learning_materials') as out:
+            def _write(records):
+                for m in records:
+                    out.write(m)
+                    if opts.keep_results:
+                        jo_materials.append(m)
+
+            # all topics are searched, deduplicated and summarized together; each topic is
+            # written (in topic order) as soon as its materials are ready and then dropped
+            topics = list(dict.fromkeys(opts.topics))
+            ordered = _InTopicOrder(topics, _write)
+            hashes = {}
+            pending = []
+            for t in topics:
+                hashes[t] = input_hash(topic=t, max_per_topic=opts.max_per_topic, model=opts.model_key)
+                cached = opts.checkpointed('materials', t, hashes[t])
+                if cached is None:
+                    pending.append(t)
+                else:
+                    reused += 1
+                    ordered.put(t, cached)
+
+            def _on_topic(t, mats):
+                # model_dump as JSON-serializable dicts
+                records = [_to_jsonable(m) for m in mats]
+                if not isinstance(mats, FallbackMaterials):
+                    opts.checkpoint('materials', t, hashes[t], records)
+                ordered.put(t, records)
+
+            if pending:
+                try:
+                    generate_learning_materials_by_topic_safe(
+                        pending, max_per_topic=opts.max_per_topic, serper_key=opts.serper_key,
+                        summary_batch_size=opts.summary_batch_size, workers=opts.topic_workers, pool=opts.pool,
+                        on_topic=_on_topic)
+                except Exception as e:
+                    print(f'  - Learning materials failed for topics {pending}:', e)
+            ordered.finish()
+        if reused:
+            print(f'  - Reused checkpointed materials for {reused} topics')
+        dur = time.time() - t0
+        print(f'  - Retrieved {out.count} materials in {dur:.1f}s')
+        if out.path:
+            opts.outputs['materials'] = out.summary()
+            print('  - Wrote', out.path)
+        return jo_materials
     except Exception as e:
         print('Error in Learning Materials step:', e)
         traceback.print_exc()
         # continue to next steps with empty materials
-        results['materials'] = []
+        return []
 
+def _quiz_for_topic(t: str, learner: Optional[str] = None):
+    """Quiz for one topic, with the smaller fallback quiz if the first attempt fails."""
+    try:
+        return generate_quiz_for_topic_safe(t, n_questions=5, learner=learner)
+    except Exception as iqe:
+        print(f'  - Quiz generation failed for topic "{t}":', iqe)
+        if isinstance(iqe, DeadlineExceeded) or not current_context().try_consume_retry():
+            print('  - Skipping fallback quiz (out of time or retry budget) for topic', t)
+            return None
+        # fallback simple placeholder quiz via function fallback inside agent
+        try:
+            quiz = generate_quiz_for_topic_safe(t, n_questions=3, learner=learner)
+            return FallbackQuiz(topic=quiz.topic, questions=quiz.questions)
+        except Exception:
+            print('  - Could not create fallback quiz for topic', t)
+            return None
+
+def _stage_quizzes(opts: _RunOptions) -> List[Dict[str, Any]]:
     # --- STEP 2: Quiz generation ---
     try:
         t1 = time.time()
         print('> Generating quizzes for each topic...')
-        quizzes_objs = []
-        for t in topics:
-            try:
-                q = generate_quiz_for_topic_safe(t, n_questions=5)
-                quizzes_objs.append(q)
-            except Exception as iqe:
-                print(f'  - Quiz generation failed for topic "{t}":', iqe)
-                # fallback simple placeholder quiz via function fallback inside agent
-                try:
-                    q = generate_quiz_for_topic_safe(t, n_questions=3)
-                    quizzes_objs.append(q)
-                except Exception:
-                    print('  - Could not create fallback quiz for topic', t)
-        # serialize quizzes
         jo_quizzes = []
-        for q in quizzes_objs:
-            try:
-                joq = q.model_dump(mode='json')
-            except Exception:
-                joq = getattr(q, '__dict__', dict(q))
-            jo_quizzes.append(joq)
-        results['quizzes'] = jo_quizzes
-
-        _dump_raw('quizzes_raw', jo_quizzes)
-        with open('data/examples/quizzes.json', 'w', encoding='utf-8') as f:
-            json.dump(jo_quizzes, f, indent=2, ensure_ascii=False)
-        print(f'  - Wrote {len(jo_quizzes)} quizzes to data/examples/quizzes.json')
+        reused = 0
+        with opts.output('quizzes') as out:
+            for group in opts.topic_groups():
+                done = {}
+                hashes = {}
+                for t in group:
+                    # a learner's quiz depends on what they have seen, so it is checkpointed per learner
+                    learner = {'learner': opts.learner} if opts.learner else {}
+                    hashes[t] = input_hash(topic=t, n_questions=5, model=opts.model_key, **learner)
+                    cached = opts.checkpointed('quizzes', opts.quiz_unit(t), hashes[t])
+                    if cached is not None:
+                        done[t] = cached
+                reused += len(done)
+                pending = [t for t in group if t not in done]
+
+                def _record(res):
+                    # runs in this thread as each topic finishes, so progress survives a crash
+                    if res.ok and res.value is not None:
+                        done[res.item] = _to_jsonable(res.value)
+                        # placeholder or short quizzes are retried by a resumed run
+                        if not isinstance(res.value, FallbackQuiz):
+                            opts.checkpoint('quizzes', opts.quiz_unit(res.item), hashes[res.item], done[res.item])
+                    elif not res.ok:
+                        print(f'  - Quiz generation failed for topic "{res.item}":', res.error)
+
+                # one unit of work per topic; written in topic order once the group is done
+                fan_out(functools.partial(_quiz_for_topic, learner=opts.learner), pending,
+                        workers=opts.topic_workers, mode=opts.pool, on_result=_record)
+                for t in group:
+                    if t in done:
+                        out.write(done[t])
+                        if opts.keep_results:
+                            jo_quizzes.append(done[t])
+        if reused:
+            print(f'  - Reused checkpointed quizzes for {reused} topics')
+        if out.path:
+            opts.outputs['quizzes'] = out.summary()
+            print(f'  - Wrote {out.count} quizzes to {out.path}')
         print(f'  - Quiz step took {time.time()-t1:.1f}s')
+        return jo_quizzes
     except Exception as e:
         print('Error in Quiz step:', e)
         traceback.print_exc()
-        results['quizzes'] = []
+        return []
 
+def _stage_projects(opts: _RunOptions) -> List[Dict[str, Any]]:
     # --- STEP 3: Project ideas ---
     try:
         t2 = time.time()
         print('> Generating project ideas...')
-        projects = generate_project_ideas_safe(topics, level=level, n=3)
-        jo_projects = []
-        for p in projects:
-            try:
-                jop = p.model_dump(mode='json')
-            except Exception:
-                jop = getattr(p, '__dict__', dict(p))
-            jo_projects.append(jop)
-        results['projects'] = jo_projects
-
-        _dump_raw('projects_raw', jo_projects)
-        with open('data/examples/projects.json', 'w', encoding='utf-8') as f:
-            json.dump(jo_projects, f, indent=2, ensure_ascii=False)
-        print(f'  - Wrote {len(jo_projects)} projects to data/examples/projects.json')
+        h = input_hash(topics=opts.topics, level=opts.level, n=3, model=opts.model_key)
+        # one unit per distinct topic set and level: batch jobs share the manifest
+        jo_projects = opts.checkpointed('projects', h, h)
+        if jo_projects is not None:
+            print('  - Reusing checkpointed project ideas')
+        else:
+            projects = generate_project_ideas_safe(opts.topics, level=opts.level, n=3)
+            jo_projects = [_to_jsonable(p) for p in projects]
+            if isinstance(projects, FallbackProjects):
+                # placeholders: a resumed run asks the model again
+                print('  - Using placeholder project ideas (not checkpointed)')
+            else:
+                opts.checkpoint('projects', h, h, jo_projects)
+
+        with opts.output('projects') as out:
+            for p in jo_projects:
+                out.write(p)
+        if out.path:
+            opts.outputs['projects'] = out.summary()
+            print(f'  - Wrote {out.count} projects to {out.path}')
         print(f'  - Project step took {time.time()-t2:.1f}s')
+        return jo_projects
     except Exception as e:
         print('Error in Project step:', e)
         traceback.print_exc()
-        results['projects'] = []
+        return []
 
+def _stage_templates(opts: _RunOptions, projects: List[Dict[str, Any]]) -> List[str]:
     # --- OPTIONAL: Generate project templates ---
-    if generate_templates and results.get('projects'):
-        print('> Generating project templates for each suggested project...')
-        created = []
-        for i, proj_dict in enumerate(results['projects']):
-            # proj_dict is JSON-serializable; reconstruct ProjectIdea object is optional
-            try:
-                # create_project_template accepts ProjectIdea model, but it also works if it expects fields on object.
-                # We'll call it with a minimal shim object that has the attributes used by create_project_template.
-                class Shim:
-                    def __init__(self, d):
-                        self.title = d.get('title') or f'project-{i+1}'
-                        self.description = d.get('description','')
-                        self.difficulty = d.get('difficulty','beginner')
-                        self.estimated_hours = d.get('estimated_hours', None)
-                        self.required_skills = d.get('required_skills', [])
-                        self.steps = d.get('steps', [])
-                shim = Shim(proj_dict)
-                path = create_project_template(shim, base_dir='data/generated_projects')
-                created.append(path)
-                print('  - Created template:', path)
-            except Exception as e:
-                print('  - Failed to create template for project', proj_dict.get('title', ''), e)
-        results['generated_templates'] = created
+    print('> Generating project templates for each suggested project...')
+    created = []
+    for i, proj_dict in enumerate(projects):
+        h = input_hash(project=proj_dict)
+        path = opts.checkpointed('templates', proj_dict.get('title') or f'project-{i+1}', h)
+        if path is not None and os.path.isdir(path):
+            created.append(path)
+            print('  - Reusing template:', path)
+            continue
+        # proj_dict is JSON-serializable; reconstruct ProjectIdea object is optional
+        try:
+            # create_project_template accepts ProjectIdea model, but it also works if it expects fields on object.
+            # We'll call it with a minimal shim object that has the attributes used by create_project_template.
+            class Shim:
+                def __init__(self, d):
+                    self.title = d.get('title') or f'project-{i+1}'
+                    self.description = d.get('description','')
+                    self.difficulty = d.get('difficulty','beginner')
+                    self.estimated_hours = d.get('estimated_hours', None)
+                    self.required_skills = d.get('required_skills', [])
+                    self.steps = d.get('steps', [])
+            shim = Shim(proj_dict)
+            path = create_project_template(shim, base_dir='data/generated_projects')
+            created.append(path)
+            opts.checkpoint('templates', shim.title, h, path)
+            print('  - Created template:', path)
+        except Exception as e:
+            print('  - Failed to create template for project', proj_dict.get('title', ''), e)
+    return created
+
+def _run_pipeline(opts: _RunOptions, generate_templates: bool, concurrent: bool = False,
+                  on_stage: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+    _ensure_dirs()
+    print(f'Running pipeline for topics: {opts.topics} | level={opts.level}')
+    start_all = time.time()
+
+    # Stage graph: materials, quizzes and projects are independent; templates need projects.
+    stages = [
+        Stage('materials', lambda deps: _stage_materials(opts)),
+        Stage('quizzes', lambda deps: _stage_quizzes(opts)),
+        Stage('projects', lambda deps: _stage_projects(opts)),
+    ]
+    if generate_templates:
+        stages.append(Stage('templates', lambda deps: _stage_templates(opts, deps['projects']) if deps['projects'] else None,
+                            deps=['projects']))
+    out = run_stages(stages, concurrent=concurrent, on_result=on_stage)
+    for name, err in out['_errors'].items():
+        print(f'Error in {name} stage:', err)
+    for name in out['_skipped']:
+        print(f'Skipped {name} stage: a stage it depends on failed')
+
+    results = {
+        "materials": out.get('materials') or [],
+        "quizzes": out.get('quizzes') or [],
+        "projects": out.get('projects') or [],
+    }
+    if out.get('templates') is not None:
+        results['generated_templates'] = out['templates']
+    if opts.outputs:
+        results['outputs'] = opts.outputs
 
     total_time = time.time() - start_all
     print(f'Pipeline finished in {total_time:.1f}s')
+    unhealthy = {m: h for m, h in llm_health().items() if h['state'] != 'closed' or h['failures']}
+    if unhealthy:
+        print('LLM health:', unhealthy)
     return results
 
 # quick CLI convenience
@@ -244,8 +546,42 @@ if __name__ == '__main__':
     parser.add_argument('--level', type=str, default='beginner', choices=['beginner','intermediate','advanced'])
     parser.add_argument('--no-templates', dest='templates', action='store_false', help='Do not generate project templates')
     parser.add_argument('--max-per-topic', type=int, default=3)
+    parser.add_argument('--summary-batch-size', type=int, default=1,
+                        help='Number of search snippets summarized per LLM call (1 = one call per snippet)')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Overall time budget for the run in seconds')
+    parser.add_argument('--retry-budget', type=int, default=None,
+                        help='Maximum number of retries across the whole run')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Run the independent pipeline stages in parallel')
+    parser.add_argument('--topic-workers', type=int, default=None,
+                        help='Worker pool size for per-topic work inside each stage (default 1 = serial)')
+    parser.add_argument('--pool', type=str, default=None, choices=['thread', 'process'],
+                        help='Worker pool type for --topic-workers')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip units already completed with the same inputs; every run records its '
+                             'completed units in data/.checkpoints, so any earlier run can be resumed')
+    parser.add_argument('--force', action='store_true',
+                        help='Discard checkpoints and recompute everything')
+    parser.add_argument('--output-format', type=str, default=None, choices=['json', 'ndjson'],
+                        help='Format of the data/examples output files (default json, or PIPELINE_OUTPUT_FORMAT)')
+    parser.add_argument('--compress', action='store_true', default=None,
+                        help='gzip the output files')
+    parser.add_argument('--debug', action='store_true', default=None,
+                        help='Also write raw copies of every stage under data/examples/raw')
+    parser.add_argument('--trace', type=str, default=None, metavar='PATH',
+                        help='Write a Chrome trace of the run to PATH and print a timing summary')
+    parser.add_argument('--topic-group', type=int, default=None,
+                        help='Topics whose quizzes are generated and written together (default max(4, 2 * workers))')
+    parser.add_argument('--learner', type=str, default=None,
+                        help='Learner id: quizzes skip questions this learner has already seen')
     args = parser.parse_args()
 
     topics = [t.strip() for t in args.topics.split(',') if t.strip()]
     serper_key = os.getenv('SERPER_API_KEY', None)
-    run_pipeline(topics, serper_key=serper_key, level=args.level, generate_templates=args.templates, max_per_topic=args.max_per_topic)
+    run_pipeline(topics, serper_key=serper_key, level=args.level, generate_templates=args.templates, max_per_topic=args.max_per_topic,
+                 summary_batch_size=args.summary_batch_size, deadline_s=args.deadline, retry_budget=args.retry_budget,
+                 concurrent=args.concurrent, topic_workers=args.topic_workers, pool=args.pool,
+                 resume=args.resume, force=args.force, output_format=args.output_format, compress=args.compress,
+                 debug=args.debug, keep_results=False, topic_group=args.topic_group, learner=args.learner,
+                 trace_path=args.trace)
@@ -0,0 +1,151 @@
+# src/service/app.py
+"""
+Long-running HTTP service that runs the pipeline as background jobs.
+
+    uvicorn src.service.app:app --port 8000
+    python -m src.service.app --port 8000 --workers 2 --max-queue 32
+
+POST /jobs                submit a run -> 202 {job_id, ...}; 429 + Retry-After when the queue is full
+GET  /jobs/{id}           status, and the results once finished
+GET  /jobs/{id}/stream    NDJSON events: status changes and each stage's results as it finishes
+DELETE /jobs/{id}         cancel a job that has not started
+GET  /health              queue/worker stats, LLM breaker state, backend selection, coalesced calls,
+                          summaries per tier
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from src.pipeline.sequential_pipeline import run_pipeline
+from src.service.jobs import SERVICE_MAX_QUEUE, SERVICE_WORKERS, JobManager, QueueFull
+from src.utils.extractive import summary_tier_stats
+import src.utils.llm as llm
+from src.utils.llm_backends import backend_status, select_backend
+from src.utils.singleflight import singleflight_stats
+
+# Preload this model into Ollama at startup (empty = skip)
+SERVICE_PRELOAD_MODEL = os.getenv('SERVICE_PRELOAD_MODEL', 'llama3.2:3b')
+
+class JobRequest(BaseModel):
+    topics: List[str] = Field(..., min_length=1)
+    level: Literal['beginner', 'intermediate', 'advanced'] = 'beginner'
+    generate_templates: bool = False
+    max_per_topic: int = Field(3, ge=1, le=10)
+    summary_batch_size: int = Field(1, ge=1, le=16)
+    deadline_s: Optional[float] = Field(None, gt=0)
+    retry_budget: Optional[int] = Field(None, ge=0)
+    topic_workers: Optional[int] = Field(None, ge=1, le=16)
+    learner: Optional[str] = Field(None, min_length=1, max_length=200)
+
+def _run_job(topics: List[str], serper_key: Optional[str] = None, **kwargs):
+    # jobs share the process: no shared output files, no checkpoint manifest, stages in parallel
+    return run_pipeline(topics, serper_key=serper_key, concurrent=True, write_outputs=False,
+                        checkpoint_path=None, **kwargs)
+
+def _warm_up() -> None:
+    """Probe the model backend and load the model once, so the first job does not pay for it."""
+    try:
+        select_backend(llm.OLLAMA_BACKEND)
+        if SERVICE_PRELOAD_MODEL:
+            llm.preload_model(SERVICE_PRELOAD_MODEL)
+    except Exception as e:
+        print('Service warm-up failed (jobs will retry on demand):', e)
+
+def create_app(workers: int = SERVICE_WORKERS, max_queue: int = SERVICE_MAX_QUEUE) -> FastAPI:
+    manager = JobManager(_run_job, workers=workers, max_queue=max_queue)
+    serper_key = os.getenv('SERPER_API_KEY', None)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        manager.start()
+        threading.Thread(target=_warm_up, name='warm-up', daemon=True).start()
+        yield
+        manager.stop()
+
+    app = FastAPI(title='Learning pipeline service', lifespan=lifespan)
+    app.state.jobs = manager
+
+    @app.post('/jobs', status_code=202)
+    def submit_job(req: JobRequest):
+        params = req.model_dump()
+        params['serper_key'] = serper_key
+        try:
+            job = manager.submit(params)
+        except QueueFull as e:
+            return JSONResponse(status_code=429, content={'detail': str(e)}, headers={'Retry-After': '5'})
+        return job.summary()
+
+    def _job_or_404(job_id: str):
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f'Unknown job {job_id}')
+        return job
+
+    @app.get('/jobs/{job_id}')
+    def get_job(job_id: str, include_results: bool = True):
+        job = _job_or_404(job_id)
+        out = job.summary()
+        if include_results and job.result is not None:
+            out['results'] = job.result
+        return out
+
+    @app.delete('/jobs/{job_id}')
+    def cancel_job(job_id: str):
+        job = _job_or_404(job_id)
+        if not manager.cancel(job_id):
+            raise HTTPException(status_code=409, detail=f'Job {job_id} is {job.status} and cannot be cancelled')
+        return job.summary()
+
+    @app.get('/jobs/{job_id}/stream')
+    async def stream_job(job_id: str):
+        job = _job_or_404(job_id)
+
+        async def events():
+            cursor = 0
+            while True:
+                # wait in a thread so the event loop stays free for other requests
+                new, finished = await asyncio.to_thread(job.events_since, cursor, 15.0)
+                cursor += len(new)
+                for ev in new:
+                    yield json.dumps(ev, ensure_ascii=False, default=str) + '\n'
+                if finished and not new:
+                    return
+                if not new:
+                    # keep-alive for proxies while a long stage runs
+                    yield json.dumps({'event': 'ping'}) + '\n'
+
+        return StreamingResponse(events(), media_type='application/x-ndjson')
+
+    @app.get('/health')
+    def health():
+        return {'jobs': manager.stats(), 'llm': llm.llm_health(), 'backends': backend_status(),
+                'coalescing': singleflight_stats(), 'summaries': summary_tier_stats()}
+
+    return app
+
+if __name__ == '__main__':
+    import argparse
+    import uvicorn
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=SERVICE_WORKERS, help='Pipeline runs executed at once')
+    parser.add_argument('--max-queue', type=int, default=SERVICE_MAX_QUEUE,
+                        help='Queued jobs before new submissions get 429')
+    args = parser.parse_args()
+
+    # a single server process: the job workers are threads sharing the warm clients and caches
+    uvicorn.run(create_app(workers=args.workers, max_queue=args.max_queue), host=args.host, port=args.port)
+else:
+    # `uvicorn src.service.app:app`; run as a script the app is built once from the options above
+    app = create_app()
@@ -0,0 +1,186 @@
+# src/service/jobs.py
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Service tunables; override with environment variables
+SERVICE_WORKERS = int(os.getenv('SERVICE_WORKERS', '2'))          # pipeline runs executed at once
+SERVICE_MAX_QUEUE = int(os.getenv('SERVICE_MAX_QUEUE', '32'))     # queued jobs before submits are rejected
+SERVICE_MAX_JOBS = int(os.getenv('SERVICE_MAX_JOBS', '500'))      # finished jobs kept for polling
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+class QueueFull(RuntimeError):
+    """Raised by submit() when the job queue is at capacity."""
+
+class Job:
+    """One pipeline run: its parameters, status, and an append-only event log for streaming."""
+
+    def __init__(self, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+
+    def emit(self, event: str, **data) -> None:
+        with self._cond:
+            self.events.append({'event': event, 'ts': time.time(), **data})
+            self._cond.notify_all()
+
+    def events_since(self, cursor: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """Events after `cursor`, waiting up to `timeout` s for new ones; also whether the job finished."""
+        with self._cond:
+            if len(self.events) <= cursor and self.status not in FINISHED:
+                self._cond.wait(timeout)
+            return self.events[cursor:], self.status in FINISHED
+
+    def set_status(self, status: str, expect: Optional[str] = None, **data) -> bool:
+        """
+        Move the job to `status` and emit the change, atomically with respect to other
+        status changes. With `expect`, only a job currently in that status moves (returns
+        False otherwise), so a cancel and a worker picking the job up cannot both win.
+        """
+        with self._cond:
+            if expect is not None and self.status != expect:
+                return False
+            self.status = status
+            if status == RUNNING:
+                self.started_at = time.time()
+            elif status in FINISHED:
+                self.finished_at = time.time()
+            # the condition's lock is reentrant: the event is logged before anyone sees the next change
+            self.emit('status', status=status, **data)
+            return True
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'topics': self.params.get('topics'),
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+        }
+
+class JobManager:
+    """
+    Bounded job queue in front of a fixed pool of worker threads that call `runner(**params)`
+    (run_pipeline by default). All jobs run in this process, so model/search clients, the
+    backend selection and the caches stay warm between runs. submit() raises QueueFull
+    instead of queueing without limit; finished jobs are kept (for polling) up to max_jobs.
+    """
+
+    def __init__(self, runner: Callable[..., Dict[str, Any]], workers: int = SERVICE_WORKERS,
+                 max_queue: int = SERVICE_MAX_QUEUE, max_jobs: int = SERVICE_MAX_JOBS):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        job = Job(params)
+        # logged before a worker can see the job, so 'running' never precedes it
+        job.emit('status', status=QUEUED)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise QueueFull(f'job queue is full ({self._queue.maxsize} waiting)') from None
+            self._jobs[job.id] = job
+            self._evict()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet; running jobs are left to finish."""
+        job = self.get(job_id)
+        return job is not None and job.set_status(CANCELLED, expect=QUEUED)
+
+    def _evict(self) -> None:
+        # drop the oldest finished jobs beyond max_jobs; queued/running ones are never dropped
+        extra = len(self._jobs) - self.max_jobs
+        if extra <= 0:
+            return
+        for jid in [jid for jid, j in self._jobs.items() if j.status in FINISHED][:extra]:
+            del self._jobs[jid]
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.set_status(RUNNING, expect=QUEUED):
+                # cancelled while queued
+                continue
+            with self._lock:
+                self._busy += 1
+            status = FAILED
+            try:
+                job.result = self.runner(**job.params,
+                                         on_stage=lambda name, res: job.emit('stage', stage=name, data=res))
+                status = DONE
+            except Exception as e:
+                job.error = f'{type(e).__name__}: {e}'
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    if status == DONE:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                job.set_status(status, error=job.error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'busy': self._busy,
+                'queued': self._queue.qsize(),
+                'max_queue': self._queue.maxsize,
+                'jobs_tracked': len(self._jobs),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
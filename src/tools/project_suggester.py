@@ -1,8 +1,9 @@
 # Placeholder for project tool
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
 from src.models.project_models import ProjectIdea
-from src.utils.llm import call_ollama
-import json, re
+from src.utils.llm import CircuitOpenError, DeadlineExceeded, call_ollama_async, stream_ollama
+from src.utils.json_stream import iter_json_array
+from src.utils.tracing import count, span
 
 def _build_project_prompt(topics: List[str], level: str, n: int = 3):
     topics_str = ', '.join(topics)
@@ -13,43 +14,90 @@ def _build_project_prompt(topics: List[str], level: str, n: int = 3):
             "Provide only the JSON array as the output.")
 
 
-def suggest_projects(topics: List[str], level: str = 'beginner', n: int = 3, model: str = 'llama3.2:3b') -> List[ProjectIdea]:
-    prompt = _build_project_prompt(topics, level, n)
-    resp = call_ollama(prompt, model=model)
-    arr = None
+def _to_project(obj: Dict, level: str) -> Optional[ProjectIdea]:
     try:
-        arr = json.loads(resp)
+        return ProjectIdea(
+            title=obj.get('title',''),
+            description=obj.get('description',''),
+            difficulty=obj.get('difficulty', level),
+            estimated_hours=int(obj.get('estimated_hours', 5)),
+            steps=obj.get('steps', []),
+            required_skills=obj.get('required_skills', [])
+        )
     except Exception:
-        m = re.search(r"\[\s*\{.*\}\s*\]", resp, re.S)
-        if m:
-            try:
-                arr = json.loads(m.group(0))
-            except Exception:
-                arr = None
-    if not arr:
-        # fallback simple ideas
-        arr = []
-        for i in range(n):
-            arr.append({
-                'title': f'{level.title()} Project on {topics[0]} #{i+1}',
-                'description': f'A simple project to practice {topics[0]}.',
-                'difficulty': level,
-                'estimated_hours': 5*(i+1),
-                'steps': [f'Step {j+1}' for j in range(4)],
-                'required_skills': [topics[0]]
-            })
-    projects = []
-    for obj in arr:
-        try:
-            p = ProjectIdea(
-                title=obj.get('title',''),
-                description=obj.get('description',''),
-                difficulty=obj.get('difficulty', level),
-                estimated_hours=int(obj.get('estimated_hours', 5)),
-                steps=obj.get('steps', []),
-                required_skills=obj.get('required_skills', [])
-            )
+        return None
+
+class FallbackProjects(list):
+    """
+    Placeholder ideas used when the model is unavailable, out of time or gave nothing usable.
+    Callers must not cache or checkpoint them, so a recovered model is asked again.
+    """
+
+def _fallback_projects(topics: List[str], level: str, n: int) -> 'FallbackProjects':
+    # fallback simple ideas
+    projects = FallbackProjects()
+    for i in range(n):
+        p = _to_project({
+            'title': f'{level.title()} Project on {topics[0]} #{i+1}',
+            'description': f'A simple project to practice {topics[0]}.',
+            'difficulty': level,
+            'estimated_hours': 5*(i+1),
+            'steps': [f'Step {j+1}' for j in range(4)],
+            'required_skills': [topics[0]]
+        }, level)
+        if p is not None:
             projects.append(p)
-        except Exception:
-            continue
     return projects
+
+def _iter_projects(items, level: str, n: int) -> Iterator[ProjectIdea]:
+    produced = 0
+    for obj in items:
+        p = _to_project(obj, level) if isinstance(obj, dict) else None
+        if p is None:
+            continue
+        yield p
+        produced += 1
+        if produced >= n:
+            return
+
+def stream_project_ideas(topics: List[str], level: str = 'beginner', n: int = 3, model: str = 'llama3.2:3b') -> Iterator[ProjectIdea]:
+    """
+    Yield validated ProjectIdea objects as each element of the model's JSON array completes.
+    Generation stops when the array closes or `n` ideas have been produced.
+    """
+    prompt = _build_project_prompt(topics, level, n)
+    chunks = stream_ollama(prompt, model=model, cache_partial=True, task='projects')
+    try:
+        yield from _iter_projects(iter_json_array(chunks), level, n)
+    finally:
+        chunks.close()
+
+def suggest_projects(topics: List[str], level: str = 'beginner', n: int = 3, model: str = 'llama3.2:3b') -> List[ProjectIdea]:
+    """Project ideas from the model, or FallbackProjects when it could not provide any."""
+    with span('projects.suggest', topics=len(topics), level=level, n=n) as sp:
+        try:
+            projects = list(stream_project_ideas(topics, level=level, n=n, model=model))
+        except (CircuitOpenError, DeadlineExceeded):
+            # model is known to be unhealthy or the run is out of time: use the fallback ideas
+            projects = []
+        sp.set(projects=len(projects))
+        if not projects:
+            sp.set(fallback=1)
+            count('fallback.projects')
+            projects = _fallback_projects(topics, level, n)
+        return projects
+
+async def suggest_projects_async(topics: List[str], level: str = 'beginner', n: int = 3, model: str = 'llama3.2:3b') -> List[ProjectIdea]:
+    """Async counterpart of suggest_projects; concurrency is capped by call_ollama_async."""
+    with span('projects.suggest', topics=len(topics), level=level, n=n) as sp:
+        try:
+            resp = await call_ollama_async(_build_project_prompt(topics, level, n), model=model, task='projects')
+        except (CircuitOpenError, DeadlineExceeded):
+            resp = ''
+        projects = list(_iter_projects(iter_json_array([resp]), level, n))
+        sp.set(projects=len(projects))
+        if not projects:
+            sp.set(fallback=1)
+            count('fallback.projects')
+            projects = _fallback_projects(topics, level, n)
+        return projects
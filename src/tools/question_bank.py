@@ -0,0 +1,213 @@
+# src/tools/question_bank.py
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.quiz_models import MCQ
+from src.utils.topic_index import normalize_topic
+
+_DEFAULT_PATH = os.getenv('QUESTION_BANK_PATH', 'data/.cache/question_bank.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    qhash TEXT NOT NULL,
+    mcq TEXT NOT NULL,
+    rnd INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (topic, qhash)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_topic_rnd ON questions(topic, rnd);
+CREATE INDEX IF NOT EXISTS idx_questions_topic_difficulty_rnd ON questions(topic, difficulty, rnd);
+CREATE TABLE IF NOT EXISTS seen (
+    learner TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (learner, question_id)
+) WITHOUT ROWID;
+"""
+
+def _bank_topic(topic: str) -> str:
+    # same notion of "same topic" as the materials index; fall back to the plain text
+    return normalize_topic(topic) or ' '.join(topic.lower().split())
+
+def _question_hash(mcq: MCQ) -> str:
+    text = ' '.join(re.findall(r'[a-z0-9]+', mcq.question.lower()))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+class QuestionBank:
+    """
+    Persistent MCQ store indexed by normalized topic and difficulty.
+    - questions are deduplicated per topic on their normalized text
+    - sample() picks from a random point of an indexed random key, so it stays fast at
+      large bank sizes, and can skip the questions a learner has already seen
+    - mark_seen() records what a learner was shown
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH):
+        self.path = path
+        self.served = 0
+        self.added = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, topic: str, mcqs: Iterable[MCQ]) -> List[int]:
+        """Store questions under their own difficulty; returns one id per question (the existing id for duplicates)."""
+        norm = _bank_topic(topic)
+        now = time.time()
+        ids = []
+        with self._lock:
+            for mcq in mcqs:
+                qhash = _question_hash(mcq)
+                cur = self._conn.execute(
+                    'INSERT OR IGNORE INTO questions (topic, difficulty, qhash, mcq, rnd, created_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (norm, mcq.difficulty, qhash, mcq.model_dump_json(), random.getrandbits(62), now),
+                )
+                if cur.rowcount:
+                    self.added += 1
+                    ids.append(cur.lastrowid)
+                else:
+                    ids.append(self._conn.execute('SELECT id FROM questions WHERE topic = ? AND qhash = ?',
+                                                  (norm, qhash)).fetchone()[0])
+        return ids
+
+    def sample(self, topic: str, n: int, difficulty: Optional[str] = None, learner: Optional[str] = None,
+               exclude: Iterable[int] = ()) -> List[Tuple[int, MCQ]]:
+        """
+        Up to n random (id, question) pairs for the topic (and difficulty), skipping the ids
+        in `exclude` and, with a learner, every question that learner has already seen.
+        """
+        if n <= 0:
+            return []
+        norm = _bank_topic(topic)
+        exclude = set(exclude)
+        where, args = 'topic = ?', [norm]
+        if difficulty:
+            where, args = where + ' AND difficulty = ?', args + [difficulty]
+        if learner:
+            where += ' AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.learner = ? AND s.question_id = q.id)'
+            args.append(learner)
+        start = random.getrandbits(62)
+        out = []
+        with self._lock:
+            # from a random point of the random key to the end, then wrap around
+            for cond in ('q.rnd >= ?', 'q.rnd < ?'):
+                need = n - len(out)
+                if need <= 0:
+                    break
+                rows = self._conn.execute(
+                    f'SELECT q.id, q.mcq FROM questions q WHERE {where} AND {cond} ORDER BY q.rnd LIMIT ?',
+                    args + [start, need + len(exclude)],
+                ).fetchall()
+                for row_id, raw in rows:
+                    if row_id in exclude or len(out) >= n:
+                        continue
+                    try:
+                        out.append((row_id, MCQ.model_validate_json(raw)))
+                    except Exception:
+                        continue
+            self.served += len(out)
+        return out
+
+    def seen_ids(self, learner: str, ids: Iterable[int]) -> Set[int]:
+        ids = list(ids)
+        if not learner or not ids:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT question_id FROM seen WHERE learner = ? AND question_id IN ({",".join("?" * len(ids))})',
+                [learner] + ids,
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_seen(self, learner: str, ids: Iterable[int]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO seen (learner, question_id, seen_at) VALUES (?, ?, ?)',
+                                   [(learner, i, now) for i in ids])
+
+    def known_questions(self, topic: str, learner: Optional[str] = None, limit: int = 20) -> List[str]:
+        """Texts of the questions a learner saw most recently for the topic (without a learner: the newest ones)."""
+        norm = _bank_topic(topic)
+        with self._lock:
+            if learner:
+                rows = self._conn.execute(
+                    'SELECT q.mcq FROM seen s JOIN questions q ON q.id = s.question_id '
+                    'WHERE s.learner = ? AND q.topic = ? ORDER BY s.seen_at DESC LIMIT ?',
+                    (learner, norm, limit),
+                ).fetchall()
+            else:
+                rows = self._conn.execute('SELECT mcq FROM questions WHERE topic = ? ORDER BY id DESC LIMIT ?',
+                                          (norm, limit)).fetchall()
+        out = []
+        for (raw,) in rows:
+            try:
+                out.append(json.loads(raw)['question'])
+            except Exception:
+                continue
+        return out
+
+    def available(self, topic: str, difficulty: Optional[str] = None, learner: Optional[str] = None) -> int:
+        """Questions sample() could still return for the topic (and learner)."""
+        where, args = 'topic = ?', [_bank_topic(topic)]
+        if difficulty:
+            where, args = where + ' AND difficulty = ?', args + [difficulty]
+        if learner:
+            where += ' AND NOT EXISTS (SELECT 1 FROM seen s WHERE s.learner = ? AND s.question_id = q.id)'
+            args.append(learner)
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM questions q WHERE {where}', args).fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            questions, topics = self._conn.execute('SELECT COUNT(*), COUNT(DISTINCT topic) FROM questions').fetchone()
+            learners = self._conn.execute('SELECT COUNT(DISTINCT learner) FROM seen').fetchone()[0]
+        return {
+            'path': self.path,
+            'questions': questions,
+            'topics': topics,
+            'learners': learners,
+            'served': self.served,
+            'added': self.added,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_bank: Optional[QuestionBank] = None
+_bank_lock = threading.Lock()
+
+def question_bank_disabled() -> bool:
+    """Set QUESTION_BANK_DISABLED=1 to always generate quizzes from scratch (and store nothing)."""
+    return os.getenv('QUESTION_BANK_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+def get_question_bank() -> Optional[QuestionBank]:
+    """Shared bank instance, or None when disabled or the bank file cannot be opened."""
+    global _bank
+    if question_bank_disabled():
+        return None
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                try:
+                    _bank = QuestionBank()
+                except (sqlite3.Error, OSError):
+                    return None
+    return _bank
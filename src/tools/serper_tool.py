@@ -1,6 +1,19 @@
+import copy
+import hashlib
+import json
 import os
+import re
+import sqlite3
+import threading
+import time
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, List, Dict, Optional, Tuple
+
+from src.utils.llm_cache import LLMCache, make_cache_key
+from src.utils.retry import current_context
+from src.utils.singleflight import get_group
+from src.utils.tracing import count, current_span, span
 
 # NOTE: Serper API endpoint may be one of several; if 'https://api.serper.dev/search' doesn't work
 # check your account docs at https://serper.dev. The code below uses api.serper.dev which is commonly used.
@@ -10,8 +23,129 @@ SERPER_SEARCH_URLS = [
     "https://google.serper.dev/search"
 ]
 
-def search_serper(query: str, api_key: str = None, max_results: int = 5) -> List[Dict]:
-    """Search Serper and return a list of simple result dicts: title, link, snippet, source."""
+# Per-request timeout (seconds) and how long a failing endpoint is tried last
+SERPER_TIMEOUT = float(os.getenv('SERPER_TIMEOUT', '10'))
+SERPER_ENDPOINT_COOLDOWN = float(os.getenv('SERPER_ENDPOINT_COOLDOWN', '60'))
+# Queries sent per request by search_serper_batch
+SERPER_BATCH_SIZE = int(os.getenv('SERPER_BATCH_SIZE', '20'))
+
+# Persistent search result cache: entries younger than the TTL are served as-is; older ones,
+# up to TTL + STALE seconds, are served immediately while a background refresh replaces them
+SERPER_CACHE_PATH = os.getenv('SERPER_CACHE_PATH', 'data/.cache/serper_cache.sqlite3')
+SERPER_CACHE_TTL = float(os.getenv('SERPER_CACHE_TTL_SECONDS', str(24 * 3600)))
+SERPER_CACHE_STALE = float(os.getenv('SERPER_CACHE_STALE_SECONDS', str(7 * 24 * 3600)))
+SERPER_CACHE_MAX_ENTRIES = int(os.getenv('SERPER_CACHE_MAX_ENTRIES', '5000'))
+SERPER_CACHE_MAX_BYTES = int(os.getenv('SERPER_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+_preferred: Optional[str] = None              # last URL that answered
+_endpoints: Dict[str, Dict[str, Any]] = {}    # url -> {'failures': n, 'down_until': monotonic time}
+_no_batch = set()                             # URLs that turned down an array of queries
+
+class _BatchUnsupported(RuntimeError):
+    """No endpoint accepted an array of queries; search them one per request instead."""
+
+def _get_session() -> requests.Session:
+    """Module-wide keep-alive session, so repeated searches reuse TLS connections."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def _endpoint_order() -> List[str]:
+    """
+    URLs to try, best first: the last one that answered, then the others in configured
+    order, then those still cooling down after a failure (tried only as a last resort).
+    """
+    now = time.monotonic()
+    with _lock:
+        urls = list(SERPER_SEARCH_URLS)
+        if _preferred in urls:
+            urls.remove(_preferred)
+            urls.insert(0, _preferred)
+        cooling = [u for u in urls if _endpoints.get(u, {}).get('down_until', 0) > now]
+    return [u for u in urls if u not in cooling] + cooling
+
+def _mark_ok(url: str) -> None:
+    global _preferred
+    with _lock:
+        _preferred = url
+        _endpoints.pop(url, None)
+
+def _mark_failed(url: str) -> None:
+    global _preferred
+    with _lock:
+        state = _endpoints.setdefault(url, {'failures': 0, 'down_until': 0.0})
+        state['failures'] += 1
+        # cooldown doubles with consecutive failures, capped at 8x
+        state['down_until'] = time.monotonic() + SERPER_ENDPOINT_COOLDOWN * 2 ** min(state['failures'] - 1, 3)
+        if _preferred == url:
+            _preferred = None
+
+def serper_endpoint_status() -> Dict[str, Any]:
+    """Preferred endpoint and per-endpoint failure/cooldown state, for monitoring."""
+    now = time.monotonic()
+    with _lock:
+        return {
+            'preferred': _preferred,
+            'endpoints': {u: {'failures': s['failures'], 'cooldown_s': round(max(0.0, s['down_until'] - now), 1)}
+                          for u, s in _endpoints.items()},
+            'no_batch': sorted(_no_batch),
+        }
+
+def reset_serper_endpoints() -> None:
+    global _preferred
+    with _lock:
+        _preferred = None
+        _endpoints.clear()
+        _no_batch.clear()
+
+_search_cache: Optional[LLMCache] = None
+_refreshing = set()
+
+def search_cache_disabled() -> bool:
+    """Set SERPER_CACHE_DISABLED=1 to always query Serper."""
+    return os.getenv('SERPER_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+def get_search_cache() -> Optional[LLMCache]:
+    """Shared search cache (same SQLite store as the LLM cache), or None when disabled/unavailable."""
+    global _search_cache
+    if search_cache_disabled():
+        return None
+    if _search_cache is None:
+        with _lock:
+            if _search_cache is None:
+                try:
+                    _search_cache = LLMCache(SERPER_CACHE_PATH, max_entries=SERPER_CACHE_MAX_ENTRIES,
+                                             max_bytes=SERPER_CACHE_MAX_BYTES,
+                                             ttl_seconds=SERPER_CACHE_TTL + SERPER_CACHE_STALE)
+                except (sqlite3.Error, OSError):
+                    return None
+    return _search_cache
+
+def _normalize_query(query: str) -> str:
+    # search is case- and whitespace-insensitive
+    return re.sub(r'\s+', ' ', query).strip().lower()
+
+def search_serper(query: str, api_key: str = None, max_results: int = 5, use_cache: bool = True,
+                  allow_stale: bool = True) -> List[Dict]:
+    """
+    Search Serper and return a list of simple result dicts: title, link, snippet, source.
+    Requests share one keep-alive session; the endpoint that answered last is tried first and
+    failing endpoints are moved to the back of the list for SERPER_ENDPOINT_COOLDOWN seconds.
+
+    Results are cached on disk per (normalized query, max_results) for SERPER_CACHE_TTL
+    seconds. With allow_stale=True an older entry (up to SERPER_CACHE_STALE seconds past
+    the TTL) is returned immediately and refreshed in the background. use_cache=False or
+    SERPER_CACHE_DISABLED=1 always queries Serper.
+    """
     if api_key is None:
         api_key = os.getenv('SERPER_API_KEY') or ''
     headers = {
@@ -19,25 +153,285 @@ def search_serper(query: str, api_key: str = None, max_results: int = 5) -> List
         'Content-Type': 'application/json'
     }
     payload = {'q': query, 'num': max_results}
+    with span('serper.search', query_chars=len(query)) as sp:
+        cache = get_search_cache() if use_cache else None
+        key = make_cache_key('serper', _normalize_query(query), {'num': max_results})
+        if cache is not None:
+            entry = _cache_lookup(cache, key)
+            if entry is not None:
+                value, age = entry
+                if age <= SERPER_CACHE_TTL or allow_stale:
+                    results = json.loads(value)
+                    stale = age > SERPER_CACHE_TTL
+                    sp.set(cache_hit=1, stale=int(stale), results=len(results))
+                    if stale:
+                        _refresh_in_background(cache, key, payload, headers, max_results)
+                    return results
+
+        # identical searches already in flight (e.g. many learners starting the same topic)
+        # share one request; each caller gets its own copy of the results
+        ran = []
+
+        def _run():
+            ran.append(True)
+            results = _search(payload, headers, max_results, sp)
+            _cache_store(cache, key, results)
+            return results
+
+        results = get_group('serper').do(_flight_key(query, max_results, api_key), _run, copy_result=True)
+        sp.set(results=len(results), coalesced=int(not ran))
+        return results
+
+def _flight_key(query: str, max_results: int, api_key: str):
+    # keys from different accounts never mix
+    return _normalize_query(query), max_results, hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+def _cache_lookup(cache: LLMCache, key: str):
+    try:
+        return cache.get_entry(key)
+    except Exception:
+        return None
+
+def _cache_store(cache: Optional[LLMCache], key: str, results: List[Dict]) -> None:
+    if cache is None:
+        return
+    try:
+        cache.set(key, json.dumps(results, ensure_ascii=False), model='serper')
+    except Exception:
+        # caching is best-effort
+        pass
+
+def _refresh_in_background(cache: LLMCache, key: str, payload: Dict, headers: Dict, max_results: int) -> None:
+    """Re-run a stale search on a daemon thread (at most one refresh per key at a time)."""
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    count('serper.stale_refresh')
+
+    def _refresh():
+        try:
+            # a fresh thread has an empty context: not bound by the caller's run deadline
+            _cache_store(cache, key, _search(payload, headers, max_results, current_span()))
+        except Exception as e:
+            print('  - Background refresh of a stale search failed:', e)
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=_refresh, name='serper-refresh', daemon=True).start()
+
+def _parse_results(data: Dict, max_results: int) -> List[Dict]:
+    # Attempt to parse common fields; different endpoints may return slightly different shapes
+    results = []
+    # common top-level keys: 'organic', 'results', 'items'
+    candidates = data.get('organic') or data.get('results') or data.get('items') or []
+    for c in candidates[:max_results]:
+        title = c.get('title') or c.get('name') or c.get('link') or ''
+        link = c.get('link') or c.get('url') or c.get('displayLink') or None
+        snippet = c.get('snippet') or c.get('description') or c.get('snippetText') or ''
+        source = c.get('source') or c.get('displayLink') or None
+        results.append({'title': title, 'link': link, 'snippet': snippet, 'source': source})
+    return results
+
+def _rejects_batch(status: int) -> bool:
+    # a client error about the request itself; auth and rate limit errors fail single queries too
+    return 400 <= status < 500 and status not in (401, 403, 429)
+
+def _post(payload: Any, headers: Dict, parse: Callable[[Any], Any], sp, batch: bool = False) -> Any:
+    """
+    POST payload to the best endpoint and return parse(decoded JSON). An endpoint that
+    errors, answers non-200 or returns something parse rejects is marked failed and the
+    next one is tried.
+
+    With batch=True (an array of queries) an endpoint that answers with a client error or
+    a body parse rejects is taken not to support batches rather than to be down: it is not
+    cooled down, batches skip it from then on, and if no endpoint answered the batch
+    _BatchUnsupported is raised so the caller can send the queries one by one.
+    """
     last_err = None
-    for url in SERPER_SEARCH_URLS:
+    unsupported = False
+    ctx = current_context()
+    for url in _endpoint_order():
+        if batch and url in _no_batch:
+            unsupported = True
+            continue
+        # stay within the current run's deadline (raises DeadlineExceeded once it has passed)
+        timeout = ctx.clip_timeout(SERPER_TIMEOUT)
+        sp.incr('endpoints_tried')
+        rejected = False
         try:
-            resp = requests.post(url, json=payload, headers=headers, timeout=10)
+            resp = _get_session().post(url, json=payload, headers=headers, timeout=timeout)
             if resp.status_code == 200:
-                data = resp.json()
-                # Attempt to parse common fields; different endpoints may return slightly different shapes
-                results = []
-                # common top-level keys: 'organic', 'results', 'items'
-                candidates = data.get('organic') or data.get('results') or data.get('items') or []
-                for c in candidates[:max_results]:
-                    title = c.get('title') or c.get('name') or c.get('link') or ''
-                    link = c.get('link') or c.get('url') or c.get('displayLink') or None
-                    snippet = c.get('snippet') or c.get('description') or c.get('snippetText') or ''
-                    source = c.get('source') or c.get('displayLink') or None
-                    results.append({'title': title, 'link': link, 'snippet': snippet, 'source': source})
-                return results
+                try:
+                    out = parse(resp.json())
+                except ValueError as e:
+                    if not batch:
+                        raise
+                    last_err = f"{url} answered a batch with an unexpected body: {e}"
+                    rejected = True
+                else:
+                    _mark_ok(url)
+                    return out
             else:
                 last_err = f"{url} returned {resp.status_code}: {resp.text[:200]}"
+                rejected = batch and _rejects_batch(resp.status_code)
         except Exception as e:
             last_err = str(e)
+        if rejected:
+            unsupported = True
+            with _lock:
+                _no_batch.add(url)
+            continue
+        _mark_failed(url)
+    if unsupported:
+        raise _BatchUnsupported(f"Serper endpoints do not accept batches. Last error: {last_err}")
     raise RuntimeError(f"Serper search failed. Last error: {last_err}") from None
+
+def _search(payload: Dict, headers: Dict, max_results: int, sp) -> List[Dict]:
+    return _post(payload, headers, lambda data: _parse_results(data, max_results), sp)
+
+def _parse_answer(answer: Any, max_results: int) -> List[Dict]:
+    """Results for one query of a batch; an error object (or anything else) fails just that query."""
+    if not isinstance(answer, dict):
+        raise RuntimeError(f"Serper returned an unexpected answer: {str(answer)[:200]}")
+    results = _parse_results(answer, max_results)
+    error = answer.get('error') or answer.get('message')
+    if not results and error:
+        raise RuntimeError(f"Serper query failed: {str(error)[:200]}")
+    return results
+
+def search_serper_batch(queries: List[str], api_key: str = None, max_results: int = 5, use_cache: bool = True,
+                        allow_stale: bool = True, batch_size: Optional[int] = None,
+                        on_result: Optional[Callable[[int, Any], None]] = None) -> List[Any]:
+    """
+    Search many queries in as few requests as possible: Serper accepts a JSON array of
+    query objects and answers with one result object per query.
+
+    Returns one entry per query, in input order: its result list (same shape as
+    search_serper) or the exception that query failed with, so one bad query does not
+    fail the others. Cache hits are served as in search_serper; the remaining distinct
+    queries go out batch_size (default SERPER_BATCH_SIZE) per request. If every endpoint
+    fails a request, each query in it gets that error; if the endpoints reject the array
+    body (client error or unexpected answer), its queries are searched one per request.
+    A query already being searched by another caller (search_serper or another batch)
+    waits for that search instead of being sent again, and a query of this batch is shared
+    with callers that ask for it meanwhile.
+
+    on_result(position, result), if given, is called for each query as soon as its entry
+    is known (cache hits first, then request by request), so callers can start working on
+    early results while later requests are still in flight.
+    """
+    if api_key is None:
+        api_key = os.getenv('SERPER_API_KEY') or ''
+    headers = {
+        'X-API-KEY': api_key,
+        'Content-Type': 'application/json'
+    }
+    out: List[Any] = [None] * len(queries)
+
+    def _done(i: int, result: Any) -> None:
+        out[i] = result
+        if on_result is not None:
+            on_result(i, result)
+
+    with span('serper.batch', queries=len(queries)) as sp:
+        cache = get_search_cache() if use_cache else None
+        pending: Dict[str, List[int]] = {}   # normalized query -> positions in `queries`
+        for i, query in enumerate(queries):
+            norm = _normalize_query(query)
+            if norm in pending:
+                pending[norm].append(i)
+                continue
+            if cache is not None:
+                key = make_cache_key('serper', norm, {'num': max_results})
+                entry = _cache_lookup(cache, key)
+                if entry is not None and (entry[1] <= SERPER_CACHE_TTL or allow_stale):
+                    sp.incr('cache_hits')
+                    if entry[1] > SERPER_CACHE_TTL:
+                        _refresh_in_background(cache, key, {'q': query, 'num': max_results}, headers, max_results)
+                    _done(i, json.loads(entry[0]))
+                    continue
+            pending[norm] = [i]
+
+        # queries another caller is already searching are joined instead of sent again
+        flight = get_group('serper')
+        leading: Dict[str, Tuple[Any, Any]] = {}     # normalized query -> (flight key, call)
+        following = []
+        for norm, positions in pending.items():
+            fkey = _flight_key(queries[positions[0]], max_results, api_key)
+            leader, call = flight.begin(fkey)
+            if leader:
+                leading[norm] = (fkey, call)
+            else:
+                sp.incr('coalesced')
+                following.append((call, positions))
+
+        def _deliver(positions: List[int], results: Any) -> None:
+            _done(positions[0], results)
+            for i in positions[1:]:
+                # repeated queries get their own copy
+                _done(i, results if isinstance(results, Exception) else copy.deepcopy(results))
+
+        misses = [(norm, pending[norm]) for norm in leading]
+        size = max(1, batch_size or SERPER_BATCH_SIZE)
+        try:
+            for start in range(0, len(misses), size):
+                chunk = misses[start:start + size]
+                payload = [{'q': queries[positions[0]], 'num': max_results} for _, positions in chunk]
+
+                def _answers(data, n=len(chunk)):
+                    if not isinstance(data, list) or len(data) != n:
+                        raise ValueError(f"batch of {n} queries answered with {type(data).__name__}")
+                    return data
+
+                sp.incr('requests')
+                one_by_one = False
+                try:
+                    answers = _post(payload, headers, _answers, sp, batch=True)
+                except _BatchUnsupported:
+                    # same searches as search_serper, minus the cache and flight this batch already handles
+                    sp.incr('batch_unsupported')
+                    one_by_one = True
+                    answers = [None] * len(chunk)
+                except RuntimeError as e:
+                    answers = [e] * len(chunk)
+                for (norm, positions), answer in zip(chunk, answers):
+                    try:
+                        if one_by_one:
+                            sp.incr('requests')
+                            results = _search({'q': queries[positions[0]], 'num': max_results}, headers,
+                                              max_results, sp)
+                        elif isinstance(answer, Exception):
+                            raise answer
+                        else:
+                            results = _parse_answer(answer, max_results)
+                        _cache_store(cache, make_cache_key('serper', norm, {'num': max_results}), results)
+                    except Exception as e:
+                        sp.incr('failed')
+                        results = e
+                    fkey, call = leading.pop(norm)
+                    if isinstance(results, Exception):
+                        flight.finish(fkey, call, error=results)
+                    else:
+                        flight.finish(fkey, call, result=copy.deepcopy(results))
+                    _deliver(positions, results)
+        finally:
+            for fkey, call in leading.values():
+                # never leave joined callers waiting on a query this batch did not get to
+                flight.finish(fkey, call, error=RuntimeError('batch search was interrupted'))
+
+        for call, positions in following:
+            try:
+                flight.wait(call)
+                if call.error is None:
+                    results = copy.deepcopy(call.result)
+                else:
+                    # the other caller's failure may be its own: search this query ourselves
+                    results = search_serper(queries[positions[0]], api_key=api_key, max_results=max_results,
+                                            use_cache=use_cache, allow_stale=allow_stale)
+            except Exception as e:
+                sp.incr('failed')
+                results = e
+            _deliver(positions, results)
+        return out
@@ -0,0 +1,116 @@
+# src/utils/extractive.py
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.tracing import count, current_span
+
+# Which summarizer safe_summarize* use:
+# - 'auto': extractive for short inputs (e.g. search snippets) and for longer ones whose top
+#   sentences already cover most of the text, the LLM for everything else; a text of at most
+#   max_sentences sentences is already its own summary and never goes to the LLM
+# - 'llm': always the LLM (previous behaviour)
+# - 'extractive': never the LLM
+SUMMARY_TIER = os.getenv('SUMMARY_TIER', 'auto')
+# In 'auto', texts up to this many characters are always summarized extractively
+SUMMARY_LLM_MIN_CHARS = int(os.getenv('SUMMARY_LLM_MIN_CHARS', '600'))
+# In 'auto', longer texts stay extractive when the picked sentences carry at least this
+# share of the text's TF-IDF weight
+SUMMARY_EXTRACTIVE_MIN_COVERAGE = float(os.getenv('SUMMARY_EXTRACTIVE_MIN_COVERAGE', '0.7'))
+
+TIERS = ('auto', 'llm', 'extractive')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[])')
+_WORD = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset('''
+a an and are as at be but by can do for from has have how if in into is it its of on or so that
+the their then there these this to was we what when which while will with you your
+'''.split())
+
+_stats = {'extractive': 0, 'llm': 0}
+_stats_lock = threading.Lock()
+
+def split_sentences(text: str) -> List[str]:
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    return [s for s in _SENTENCE_END.split(text) if s]
+
+def _term_weights(sentences: List[str]) -> np.ndarray:
+    """TF-IDF matrix, one row per sentence."""
+    vocab: Dict[str, int] = {}
+    rows = [[vocab.setdefault(w, len(vocab)) for w in _WORD.findall(s.lower()) if w not in _STOPWORDS]
+            for s in sentences]
+    tf = np.zeros((len(sentences), len(vocab)))
+    for i, row in enumerate(rows):
+        np.add.at(tf[i], row, 1.0)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1.0
+    return tf * idf
+
+def _textrank(weights: np.ndarray, damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """PageRank over the cosine-similarity graph of the sentences."""
+    n = weights.shape[0]
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    unit = np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+    sim = unit @ unit.T
+    np.fill_diagonal(sim, 0.0)
+    out_weight = sim.sum(axis=1, keepdims=True)
+    # sentences sharing no terms with the others link to every sentence equally
+    trans = np.divide(sim, out_weight, out=np.full_like(sim, 1.0 / n), where=out_weight > 0)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        new = (1 - damping) / n + damping * (trans.T @ rank)
+        if np.abs(new - rank).sum() < 1e-6:
+            return new
+        rank = new
+    return rank
+
+def _extract(text: str, max_sentences: int) -> Tuple[str, float]:
+    """(summary, coverage): the top sentences in their original order and the share of TF-IDF weight they carry."""
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return ' '.join(sentences), 1.0
+    weights = _term_weights(sentences)
+    picked = np.sort(np.argsort(-_textrank(weights), kind='stable')[:max_sentences])
+    mass = weights.sum(axis=0)
+    total = mass.sum()
+    coverage = float(mass[weights[picked].sum(axis=0) > 0].sum() / total) if total > 0 else 1.0
+    return ' '.join(sentences[i] for i in picked), coverage
+
+def extractive_summary(text: str, max_sentences: int = 3) -> str:
+    """The max_sentences most central sentences of text (TextRank over TF-IDF vectors), in text order."""
+    return _extract(text, max_sentences)[0]
+
+def _record(tier: str) -> None:
+    with _stats_lock:
+        _stats[tier] += 1
+    count(f'summary.tier.{tier}')
+    current_span().incr(f'tier_{tier}')
+
+def try_extractive(text: str, max_sentences: int = 3, tier: Optional[str] = None) -> Optional[str]:
+    """
+    Tier decision for one non-empty text: the extractive summary when `tier` (default
+    SUMMARY_TIER) allows it, or None when the text should go to the LLM. Every decision
+    is counted (summary_tier_stats, and 'summary.tier.*' in the run trace).
+    """
+    tier = (tier or SUMMARY_TIER).lower()
+    if tier not in TIERS:
+        raise ValueError(f"Unknown summary tier '{tier}'. Allowed: {', '.join(TIERS)}")
+    if tier == 'llm':
+        _record('llm')
+        return None
+    # a text of at most max_sentences sentences comes back whole with coverage 1.0:
+    # it is its own summary, so one- or two-sentence snippets never reach the model
+    summary, coverage = _extract(text, max_sentences)
+    if tier == 'auto' and len(text) > SUMMARY_LLM_MIN_CHARS and coverage < SUMMARY_EXTRACTIVE_MIN_COVERAGE:
+        _record('llm')
+        return None
+    _record('extractive')
+    return summary
+
+def summary_tier_stats() -> Dict[str, object]:
+    """Texts summarized per tier since start, plus the configured mode."""
+    with _stats_lock:
+        return dict(_stats, mode=SUMMARY_TIER)
@@ -0,0 +1,165 @@
+# src/utils/fanout.py
+import contextvars
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+# Defaults for per-topic fan-out; override per call or with environment variables
+DEFAULT_WORKERS = int(os.getenv('PIPELINE_TOPIC_WORKERS', '1'))
+DEFAULT_MODE = os.getenv('PIPELINE_POOL_MODE', 'thread')
+# Start method of 'process' pools. Not fork: pools are created from threads (concurrent DAG
+# stages, stream consumers), and a forked child can inherit a lock another thread held at
+# that moment and hang forever.
+PROCESS_START_METHOD = os.getenv('PIPELINE_PROCESS_START', 'spawn')
+
+class FanOutResult(NamedTuple):
+    item: Any
+    ok: bool
+    value: Any = None
+    error: Optional[BaseException] = None
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(PROCESS_START_METHOD))
+
+def _call(fn: Callable, item: Any) -> FanOutResult:
+    try:
+        return FanOutResult(item, True, fn(item))
+    except Exception as e:
+        return FanOutResult(item, False, None, e)
+
+def fan_out(fn: Callable[[Any], Any], items: Iterable[Any], workers: Optional[int] = None,
+            mode: Optional[str] = None,
+            on_result: Optional[Callable[[FanOutResult], None]] = None) -> List[FanOutResult]:
+    """
+    Apply fn to every item, optionally on a worker pool, and return one FanOutResult per
+    item in input order. A failing item is captured in its result instead of raising, so
+    one topic cannot take the others down.
+
+    - workers <= 1 runs inline (no pool)
+    - mode 'thread' (default): tasks run in copies of the caller's contextvars, so the run
+      deadline and retry budget are shared
+    - mode 'process': fn and items must be picklable (module-level functions); workers are
+      fresh interpreters (PROCESS_START_METHOD, spawn by default), so each has its own caches
+      and run context and only sees configuration from imports and environment variables
+
+    on_result, if given, is called in the calling thread for each result as soon as it
+    finishes (completion order), e.g. to checkpoint progress.
+    """
+    items = list(items)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    mode = (mode or DEFAULT_MODE).lower()
+    if mode not in ('thread', 'process'):
+        raise ValueError(f"Unknown pool mode '{mode}'. Allowed: thread, process")
+    workers = min(workers, len(items))
+    if workers <= 1:
+        out = []
+        for item in items:
+            res = _call(fn, item)
+            if on_result is not None:
+                on_result(res)
+            out.append(res)
+        return out
+
+    if mode == 'process':
+        pool = _process_pool(workers)
+        submit = lambda item: pool.submit(_call, fn, item)
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='topic')
+        submit = lambda item: pool.submit(contextvars.copy_context().run, _call, fn, item)
+    with pool:
+        futures = [submit(item) for item in items]
+        if on_result is not None:
+            for f in as_completed(futures):
+                on_result(f.result())
+        return [f.result() for f in futures]
+
+def stream_fan_out(produce: Callable[[Callable[[Any], None]], None], fn: Callable[[Any], Any],
+                   workers: Optional[int] = None, mode: Optional[str] = None,
+                   max_queue: Optional[int] = None,
+                   on_result: Optional[Callable[[FanOutResult], None]] = None) -> List[FanOutResult]:
+    """
+    Producer/consumer variant of fan_out for items that become available over time (e.g.
+    search results arriving request by request). produce(emit) runs in the calling thread
+    and calls emit(item) for each item; meanwhile `workers` consumer threads (at least one,
+    so producing and consuming always overlap) apply fn to the queued items. emit blocks
+    while max_queue items (default 2 * workers) are waiting, so a fast producer cannot run
+    far ahead of the consumers.
+
+    Returns one FanOutResult per emitted item, in emit order. If produce raises, items
+    still queued are dropped and the exception is re-raised once the consumers stopped.
+    mode 'process' runs fn in a pool of `workers` processes fed by the consumer threads
+    (same picklability rules as fan_out).
+
+    on_result, if given, is called for each result as soon as it finishes (completion
+    order). It runs in the consumer threads, one call at a time; if it raises, the
+    remaining items are dropped and the exception is re-raised like one from produce.
+    """
+    workers = max(1, DEFAULT_WORKERS if workers is None else workers)
+    mode = (mode or DEFAULT_MODE).lower()
+    if mode not in ('thread', 'process'):
+        raise ValueError(f"Unknown pool mode '{mode}'. Allowed: thread, process")
+    pending: queue.Queue = queue.Queue(maxsize=max_queue or 2 * workers)
+    done = {}
+    cancelled = threading.Event()
+    procs = _process_pool(workers) if mode == 'process' else None
+    report_lock = threading.Lock()
+    report_errors: List[BaseException] = []
+
+    def _run(item: Any) -> FanOutResult:
+        if procs is None:
+            return _call(fn, item)
+        try:
+            return procs.submit(_call, fn, item).result()
+        except Exception as e:
+            # e.g. a worker process died
+            return FanOutResult(item, False, None, e)
+
+    def _consume():
+        while True:
+            entry = pending.get()
+            if entry is None:
+                return
+            index, item = entry
+            if cancelled.is_set():
+                continue
+            done[index] = res = _run(item)
+            if on_result is None:
+                continue
+            with report_lock:
+                if cancelled.is_set():
+                    continue
+                try:
+                    on_result(res)
+                except BaseException as e:
+                    report_errors.append(e)
+                    cancelled.set()
+
+    # each consumer runs in its own copy of the caller's contextvars (deadline, retry budget, tracer)
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(_consume,),
+                                name=f'consumer-{i}', daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    emitted = [0]
+
+    def emit(item: Any) -> None:
+        pending.put((emitted[0], item))
+        emitted[0] += 1
+
+    try:
+        produce(emit)
+    except BaseException:
+        cancelled.set()
+        raise
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for t in threads:
+            t.join()
+        if procs is not None:
+            procs.shutdown()
+    if report_errors:
+        raise report_errors[0]
+    return [done[i] for i in range(emitted[0])]
@@ -0,0 +1,104 @@
+# src/utils/json_stream.py
+import json
+from typing import Any, Iterable, Iterator, List
+
+_WS = ' \t\r\n'
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a top-level JSON array of objects embedded in model output.
+
+    Feed text chunks as they arrive; feed() returns every array element that has been
+    completed by that chunk (already decoded with json.loads). Text before the array
+    (e.g. "Sure, here are your questions:") is skipped, and `done` becomes True once the
+    top-level array is closed so the caller can stop generation early.
+    Elements that fail to decode are skipped, mirroring the lenient parsing in the agents.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._started = False
+        self._pending_open = False   # saw '[' but not yet the first element
+        self._depth = 0              # nesting depth inside the top-level array
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        out = []
+        if self.done or not chunk:
+            return out
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                self._scan_preamble(ch)
+                continue
+            if self._depth == 0:
+                # between elements of the top-level array
+                if ch in _WS or ch == ',':
+                    continue
+                if ch == ']':
+                    self.done = True
+                    continue
+                if ch in '{[':
+                    self._depth = 1
+                    self._buf = [ch]
+                    continue
+                # scalar elements are not expected; ignore stray characters
+                continue
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        out.append(json.loads(''.join(self._buf)))
+                    except ValueError:
+                        pass
+                    self._buf = []
+        return out
+
+    def _scan_preamble(self, ch: str) -> None:
+        # Only accept '[' when the next non-whitespace character opens an object or closes
+        # the array, so prose like "here are [5] questions" does not start parsing.
+        if self._pending_open:
+            if ch in _WS:
+                return
+            self._pending_open = False
+            if ch == '{':
+                self._started = True
+                self._depth = 1
+                self._buf = [ch]
+            elif ch == ']':
+                self._started = True
+                self.done = True
+            elif ch == '[':
+                self._pending_open = True
+            return
+        if ch == '[':
+            self._pending_open = True
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """
+    Yield elements of the first JSON array found in a stream of text chunks.
+    Stops pulling chunks as soon as the array is closed; closing the source generator is
+    left to the caller (use contextlib.closing or let the generator be garbage collected).
+    """
+    parser = JSONArrayStreamParser()
+    for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+        if parser.done:
+            return
@@ -1,123 +1,431 @@
 # src/utils/llm.py
-import subprocess
-import tempfile
 import os
-from typing import Optional, Tuple
+import asyncio
+import re
+import time
+import weakref
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-def _run_proc(cmd, input_text: Optional[str] = None, timeout: int = 60) -> Tuple[int, str, str]:
+from src.utils.extractive import try_extractive
+from src.utils.llm_cache import get_llm_cache, make_cache_key
+from src.utils.llm_backends import (
+    OllamaConnectionError,
+    backend_cacheable,
+    get_backend,
+    report_failure,
+    report_success,
+    select_backend,
+)
+from src.utils.llm_policy import CircuitOpenError, get_policy, llm_health
+from src.utils.retry import DeadlineExceeded, current_context
+from src.utils.singleflight import get_group
+from src.utils.tracing import count, current_span, end_span, span, start_span
+
+# Backend used by call_ollama: 'auto' probes the registered backends once (HTTP first,
+# then the CLI variants) and sticks with the first that works; 'cli' restricts the probe
+# to CLI backends; any registered name ('http', 'cli-stdin', 'stub', ...) forces one.
+OLLAMA_BACKEND = os.getenv('OLLAMA_BACKEND', 'auto')
+
+# Upper bound on concurrent model calls issued through the *_async helpers
+OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '4'))
+
+# one semaphore per event loop (asyncio primitives cannot be shared across loops)
+_async_semaphores = weakref.WeakKeyDictionary()
+
+def preload_model(model: str = 'llama3.2:3b', timeout: int = 120) -> bool:
+    """
+    Ask the Ollama server to load `model` and keep it resident.
+    Best-effort: returns False instead of raising when the server is not reachable.
     """
-    Run subprocess and return (returncode, stdout, stderr).
-    Uses text mode with explicit UTF-8 decoding and 'replace' for errors so it won't crash on non-CP1252 bytes on Windows.
+    return get_backend('http').preload(model, timeout=timeout)
+
+def answers_cacheable(backend: Optional[str] = None) -> bool:
+    """
+    False when calls made with `backend` (default OLLAMA_BACKEND) are answered by a stand-in
+    such as the stub backend: its answers must not be cached, and callers keep them out of
+    their own persistent stores too, so a later run against the real model never sees them.
     """
+    return backend_cacheable(backend or OLLAMA_BACKEND)
+
+def _cache_lookup(cache, key: str) -> Optional[str]:
     try:
-        proc = subprocess.run(
-            cmd,
-            input=input_text,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",    # force utf-8 decoding
-            errors="replace",    # replace undecodable bytes instead of raising
-            timeout=timeout
-        )
-        stdout = proc.stdout if proc.stdout is not None else ""
-        stderr = proc.stderr if proc.stderr is not None else ""
-        return proc.returncode, stdout.strip(), stderr.strip()
-    except FileNotFoundError:
-        raise RuntimeError("ollama CLI not found. Make sure `ollama` is installed and in PATH.")
-    except subprocess.TimeoutExpired as e:
-        raise RuntimeError(f"ollama call timed out after {timeout}s") from e
-    except Exception as e:
-        # convert any unexpected error into a clear RuntimeError
-        raise RuntimeError(f"Error running subprocess: {e}") from e
+        return cache.get(key)
+    except Exception:
+        return None
 
-def call_ollama(prompt: str, model: str = 'llama3.2:3b', timeout: int = 60) -> str:
+def _cache_store(cache, key: str, value: str, model: str) -> None:
+    try:
+        cache.set(key, value, model=model)
+    except Exception:
+        # caching is best-effort
+        pass
+
+def call_ollama(
+    prompt: str,
+    model: str = 'llama3.2:3b',
+    timeout: Optional[float] = None,
+    backend: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    task: Optional[str] = None,
+) -> str:
     """
-    Robust wrapper to call Ollama CLI with multiple invocation strategies.
-    Tries:
-      1) `ollama run <model>` with prompt passed in stdin
-      2) `ollama run <model> --prompt "<prompt>"`
-      3) write prompt to a temp file and call `ollama run <model> --prompt-file <file>`
+    Call the local model, serving repeated (model, prompt, options) requests from the shared
+    on-disk cache (src/utils/llm_cache.py). Pass use_cache=False, or set LLM_CACHE_DISABLED=1,
+    to always hit the model. `options` are Ollama generation options (temperature, num_predict...)
+    and are only forwarded by the HTTP backend. Answers of the stub backend are never cached
+    (see answers_cacheable).
+
+    With timeout=None the timeout is derived from the model's recent latency on the same
+    `task` ('summary', 'quiz', ...; src/utils/llm_policy.py); either way it is clipped to the current run's deadline
+    (src/utils/retry.py), raising DeadlineExceeded once that has passed. While the model's
+    circuit breaker is open this raises CircuitOpenError immediately so callers can use their
+    fallbacks; cached answers are still served.
 
-    Returns model output (stdout) or raises RuntimeError with helpful stderr.
+    Identical calls (same model, prompt, options and backend) made while one is already in
+    flight wait for it and share its answer instead of running the model again; if that call
+    fails they run it themselves (src/utils/singleflight.py; counts via singleflight_stats()).
     """
     if not prompt:
         return ''
 
-    last_err = None
+    with span('llm.call', model=model, prompt_chars=len(prompt)) as sp:
+        cache = get_llm_cache() if use_cache and answers_cacheable(backend) else None
+        key = make_cache_key(model, prompt, options)
+        if cache is not None:
+            cached = _cache_lookup(cache, key)
+            if cached is not None:
+                sp.set(cache_hit=1, response_chars=len(cached))
+                return cached
 
-    # Strategy 1: run and pass prompt via stdin (works on many versions)
-    cmd1 = ['ollama', 'run', model]
-    rc, out, err = _run_proc(cmd1, input_text=prompt, timeout=timeout)
-    if rc == 0 and out:
-        return out
-    last_err = f"rc={rc}, stderr={err}"
+        ran = []
 
-    # Strategy 2: pass prompt as --prompt argument
-    try:
-        cmd2 = ['ollama', 'run', model, '--prompt', prompt]
-        rc, out, err = _run_proc(cmd2, input_text=None, timeout=timeout)
-        if rc == 0 and out:
+        def _generate() -> str:
+            ran.append(True)
+            out = _call_ollama_uncached(prompt, model=model, timeout=timeout, backend=backend, options=options,
+                                       task=task)
+            if cache is not None and out:
+                _cache_store(cache, key, out, model)
             return out
-        last_err = f"rc={rc}, stderr={err}"
-    except Exception:
-        # continue to next strategy
-        pass
 
-    # Strategy 3: write prompt to a temp file and use --prompt-file (if supported)
+        out = get_group('llm').do(('call', key, backend or OLLAMA_BACKEND), _generate)
+        sp.set(response_chars=len(out), coalesced=int(not ran))
+        return out
+
+def _call_ollama_uncached(
+    prompt: str,
+    model: str = 'llama3.2:3b',
+    timeout: Optional[float] = None,
+    backend: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    task: Optional[str] = None,
+) -> str:
+    """
+    Run one prompt on the selected backend (see src/utils/llm_backends.py).
+    The backend is chosen by a one-time capability probe, so a failing invocation style is
+    not retried on every prompt. Returns the model output or raises RuntimeError.
+    """
+    impl = select_backend(backend or OLLAMA_BACKEND)
+    policy = get_policy(model)
+    # never wait past the current run's deadline (raises DeadlineExceeded once it has passed)
+    call_timeout = current_context().clip_timeout(policy.timeout_for(timeout, task))
+    current_span().set(backend=impl.name, timeout_s=call_timeout)
+    policy.before_call()
+    t0 = time.monotonic()
     try:
-        with tempfile.NamedTemporaryFile('w+', delete=False, encoding='utf-8', suffix='.txt') as tf:
-            tf.write(prompt)
-            tf.flush()
-            tmp_path = tf.name
-        cmd3 = ['ollama', 'run', model, '--prompt-file', tmp_path]
-        rc, out, err = _run_proc(cmd3, input_text=None, timeout=timeout)
+        out = impl.generate(prompt, model, call_timeout, options)
+        if not out:
+            raise RuntimeError(f"ollama backend '{impl.name}' returned an empty response")
+    except Exception as e:
+        policy.record_failure()
+        report_failure(impl.name, fatal=isinstance(e, OllamaConnectionError))
+        raise
+    policy.record_success(time.monotonic() - t0, task)
+    report_success(impl.name)
+    return out
+
+def stream_ollama(
+    prompt: str,
+    model: str = 'llama3.2:3b',
+    timeout: Optional[float] = None,
+    backend: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    cache_partial: bool = False,
+    task: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Generator variant of call_ollama that yields text chunks as the model produces them.
+    Closing the generator early (e.g. once the JSON you need is complete) stops generation:
+    the HTTP stream is closed or the `ollama run` process is killed.
+    A cached completion is yielded as one chunk. Completions are cached when the stream is
+    consumed to the end, or also when the consumer stops early if cache_partial=True (for
+    callers that only need a prefix of the output, like the JSON-array parsers).
+
+    A stream started while an identical one is in flight waits for it and yields its text as
+    one chunk; if that stream failed or was stopped early it runs its own generation.
+    """
+    if not prompt:
+        return
+
+    # not a with-block: the span must not become the caller's active span between yields
+    sp = start_span('llm.stream', model=model, prompt_chars=len(prompt))
+    cache = get_llm_cache() if use_cache and answers_cacheable(backend) else None
+    key = make_cache_key(model, prompt, options)
+    if cache is not None:
+        cached = _cache_lookup(cache, key)
+        if cached is not None:
+            sp.set(cache_hit=1, response_chars=len(cached))
+            end_span(sp)
+            yield cached
+            return
+
+    flight = get_group('llm')
+    flight_key = ('stream', key, backend or OLLAMA_BACKEND, cache_partial)
+    leader, call = flight.begin(flight_key)
+    if not leader:
         try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
-        if rc == 0 and out:
-            return out
-        last_err = f"rc={rc}, stderr={err}"
+            flight.wait(call)
+        except DeadlineExceeded as e:
+            end_span(sp, e)
+            raise
+        if call.result:
+            sp.set(coalesced=1, response_chars=len(call.result))
+            end_span(sp)
+            yield call.result
+            return
+    shared = []
+    try:
+        yield from _stream_uncached(prompt, model, timeout, backend, options, cache, key, cache_partial, sp,
+                                    on_output=shared.append, task=task)
+    finally:
+        if leader:
+            flight.finish(flight_key, call, result=shared[0] if shared else None)
+
+def _stream_uncached(prompt, model, timeout, backend, options, cache, key, cache_partial, sp,
+                     on_output: Callable[[str], None], task: Optional[str] = None) -> Iterator[str]:
+    """Body of stream_ollama once cache and coalescing are ruled out; reports usable output."""
+    try:
+        impl = select_backend(backend or OLLAMA_BACKEND)
+        policy = get_policy(model)
+        call_timeout = current_context().clip_timeout(policy.timeout_for(timeout, task))
+        sp.set(backend=impl.name, timeout_s=call_timeout)
+        policy.before_call()
+    except Exception as e:
+        end_span(sp, e)
+        raise
+    t0 = time.monotonic()
+    try:
+        chunks = impl.stream(prompt, model, call_timeout, options)
+    except Exception as e:
+        policy.record_failure()
+        report_failure(impl.name, fatal=isinstance(e, OllamaConnectionError))
+        end_span(sp, e)
+        raise
+
+    parts = []
+    completed = False
+    failed = None
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        completed = True
+    except Exception as e:
+        failed = e
+        policy.record_failure()
+        report_failure(impl.name, fatal=isinstance(e, OllamaConnectionError))
+        raise
+    finally:
+        chunks.close()
+        out = ''.join(parts).strip()
+        sp.set(response_chars=len(out), stopped_early=int(not completed and not failed))
+        end_span(sp, failed)
+        if failed is None:
+            # latency of a stream stopped early still reflects a healthy model
+            policy.record_success(time.monotonic() - t0, task)
+            report_success(impl.name)
+        if out and failed is None and (completed or cache_partial):
+            on_output(out)
+            if cache is not None:
+                _cache_store(cache, key, out, model)
+
+class FallbackSummary(str):
+    """A summary that is only the truncated input because the model call failed."""
+
+def _fallback_summary(text: str) -> str:
+    # fallback: keep a short snippet of the input as a minimal summary
+    try:
+        snippet = text.strip().replace("\\n", " ")
+        snippet = snippet[:240] + ("..." if len(snippet) > 240 else "")
+        return FallbackSummary(snippet)
     except Exception:
-        # ignore and fall through
-        pass
+        return FallbackSummary("")
 
-    # If we reach here, all strategies failed. Raise informative error.
-    help_msg = (
-        "Failed to call ollama with the tried invocation methods.\n"
-        "Last error: " + str(last_err) + "\n\n"
-        "Suggestions:\n"
-        " - Run `ollama run --help` locally to inspect supported flags for your version.\n"
-        " - Try `ollama run <model>` in a terminal and paste a short prompt to see expected behavior.\n"
-        " - If your Ollama supports a different flag, edit src/utils/llm.py to add that strategy.\n"
+def _summary_prompt(text: str, max_sentences: int) -> str:
+    # Keep prompt short to reduce token usage and avoid long outputs
+    return (
+        "You are a concise summarizer. Summarize the following text in "
+        f"{max_sentences} short sentences and then give 3 bullet takeaways.\n\n"
+        f"Text:\n{text}\n\nSummary:"
     )
-    raise RuntimeError(help_msg)
 
+def _summary_from_output(text: str, out: str) -> str:
+    # If the model echoes the input and doesn't give a summary, be defensive:
+    if not out or len(out.strip()) < 10:
+        return (text[:200] + '...') if len(text) > 200 else text
+    return out.strip()
 
-def safe_summarize(text: str, model: str = 'llama3.2:3b', max_sentences: int = 3) -> str:
+def safe_summarize(text: str, model: str = 'llama3.2:3b', max_sentences: int = 3, use_cache: bool = True) -> str:
     """
     A small helper to produce concise summaries from LLM.
-    If the LLM call fails, returns a short truncated fallback summary.
+    Short or simple texts get a local extractive summary instead (see SUMMARY_TIER in
+    src/utils/extractive.py). If the LLM call fails, returns a short truncated fallback summary
+    (a FallbackSummary, so callers can tell it from a real one).
     """
     if not text:
         return ''
-    # Keep prompt short to reduce token usage and avoid long outputs
-    prompt = (
-        "You are a concise summarizer. Summarize the following text in "
-        f"{max_sentences} short sentences and then give 3 bullet takeaways.\n\n"
-        f"Text:\n{text}\n\nSummary:"
-    )
+    summary = try_extractive(text, max_sentences)
+    if summary is not None:
+        return summary
+    return _summarize_with_llm(text, model, max_sentences, use_cache)
+
+def _summarize_with_llm(text: str, model: str, max_sentences: int, use_cache: bool) -> str:
     try:
-        out = call_ollama(prompt, model=model, timeout=60)
-        # If the model echoes the input and doesn't give a summary, be defensive:
-        if not out or len(out.strip()) < 10:
-            return (text[:200] + '...') if len(text) > 200 else text
-        return out.strip()
+        out = call_ollama(_summary_prompt(text, max_sentences), model=model, use_cache=use_cache, task='summary')
     except Exception:
-        # fallback: keep a short snippet of the input as a minimal summary
+        count('fallback.summary')
+        return _fallback_summary(text)
+    return _summary_from_output(text, out)
+
+def set_llm_concurrency(limit: int) -> None:
+    """Change the cap on concurrent model calls made through call_ollama_async."""
+    global OLLAMA_MAX_CONCURRENCY
+    OLLAMA_MAX_CONCURRENCY = max(1, int(limit))
+    _async_semaphores.clear()
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _async_semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(OLLAMA_MAX_CONCURRENCY)
+        _async_semaphores[loop] = sem
+    return sem
+
+async def call_ollama_async(
+    prompt: str,
+    model: str = 'llama3.2:3b',
+    timeout: Optional[float] = None,
+    backend: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    task: Optional[str] = None,
+) -> str:
+    """
+    Awaitable call_ollama. At most OLLAMA_MAX_CONCURRENCY calls (see set_llm_concurrency)
+    run at once per event loop; the blocking call itself runs in a worker thread (its
+    llm.call span nests under this call's llm.call_async span, which records the time
+    spent waiting for a slot).
+    """
+    if not prompt:
+        return ''
+    with span('llm.call_async', model=model, prompt_chars=len(prompt)) as sp:
+        t0 = time.monotonic()
+        async with _llm_semaphore():
+            sp.set(queued_s=time.monotonic() - t0)
+            return await asyncio.to_thread(
+                call_ollama, prompt, model=model, timeout=timeout, backend=backend, options=options,
+                use_cache=use_cache, task=task
+            )
+
+async def safe_summarize_async(text: str, model: str = 'llama3.2:3b', max_sentences: int = 3, use_cache: bool = True) -> str:
+    """Async counterpart of safe_summarize with the same tiers and fallbacks."""
+    if not text:
+        return ''
+    summary = try_extractive(text, max_sentences)
+    if summary is not None:
+        return summary
+    try:
+        out = await call_ollama_async(_summary_prompt(text, max_sentences), model=model, use_cache=use_cache,
+                                      task='summary')
+    except Exception:
+        count('fallback.summary')
+        return _fallback_summary(text)
+    return _summary_from_output(text, out)
+
+_SUMMARY_MARKER = re.compile(r"^[ \t>*#]*SUMMARY\s+(\d+)\s*:?[ \t*#]*$", re.I | re.M)
+
+def _build_batch_summary_prompt(texts: List[str], max_sentences: int) -> str:
+    parts = [
+        f"You are a concise summarizer. Summarize each of the {len(texts)} texts below separately in "
+        f"{max_sentences} short sentences and then give 3 bullet takeaways.\n"
+        "Start each summary with its own header line exactly like `### SUMMARY <number>` "
+        "using the number of the text, and do not write anything else.\n"
+    ]
+    for i, text in enumerate(texts, 1):
+        parts.append(f"### TEXT {i}\n{text}\n")
+    parts.append("Summaries:")
+    return "\n".join(parts)
+
+def _split_batch_summaries(out: str, n: int) -> Dict[int, str]:
+    """Map 0-based item index -> summary text for every well-formed section of a batch answer."""
+    found = {}
+    matches = list(_SUMMARY_MARKER.finditer(out or ''))
+    for j, m in enumerate(matches):
+        idx = int(m.group(1)) - 1
+        end = matches[j + 1].start() if j + 1 < len(matches) else len(out)
+        body = out[m.end():end].strip()
+        if 0 <= idx < n and idx not in found and len(body) >= 10:
+            found[idx] = body
+    return found
+
+def safe_summarize_batch(
+    texts: List[str],
+    model: str = 'llama3.2:3b',
+    max_sentences: int = 3,
+    batch_size: int = 4,
+    use_cache: bool = True,
+) -> List[str]:
+    """
+    Summarize many texts with one LLM call per `batch_size` texts.
+    Each batch is sent as a single delimited prompt and the answer is split back per text;
+    texts whose section is missing or unusable are summarized individually with safe_summarize.
+    Texts the extractive tier handles (see safe_summarize) never reach the LLM.
+    Returns summaries in input order (empty string for empty input).
+    """
+    summaries = [''] * len(texts)
+    pending = []
+    for i, t in enumerate(texts):
+        if not t:
+            continue
+        summary = try_extractive(t, max_sentences)
+        if summary is None:
+            pending.append(i)
+        else:
+            summaries[i] = summary
+    if batch_size <= 1:
+        for i in pending:
+            summaries[i] = _summarize_with_llm(texts[i], model, max_sentences, use_cache)
+        return summaries
+
+    for start in range(0, len(pending), batch_size):
+        idxs = pending[start:start + batch_size]
+        if len(idxs) == 1:
+            summaries[idxs[0]] = _summarize_with_llm(texts[idxs[0]], model, max_sentences, use_cache)
+            continue
+        prompt = _build_batch_summary_prompt([texts[i] for i in idxs], max_sentences)
         try:
-            snippet = text.strip().replace("\\n", " ")
-            snippet = snippet[:240] + ("..." if len(snippet) > 240 else "")
-            return snippet
+            out = call_ollama(prompt, model=model, timeout=60 + 30 * len(idxs), use_cache=use_cache,
+                              task='summary_batch')
         except Exception:
-            return ""
+            out = ''
+        found = _split_batch_summaries(out, len(idxs))
+        if len(found) < len(idxs):
+            count('summary_batch.split_misses', len(idxs) - len(found))
+        for j, i in enumerate(idxs):
+            if j in found:
+                summaries[i] = found[j]
+            else:
+                # batch answer could not be split for this item: fall back to a single call
+                summaries[i] = _summarize_with_llm(texts[i], model, max_sentences, use_cache)
+    return summaries
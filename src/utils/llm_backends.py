@@ -0,0 +1,459 @@
+# src/utils/llm_backends.py
+import codecs
+import functools
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# How long the server should keep the model loaded after a request (Ollama duration string)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '10m')
+# Consecutive failures of the selected backend before capabilities are probed again
+REPROBE_AFTER = int(os.getenv('OLLAMA_REPROBE_AFTER', '3'))
+
+_HELP_MSG = (
+    "Suggestions:\n"
+    " - Make sure the Ollama server is running (`ollama serve`) and OLLAMA_HOST points at it.\n"
+    " - Run `ollama run --help` locally to inspect supported flags for your version.\n"
+    " - Try `ollama run <model>` in a terminal and paste a short prompt to see expected behavior.\n"
+    " - If your Ollama supports a different flag, register a backend in src/utils/llm_backends.py.\n"
+)
+
+class OllamaConnectionError(RuntimeError):
+    """Raised when the Ollama server cannot be reached over HTTP."""
+
+def _run_proc(cmd, input_text: Optional[str] = None, timeout: int = 60) -> Tuple[int, str, str]:
+    """
+    Run subprocess and return (returncode, stdout, stderr).
+    Uses text mode with explicit UTF-8 decoding and 'replace' for errors so it won't crash on non-CP1252 bytes on Windows.
+    """
+    try:
+        proc = subprocess.run(
+            cmd,
+            input=input_text,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",    # force utf-8 decoding
+            errors="replace",    # replace undecodable bytes instead of raising
+            timeout=timeout
+        )
+        stdout = proc.stdout if proc.stdout is not None else ""
+        stderr = proc.stderr if proc.stderr is not None else ""
+        return proc.returncode, stdout.strip(), stderr.strip()
+    except FileNotFoundError:
+        raise RuntimeError("ollama CLI not found. Make sure `ollama` is installed and in PATH.")
+    except subprocess.TimeoutExpired as e:
+        raise RuntimeError(f"ollama call timed out after {timeout}s") from e
+    except Exception as e:
+        # convert any unexpected error into a clear RuntimeError
+        raise RuntimeError(f"Error running subprocess: {e}") from e
+
+
+class LLMBackend:
+    """
+    One way of talking to the model. Subclasses implement probe() (a cheap capability
+    check run once at selection time) and generate(); stream() defaults to a single chunk.
+    `cacheable` says whether answers come from the real model, so they may be stored in the
+    response cache and the stores derived from them (question bank, topic index...).
+    """
+    name = 'base'
+    cacheable = True
+
+    def probe(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, model: str, timeout: float, options: Optional[Dict[str, Any]] = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, model: str, timeout: float, options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        out = self.generate(prompt, model, timeout, options)
+        if out:
+            yield out
+
+
+class OllamaHTTPBackend(LLMBackend):
+    """Ollama server API over a pooled keep-alive session; asks the server to keep the model loaded."""
+    name = 'http'
+
+    def __init__(self):
+        self._session = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def base_url() -> str:
+        """Base URL of the Ollama server; honours OLLAMA_HOST like the ollama CLI does."""
+        host = os.getenv('OLLAMA_HOST') or 'http://localhost:11434'
+        if '://' not in host:
+            host = 'http://' + host
+        return host.rstrip('/')
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def probe(self) -> bool:
+        try:
+            return self.session.get(self.base_url() + '/api/tags', timeout=2).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def _post(self, prompt: str, model: str, timeout: float, options: Optional[Dict[str, Any]], stream: bool) -> requests.Response:
+        url = self.base_url() + '/api/generate'
+        payload = {'model': model, 'prompt': prompt, 'stream': stream, 'keep_alive': OLLAMA_KEEP_ALIVE}
+        if options:
+            payload['options'] = options
+        try:
+            resp = self.session.post(url, json=payload, timeout=timeout, stream=stream)
+        except requests.Timeout as e:
+            raise RuntimeError(f"ollama HTTP call timed out after {timeout}s") from e
+        except requests.RequestException as e:
+            raise OllamaConnectionError(f"Could not reach Ollama server at {url}: {e}") from e
+        if resp.status_code != 200:
+            text = resp.text[:200]
+            resp.close()
+            raise RuntimeError(f"Ollama server returned {resp.status_code}: {text}")
+        return resp
+
+    def generate(self, prompt, model, timeout, options=None) -> str:
+        resp = self._post(prompt, model, timeout, options, stream=False)
+        try:
+            data = resp.json()
+        except ValueError as e:
+            raise RuntimeError(f"Ollama server returned invalid JSON: {resp.text[:200]}") from e
+        return (data.get('response') or '').strip()
+
+    def stream(self, prompt, model, timeout, options=None) -> Iterator[str]:
+        # open eagerly so connection errors surface before the first token is requested
+        return self._iter_stream(self._post(prompt, model, timeout, options, stream=True))
+
+    @staticmethod
+    def _iter_stream(resp: requests.Response) -> Iterator[str]:
+        # Ollama streams one JSON object per line: {"response": "<token>", "done": false}
+        try:
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                if data.get('error'):
+                    raise RuntimeError(f"Ollama server error: {data['error']}")
+                token = data.get('response') or ''
+                if token:
+                    yield token
+                if data.get('done'):
+                    return
+        except requests.RequestException as e:
+            raise RuntimeError(f"ollama HTTP stream failed: {e}") from e
+        finally:
+            # closing the connection also makes the server abort the generation
+            resp.close()
+
+    def preload(self, model: str, timeout: float = 120) -> bool:
+        """Load `model` and keep it resident (an empty prompt only loads it)."""
+        try:
+            resp = self.session.post(
+                self.base_url() + '/api/generate',
+                json={'model': model, 'keep_alive': OLLAMA_KEEP_ALIVE},
+                timeout=timeout,
+            )
+            return resp.status_code == 200
+        except requests.RequestException:
+            return False
+
+
+@functools.lru_cache(maxsize=1)
+def _ollama_run_help() -> str:
+    # run once per process; used to detect which prompt flags this CLI version supports
+    try:
+        rc, out, err = _run_proc(['ollama', 'run', '--help'], timeout=10)
+        return out + '\n' + err
+    except RuntimeError:
+        return ''
+
+
+class OllamaCLIStdinBackend(LLMBackend):
+    """`ollama run <model>` with the prompt passed on stdin."""
+    name = 'cli-stdin'
+
+    def probe(self) -> bool:
+        return shutil.which('ollama') is not None
+
+    def generate(self, prompt, model, timeout, options=None) -> str:
+        rc, out, err = _run_proc(['ollama', 'run', model], input_text=prompt, timeout=timeout)
+        if rc != 0:
+            raise RuntimeError(f"ollama run failed: rc={rc}, stderr={err}")
+        return out
+
+    def stream(self, prompt, model, timeout, options=None) -> Iterator[str]:
+        """Stream stdout; the process is killed if the consumer stops early."""
+        try:
+            proc = subprocess.Popen(
+                ['ollama', 'run', model],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError:
+            raise RuntimeError("ollama CLI not found. Make sure `ollama` is installed and in PATH.")
+        return self._iter_proc(proc, prompt, timeout)
+
+    @staticmethod
+    def _iter_proc(proc: subprocess.Popen, prompt: str, timeout: float) -> Iterator[str]:
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        produced = False
+        try:
+            proc.stdin.write(prompt.encode('utf-8'))
+            proc.stdin.close()
+            fd = proc.stdout.fileno()
+            while True:
+                data = os.read(fd, 4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    produced = True
+                    yield text
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                produced = True
+                yield tail
+            rc = proc.wait()
+            if not timer.is_alive() and rc != 0:
+                raise RuntimeError(f"ollama call timed out after {timeout}s")
+            if rc != 0 and not produced:
+                raise RuntimeError(f"ollama run exited with rc={rc}")
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+
+class OllamaCLIFlagBackend(LLMBackend):
+    """
+    `ollama run <model> --prompt "<prompt>"`, or with use_file=True
+    `ollama run <model> --prompt-file <tmp>`, for CLI versions that support those flags.
+    """
+
+    def __init__(self, flag: str = '--prompt', use_file: bool = False):
+        self.flag = flag
+        self.use_file = use_file
+        self.name = 'cli-prompt-file' if use_file else 'cli-flag'
+
+    def probe(self) -> bool:
+        if shutil.which('ollama') is None:
+            return False
+        return re.search(re.escape(self.flag) + r'(\s|$|=|,)', _ollama_run_help()) is not None
+
+    def generate(self, prompt, model, timeout, options=None) -> str:
+        if not self.use_file:
+            rc, out, err = _run_proc(['ollama', 'run', model, self.flag, prompt], timeout=timeout)
+        else:
+            with tempfile.NamedTemporaryFile('w+', delete=False, encoding='utf-8', suffix='.txt') as tf:
+                tf.write(prompt)
+                tmp_path = tf.name
+            try:
+                rc, out, err = _run_proc(['ollama', 'run', model, self.flag, tmp_path], timeout=timeout)
+            finally:
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+        if rc != 0:
+            raise RuntimeError(f"ollama run {self.flag} failed: rc={rc}, stderr={err}")
+        return out
+
+
+def _stub_response(prompt: str) -> str:
+    """Deterministic, well-formed answers for the prompts built in this repo."""
+    items = re.findall(r'^### TEXT (\d+)$', prompt, re.M)
+    if items:
+        return '\n'.join(f'### SUMMARY {i}\nStub summary of text {i}.\n- takeaway' for i in items)
+    m = re.search(r'Create (\d+) multiple-choice', prompt)
+    if m:
+        topic = (re.search(r'Topic: (.*)', prompt) or [None, 'the topic'])[1].strip()
+        # questions listed as already asked ('* ...' lines) are not repeated
+        offset = len(re.findall(r'^\* ', prompt, re.M))
+        return json.dumps([{
+            'question': f'Stub question {offset + i + 1} about {topic}?',
+            'options': ['A', 'B', 'C', 'D'],
+            'answer_index': i % 4,
+            'explanation': 'Stub explanation.',
+            'difficulty': ('easy', 'medium', 'hard')[i % 3],
+        } for i in range(int(m.group(1)))])
+    m = re.search(r'JSON array of (\d+) project', prompt)
+    if m:
+        level = (re.search(r'Expertise level: (\w+)', prompt) or [None, 'beginner'])[1]
+        topics = (re.search(r'Topics: (.*)', prompt) or [None, 'the topics'])[1].strip()
+        return json.dumps([{
+            'title': f'Stub project {i + 1} on {topics}',
+            'description': f'Practice {topics}.',
+            'difficulty': level,
+            'estimated_hours': 4 * (i + 1),
+            'steps': ['Plan', 'Build', 'Review'],
+            'required_skills': [topics],
+        } for i in range(int(m.group(1)))])
+    text = prompt.split('Text:', 1)[-1].split('Summary:', 1)[0].strip()
+    first = re.split(r'(?<=[.!?])\s+', text, maxsplit=1)[0][:200]
+    return f'Stub summary: {first}\n- takeaway one\n- takeaway two\n- takeaway three'
+
+
+class StubBackend(LLMBackend):
+    """
+    In-process deterministic backend for tests and offline runs; never touches Ollama.
+    Pass `responder(prompt, model) -> str` to control the output and `latency` (seconds)
+    to simulate inference time. Its canned answers are not cacheable unless `cacheable=True`
+    (e.g. a benchmark measuring the caches in a scratch directory).
+    """
+    name = 'stub'
+
+    def __init__(self, responder: Optional[Callable[[str, str], str]] = None, latency: float = 0.0,
+                 cacheable: bool = False):
+        self.responder = responder
+        self.latency = latency
+        self.cacheable = cacheable
+
+    def generate(self, prompt, model, timeout, options=None) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.responder is not None:
+            return self.responder(prompt, model)
+        return _stub_response(prompt)
+
+
+# --- registry -------------------------------------------------------------------------
+
+_factories: Dict[str, Callable[[], LLMBackend]] = {}
+_probe_order: List[str] = []
+_instances: Dict[str, LLMBackend] = {}
+_active: Dict[str, str] = {}         # selection group ('auto' / 'cli') -> backend name
+_failures: Dict[str, int] = {}
+_lock = threading.RLock()
+
+def register_backend(name: str, factory: Callable[[], LLMBackend], probe: bool = True, first: bool = False) -> None:
+    """
+    Register a backend factory. Backends with probe=True take part in automatic selection,
+    in registration order (or ahead of the others with first=True).
+    Re-registering a name replaces it and forgets the previous selection.
+    """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+        if name in _probe_order:
+            _probe_order.remove(name)
+        if probe:
+            if first:
+                _probe_order.insert(0, name)
+            else:
+                _probe_order.append(name)
+        _active.clear()
+
+def get_backend(name: str) -> LLMBackend:
+    with _lock:
+        if name not in _factories:
+            raise ValueError(f"Unknown LLM backend '{name}'. Registered: {sorted(_factories)} (or 'auto', 'cli')")
+        inst = _instances.get(name)
+        if inst is None:
+            inst = _factories[name]()
+            _instances[name] = inst
+        return inst
+
+def _candidates(group: str) -> List[str]:
+    if group == 'cli':
+        return [n for n in _probe_order if n.startswith('cli')]
+    return list(_probe_order)
+
+def probe_backends(group: str = 'auto') -> str:
+    """Probe candidate backends in order, remember the first that works and return its name."""
+    with _lock:
+        tried = []
+        for name in _candidates(group):
+            try:
+                ok = get_backend(name).probe()
+            except Exception:
+                ok = False
+            tried.append(f"{name}={'ok' if ok else 'unavailable'}")
+            if ok:
+                _active[group] = name
+                _failures[name] = 0
+                return name
+        _active.pop(group, None)
+    raise RuntimeError("No working LLM backend found (" + ', '.join(tried) + ").\n\n" + _HELP_MSG)
+
+def select_backend(preference: str = 'auto') -> LLMBackend:
+    """
+    Resolve a backend name, or the groups 'auto' / 'cli', to a backend instance.
+    Groups are probed once and the result is reused until it fails REPROBE_AFTER times in a row.
+    """
+    pref = (preference or 'auto').lower()
+    if pref not in ('auto', 'cli'):
+        return get_backend(pref)
+    with _lock:
+        name = _active.get(pref)
+        if name is None:
+            name = probe_backends(pref)
+        return get_backend(name)
+
+def backend_cacheable(preference: str = 'auto') -> bool:
+    """
+    Whether answers of the backend `preference` resolves to may be stored. Decided without
+    probing, so cached answers can still be served while the model is down: a group that has
+    not selected a backend yet counts as the real model.
+    """
+    pref = (preference or 'auto').lower()
+    with _lock:
+        name = _active.get(pref) if pref in ('auto', 'cli') else pref
+        if name is None:
+            return True
+        return get_backend(name).cacheable
+
+def report_success(name: str) -> None:
+    with _lock:
+        _failures[name] = 0
+
+def report_failure(name: str, fatal: bool = False) -> None:
+    """Count a failed call; after REPROBE_AFTER in a row (or a fatal one) the next call re-probes."""
+    with _lock:
+        _failures[name] = _failures.get(name, 0) + 1
+        if fatal or _failures[name] >= REPROBE_AFTER:
+            for group, active in list(_active.items()):
+                if active == name:
+                    del _active[group]
+            _failures[name] = 0
+
+def backend_status() -> Dict[str, Any]:
+    """Current selection and failure counters, for logging/monitoring."""
+    with _lock:
+        return {
+            'registered': list(_factories),
+            'probe_order': list(_probe_order),
+            'active': dict(_active),
+            'failures': dict(_failures),
+        }
+
+register_backend('http', OllamaHTTPBackend)
+register_backend('cli-stdin', OllamaCLIStdinBackend)
+register_backend('cli-flag', lambda: OllamaCLIFlagBackend('--prompt'))
+register_backend('cli-prompt-file', lambda: OllamaCLIFlagBackend('--prompt-file', use_file=True))
+register_backend('stub', StubBackend, probe=False)
@@ -0,0 +1,164 @@
+# src/utils/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Defaults can be overridden with environment variables
+_DEFAULT_PATH = os.getenv('LLM_CACHE_PATH', 'data/.cache/llm_cache.sqlite3')
+_DEFAULT_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '20000'))
+_DEFAULT_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+_DEFAULT_TTL = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+CREATE INDEX IF NOT EXISTS idx_entries_created_at ON entries(created_at);
+"""
+
+def make_cache_key(model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Content-addressed key: sha256 over the model, prompt and generation params."""
+    raw = json.dumps({'model': model, 'prompt': prompt, 'params': params or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class LLMCache:
+    """
+    SQLite-backed response cache.
+    - entries older than `ttl_seconds` are treated as misses and dropped
+    - when `max_entries` or `max_bytes` is exceeded the least recently used entries are evicted
+    - hit/miss/eviction counters are kept per instance, see stats()
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH, max_entries: int = _DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = _DEFAULT_MAX_BYTES, ttl_seconds: Optional[float] = _DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.executescript(_SCHEMA)
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self.misses += 1
+                self.evictions += 1
+                return None
+            self._conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return value
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """Like get(), but returns (value, age in seconds) so callers can apply their own freshness rules."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0], now - row[1]
+
+    def set(self, key: str, value: str, model: str = '') -> None:
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, model, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # caller holds the lock
+        if self.ttl_seconds:
+            cur = self._conn.execute('DELETE FROM entries WHERE created_at < ?', (now - self.ttl_seconds,))
+            self.evictions += max(cur.rowcount, 0)
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # walk entries from least recently used and drop until both caps are satisfied
+        drop = []
+        for key, size in self._conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany('DELETE FROM entries WHERE key = ?', drop)
+        self.evictions += len(drop)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'entries': count,
+            'bytes': total,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+def cache_disabled() -> bool:
+    """Global bypass flag: set LLM_CACHE_DISABLED=1 to skip the cache entirely."""
+    return os.getenv('LLM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Shared cache instance, or None when the cache is disabled or cannot be opened."""
+    global _cache
+    if cache_disabled():
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = LLMCache()
+                except (sqlite3.Error, OSError):
+                    # never let a broken cache file take the pipeline down
+                    return None
+    return _cache
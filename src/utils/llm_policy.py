@@ -0,0 +1,188 @@
+# src/utils/llm_policy.py
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Tunables (seconds unless noted); override with environment variables
+TIMEOUT_DEFAULT = float(os.getenv('LLM_TIMEOUT_DEFAULT', '60'))   # used until enough samples exist
+TIMEOUT_MIN = float(os.getenv('LLM_TIMEOUT_MIN', '10'))
+TIMEOUT_MAX = float(os.getenv('LLM_TIMEOUT_MAX', '120'))
+TIMEOUT_MULTIPLIER = float(os.getenv('LLM_TIMEOUT_MULTIPLIER', '3'))  # timeout = p95 * multiplier
+LATENCY_WINDOW = int(os.getenv('LLM_LATENCY_WINDOW', '100'))          # samples kept per model and task
+LATENCY_MIN_SAMPLES = int(os.getenv('LLM_LATENCY_MIN_SAMPLES', '5'))
+BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '3'))       # consecutive failures to open
+BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))     # open -> half-open after this
+
+DEFAULT_TASK = 'default'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while its circuit breaker is open."""
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            data = sorted(self._samples)
+        if not data:
+            return None
+        idx = min(len(data) - 1, max(0, math.ceil(q / 100.0 * len(data)) - 1))
+        return data[idx]
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `cooldown` seconds, letting a single trial call through;
+    half_open -> closed on success, or back to open (with a doubled cooldown) on failure.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.cooldown = self.base_cooldown
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self.cooldown = min(self.cooldown * 2, self.base_cooldown * 8)
+                self._open()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._trial_in_flight = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a trial call through (0 when not open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+class ModelPolicy:
+    """Latency tracking, derived timeouts and circuit breaking for one model."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.latency = LatencyTracker()       # every successful call
+        self._task_latency: Dict[str, LatencyTracker] = {}
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def timeout_for(self, requested: Optional[float] = None, task: Optional[str] = None) -> float:
+        """
+        An explicit timeout is honoured as-is. Otherwise the timeout is derived from the
+        p95 latency of recent successful calls of the same task ('summary', 'quiz', ...),
+        clamped to [TIMEOUT_MIN, TIMEOUT_MAX]; a task with too few samples gets
+        TIMEOUT_DEFAULT. Tasks are timed apart because a quiz or project list takes far
+        longer to write than a snippet summary.
+        """
+        if requested:
+            return requested
+        tracker = self._task_latency.get(task or DEFAULT_TASK)
+        if tracker is None or len(tracker) < LATENCY_MIN_SAMPLES:
+            return TIMEOUT_DEFAULT
+        p95 = tracker.percentile(95)
+        return min(TIMEOUT_MAX, max(TIMEOUT_MIN, p95 * TIMEOUT_MULTIPLIER))
+
+    def before_call(self) -> None:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(
+                f"LLM circuit for model '{self.model}' is open after repeated failures; "
+                f"retrying in {self.breaker.retry_in():.0f}s"
+            )
+        self.calls += 1
+
+    def record_success(self, seconds: float, task: Optional[str] = None) -> None:
+        self.latency.record(seconds)
+        self._task_latency.setdefault(task or DEFAULT_TASK, LatencyTracker()).record(seconds)
+        self.breaker.record_success()
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.breaker.record_failure()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'times_opened': self.breaker.times_opened,
+            'retry_in_s': round(self.breaker.retry_in(), 1),
+            'calls': self.calls,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'samples': len(self.latency),
+            'p50_s': self.latency.percentile(50),
+            'p95_s': self.latency.percentile(95),
+            'timeout_s': self.timeout_for(None),
+            'timeouts_s': {task: self.timeout_for(None, task) for task in list(self._task_latency)},
+        }
+
+_policies: Dict[str, ModelPolicy] = {}
+_policies_lock = threading.Lock()
+
+def get_policy(model: str) -> ModelPolicy:
+    policy = _policies.get(model)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.setdefault(model, ModelPolicy(model))
+    return policy
+
+def llm_health() -> Dict[str, Dict[str, Any]]:
+    """Per-model breaker state and latency stats, for monitoring."""
+    with _policies_lock:
+        policies = list(_policies.values())
+    return {p.model: p.snapshot() for p in policies}
+
+def reset_policies() -> None:
+    with _policies_lock:
+        _policies.clear()
@@ -0,0 +1,130 @@
+# src/utils/retry.py
+import contextvars
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from src.utils.llm_policy import CircuitOpenError
+from src.utils.tracing import count, current_span
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when the current run's overall deadline has passed."""
+
+class RunContext:
+    """
+    Retry/deadline state shared by everything executed during one pipeline run.
+
+    - deadline_s: wall-clock budget for the whole run (None = unbounded); timeouts of model
+      and search calls are clipped to what is left, and no retry sleeps past it
+    - retry_budget: total number of retries allowed across all layers (None = unlimited)
+    - max_attempts / base_delay / max_delay: defaults for call_with_retry
+    """
+
+    def __init__(self, deadline_s: Optional[float] = None, retry_budget: Optional[int] = None,
+                 max_attempts: int = 2, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.deadline = time.monotonic() + deadline_s if deadline_s else None
+        self.retry_budget = retry_budget
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries_used = 0
+        self.retries_denied = 0
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check_deadline(self) -> None:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded("run deadline exceeded")
+
+    def clip_timeout(self, timeout: Optional[float]) -> Optional[float]:
+        """Shrink a per-call timeout so it never runs past the run deadline."""
+        left = self.remaining()
+        if left is None:
+            return timeout
+        self.check_deadline()
+        return left if timeout is None else min(timeout, left)
+
+    def try_consume_retry(self) -> bool:
+        """Take one retry from the shared budget; False once it is used up."""
+        with self._lock:
+            if self.retry_budget is not None and self.retries_used >= self.retry_budget:
+                self.retries_denied += 1
+                return False
+            self.retries_used += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        left = self.remaining()
+        return {
+            'retries_used': self.retries_used,
+            'retries_denied': self.retries_denied,
+            'retry_budget': self.retry_budget,
+            'deadline_remaining_s': None if left is None else round(left, 1),
+        }
+
+_current: contextvars.ContextVar = contextvars.ContextVar('run_context', default=None)
+_default_context = RunContext()
+
+def current_context() -> RunContext:
+    """The RunContext of the active run, or an unbounded default outside of one."""
+    return _current.get() or _default_context
+
+@contextmanager
+def run_context(ctx: RunContext):
+    """Make `ctx` the current context for code (and copied contexts) run inside the block."""
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(max_delay, base * 2**attempt))."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+_NO_RETRY: Tuple[Type[BaseException], ...] = (CircuitOpenError, DeadlineExceeded, ValueError)
+
+def call_with_retry(fn: Callable, *args, attempts: Optional[int] = None,
+                    no_retry: Tuple[Type[BaseException], ...] = _NO_RETRY, **kwargs):
+    """
+    Call fn(*args, **kwargs), retrying failures with jittered exponential backoff.
+    Every retry is charged to the current run's retry budget, and retries stop early when
+    the budget is spent (the last error is raised) or the next backoff would cross the
+    deadline (DeadlineExceeded is raised, chained to the last error, instead of sleeping).
+    Exceptions in `no_retry` (open circuit, deadline, invalid arguments) are raised immediately.
+    """
+    ctx = current_context()
+    attempts = attempts or ctx.max_attempts
+    last_exc = None
+    for attempt in range(attempts):
+        ctx.check_deadline()
+        try:
+            return fn(*args, **kwargs)
+        except no_retry:
+            raise
+        except Exception as e:
+            last_exc = e
+        if attempt + 1 >= attempts or not ctx.try_consume_retry():
+            break
+        delay = backoff_delay(attempt, ctx.base_delay, ctx.max_delay)
+        left = ctx.remaining()
+        if left is not None and delay >= left:
+            raise DeadlineExceeded('run deadline leaves no time to retry') from last_exc
+        current_span().incr('retries')
+        count('retries')
+        time.sleep(delay)
+    raise last_exc
+
+def with_retry(fn: Callable, attempts: Optional[int] = None) -> Callable:
+    """Wrap fn so every call goes through call_with_retry."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return call_with_retry(fn, *args, attempts=attempts, **kwargs)
+    return wrapper
@@ -0,0 +1,106 @@
+# src/utils/singleflight.py
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.utils.retry import DeadlineExceeded, current_context
+from src.utils.tracing import count
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller (the leader) does the
+    work, callers arriving while it is in flight wait for it and share its result.
+    Nothing is remembered once the call finishes (that is the caches' job).
+    Followers never wait past the current run's deadline.
+
+    Only successful results are shared. A leader's exception may belong to the leader alone
+    (DeadlineExceeded or CircuitOpenError raised under its own run context), so followers of
+    a failed call try again instead of inheriting it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def begin(self, key: Any) -> Tuple[bool, _Call]:
+        """Join or start the call for `key`; returns (is_leader, call)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                count(f'coalesced.{self.name}')
+                return False, call
+            call = _Call()
+            self._calls[key] = call
+            self.calls += 1
+            return True, call
+
+    def finish(self, key: Any, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's outcome and release the key for new calls."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def wait(self, call: _Call) -> None:
+        """Block a follower until the leader finishes (or the run deadline passes)."""
+        if not call.done.wait(current_context().remaining()):
+            raise DeadlineExceeded('run deadline exceeded while waiting for a coalesced call')
+
+    def do(self, key: Any, fn: Callable, *args, copy_result: bool = False, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) once per key among concurrent callers. With copy_result=True
+        followers get a deep copy, so callers that mutate the result cannot affect each other.
+        Followers of a leader that raised rejoin the group: one of them runs fn next and the
+        others wait for it.
+        """
+        while True:
+            leader, call = self.begin(key)
+            if leader:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    self.finish(key, call, error=e)
+                    raise
+                self.finish(key, call, result=result)
+                return result
+            self.wait(call)
+            if call.error is None:
+                return copy.deepcopy(call.result) if copy_result else call.result
+            count(f'coalesced.{self.name}.retried')
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': in_flight}
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+def get_group(name: str) -> SingleFlight:
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Per group ('llm', 'serper', ...): leader calls, coalesced duplicates and calls in flight."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
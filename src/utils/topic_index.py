@@ -0,0 +1,241 @@
+# src/utils/topic_index.py
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+# Defaults can be overridden with environment variables
+_DEFAULT_PATH = os.getenv('TOPIC_INDEX_PATH', 'data/.cache/topic_index.sqlite3')
+_DEFAULT_MAX_ENTRIES = int(os.getenv('TOPIC_INDEX_MAX_ENTRIES', '50000'))
+# Topics at least this similar (cosine, 0..1) to an indexed one reuse its materials
+TOPIC_REUSE_MIN_SIMILARITY = float(os.getenv('TOPIC_REUSE_MIN_SIMILARITY', '0.75'))
+# Indexed materials older than this are not reused (the topic is searched again and re-indexed)
+TOPIC_REUSE_MAX_AGE = float(os.getenv('TOPIC_REUSE_MAX_AGE_SECONDS', str(7 * 24 * 3600)))
+
+# Hashed feature space; changing it re-vectorizes stored topics on load
+_DIM = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    norm TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    materials TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_topics_created_at ON topics(created_at);
+"""
+
+_TOKEN = re.compile(r'[a-z0-9+#]+')
+# words that say nothing about the subject of a topic
+_GENERIC = frozenset('''
+a an and the of for in to with on intro introduction basics beginner beginners tutorial tutorials guide
+'''.split())
+
+def _words(topic: str) -> List[str]:
+    return [w for w in _TOKEN.findall(topic.lower()) if w not in _GENERIC]
+
+def normalize_topic(topic: str) -> str:
+    return ' '.join(_words(topic))
+
+def _numbered(topic: str) -> set:
+    # 'Python 2' and 'Python 3' are close as vectors but not the same topic
+    return {w for w in _words(topic) if any(c.isdigit() for c in w)}
+
+def vectorize(topic: str) -> np.ndarray:
+    """
+    Unit vector of the topic's words and character trigrams, hashed (crc32, signed) into
+    _DIM dimensions. Trigrams make plurals and compounds ('dataframe' vs 'data frame') close.
+    """
+    words = _words(topic)
+    feats = ['w:' + w for w in words]
+    for w in words:
+        padded = f' {w} '
+        feats.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    vec = np.zeros(_DIM, dtype=np.float32)
+    if not feats:
+        return vec
+    h = np.array([zlib.crc32(f.encode('utf-8')) for f in feats], dtype=np.uint64)
+    np.add.at(vec, (h % _DIM).astype(np.intp), np.where((h >> 31) & 1, -1.0, 1.0).astype(np.float32))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+class TopicMatch(NamedTuple):
+    topic: str
+    similarity: float
+    materials: List[Dict[str, Any]]
+
+class TopicIndex:
+    """
+    Persistent nearest-topic index over previously produced learning materials.
+    - rows live in SQLite; vectors are also kept in one in-memory matrix, so a lookup is a
+      single matrix-vector product (a few ms at tens of thousands of topics)
+    - add() upserts one topic without rebuilding; rows added by other processes are picked
+      up on the next lookup
+    - when `max_entries` is exceeded the oldest topics are dropped
+    """
+
+    def __init__(self, path: str = _DEFAULT_PATH, max_entries: int = _DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.executescript(_SCHEMA)
+        self._reset()
+        with self._lock:
+            self._sync()
+
+    def _reset(self) -> None:
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._created = np.zeros(0, dtype=np.float64)
+        self._vectors = np.zeros((0, _DIM), dtype=np.float32)
+        self._rows: Dict[int, int] = {}   # row id -> position in the arrays
+        self._size = 0
+        self._last_id = 0
+
+    def _grow(self, need: int) -> None:
+        if need <= len(self._ids):
+            return
+        cap = max(need, 2 * len(self._ids), 256)
+        self._ids = np.resize(self._ids, cap)
+        self._created = np.resize(self._created, cap)
+        vectors = np.zeros((cap, _DIM), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+
+    def _put(self, row_id: int, topic: str, blob: bytes, created_at: float) -> None:
+        # caller holds the lock
+        vec = np.frombuffer(blob, dtype=np.float32) if len(blob) == 4 * _DIM else vectorize(topic)
+        pos = self._rows.get(row_id)
+        if pos is None:
+            self._grow(self._size + 1)
+            pos = self._rows[row_id] = self._size
+            self._size += 1
+        self._ids[pos] = row_id
+        self._created[pos] = created_at
+        self._vectors[pos] = vec
+        self._last_id = max(self._last_id, row_id)
+
+    def _sync(self) -> None:
+        """Load rows added since the last sync (by this or another process)."""
+        # caller holds the lock
+        rows = self._conn.execute('SELECT id, topic, vector, created_at FROM topics WHERE id > ? ORDER BY id',
+                                  (self._last_id,)).fetchall()
+        for row in rows:
+            self._put(*row)
+
+    def add(self, topic: str, materials: List[Dict[str, Any]]) -> None:
+        """Index (or replace) the materials produced for `topic`."""
+        norm = normalize_topic(topic)
+        if not norm:
+            return
+        now = time.time()
+        vec = vectorize(topic)
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO topics (norm, topic, vector, materials, created_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(norm) DO UPDATE SET topic = excluded.topic, materials = excluded.materials, '
+                'created_at = excluded.created_at',
+                (norm, topic, vec.tobytes(), json.dumps(materials, ensure_ascii=False), now),
+            )
+            row = self._conn.execute('SELECT id FROM topics WHERE norm = ?', (norm,)).fetchone()
+            self._put(row[0], topic, vec.tobytes(), now)
+            self._evict()
+
+    def _evict(self) -> None:
+        # caller holds the lock
+        if self._size <= self.max_entries:
+            return
+        self._conn.execute('DELETE FROM topics WHERE id IN (SELECT id FROM topics ORDER BY created_at ASC LIMIT ?)',
+                           (self._size - self.max_entries,))
+        # rare: rebuild the matrix from what is left
+        self._reset()
+        self._sync()
+
+    def nearest(self, topics: List[str], min_similarity: float = TOPIC_REUSE_MIN_SIMILARITY,
+                max_age: Optional[float] = TOPIC_REUSE_MAX_AGE) -> List[Optional[TopicMatch]]:
+        """
+        Best indexed match per topic: None below min_similarity, older than max_age seconds,
+        or when the words containing digits differ (versions, course numbers).
+        """
+        if not topics:
+            return []
+        queries = np.stack([vectorize(t) for t in topics])
+        with self._lock:
+            self._sync()
+            if self._size == 0:
+                self.misses += len(topics)
+                return [None] * len(topics)
+            sims = queries @ self._vectors[:self._size].T
+            if max_age:
+                sims[:, self._created[:self._size] < time.time() - max_age] = -1.0
+            best = np.argmax(sims, axis=1)
+            out = []
+            for q, pos in enumerate(best):
+                similarity = float(sims[q, pos])
+                row = None
+                if similarity >= min_similarity:
+                    row = self._conn.execute('SELECT topic, materials FROM topics WHERE id = ?',
+                                             (int(self._ids[pos]),)).fetchone()
+                if row is None or _numbered(row[0]) != _numbered(topics[q]):
+                    self.misses += 1
+                    out.append(None)
+                    continue
+                self.hits += 1
+                out.append(TopicMatch(row[0], similarity, json.loads(row[1])))
+            return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'entries': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_index: Optional[TopicIndex] = None
+_index_lock = threading.Lock()
+
+def topic_index_disabled() -> bool:
+    """Set TOPIC_INDEX_DISABLED=1 to never reuse (or record) materials across topics."""
+    return os.getenv('TOPIC_INDEX_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+def get_topic_index() -> Optional[TopicIndex]:
+    """Shared index instance, or None when disabled or the index file cannot be opened."""
+    global _index
+    if topic_index_disabled():
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = TopicIndex()
+                except (sqlite3.Error, OSError):
+                    return None
+    return _index
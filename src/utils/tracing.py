@@ -0,0 +1,210 @@
+# src/utils/tracing.py
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+class Span:
+    """One timed operation; attributes can be added while it is open via set()."""
+
+    __slots__ = ('name', 'start', 'end', 'tid', 'parent', 'attrs', 'error', 'tracer')
+
+    def __init__(self, name: str, parent: Optional['Span'], attrs: Dict[str, Any], tracer: 'Tracer'):
+        self.tracer = tracer
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.tid = threading.get_ident()
+        self.parent = parent
+        self.attrs = attrs
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def incr(self, key: str, n: int = 1) -> None:
+        self.attrs[key] = self.attrs.get(key, 0) + n
+
+class _NoSpan:
+    """Stand-in returned by span() when tracing is off, so callers never need to check."""
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def incr(self, key: str, n: int = 1) -> None:
+        pass
+
+_NO_SPAN = _NoSpan()
+
+def _percentile(data: List[float], q: float) -> float:
+    idx = min(len(data) - 1, max(0, math.ceil(q / 100.0 * len(data)) - 1))
+    return data[idx]
+
+class Tracer:
+    """
+    Collects the spans and counters of one run. Spans nest through a contextvar, so work
+    handed to thread pools with copied contexts (see src/utils/fanout.py, src/pipeline/dag.py)
+    is attributed to the span that started it; spans opened in worker processes are not
+    collected.
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Trace-event JSON for chrome://tracing / Perfetto ('X' complete events, microseconds)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = []
+        for s in spans:
+            args = dict(s.attrs)
+            if s.error:
+                args['error'] = s.error
+            events.append({
+                'name': s.name,
+                'cat': s.name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': round((s.start - self.origin) * 1e6, 1),
+                'dur': round(s.duration * 1e6, 1),
+                'pid': pid,
+                'tid': s.tid,
+                'args': {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v) for k, v in args.items()},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'counters': dict(self.counters)}}
+
+    def write_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per span name: count, errors, total/mean/p50/p95/max seconds, and the sum of every
+        numeric attribute (prompt_chars, response_chars, cache_hit, fallback, retries...)
+        except times such as timeout_s (keys ending in _s).
+        """
+        with self._lock:
+            spans = list(self.spans)
+        groups: Dict[str, List[Span]] = {}
+        for s in spans:
+            groups.setdefault(s.name, []).append(s)
+        out = {}
+        for name, group in groups.items():
+            durs = sorted(s.duration for s in group)
+            row = {
+                'count': len(group),
+                'errors': sum(1 for s in group if s.error),
+                'total_s': round(sum(durs), 3),
+                'mean_s': round(sum(durs) / len(durs), 3),
+                'p50_s': round(_percentile(durs, 50), 3),
+                'p95_s': round(_percentile(durs, 95), 3),
+                'max_s': round(durs[-1], 3),
+            }
+            totals: Dict[str, float] = {}
+            for s in group:
+                for k, v in s.attrs.items():
+                    if isinstance(v, (bool, int, float)) and not k.endswith('_s'):
+                        totals[k] = totals.get(k, 0) + v
+            row['attrs'] = totals
+            out[name] = row
+        return out
+
+    def format_summary(self) -> str:
+        """Summary as a text table, slowest total first."""
+        rows = sorted(self.summary().items(), key=lambda kv: kv[1]['total_s'], reverse=True)
+        lines = [f"{'span':<24}{'count':>7}{'err':>5}{'total s':>10}{'mean s':>9}{'p50 s':>8}{'p95 s':>8}{'max s':>8}  attrs"]
+        for name, r in rows:
+            attrs = ' '.join(f'{k}={v:g}' for k, v in sorted(r['attrs'].items()))
+            lines.append(f"{name:<24}{r['count']:>7}{r['errors']:>5}{r['total_s']:>10.3f}{r['mean_s']:>9.3f}"
+                         f"{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}{r['max_s']:>8.3f}  {attrs}")
+        if self.counters:
+            lines.append('counters: ' + ' '.join(f'{k}={v}' for k, v in sorted(self.counters.items())))
+        return '\n'.join(lines)
+
+_tracer: contextvars.ContextVar = contextvars.ContextVar('tracer', default=None)
+_active_span: contextvars.ContextVar = contextvars.ContextVar('active_span', default=None)
+
+def current_tracer() -> Optional[Tracer]:
+    return _tracer.get()
+
+@contextmanager
+def tracing(tracer: Optional[Tracer] = None):
+    """Collect spans opened inside the block (and in copied contexts) into `tracer`."""
+    tracer = tracer or Tracer()
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Time the block as a span named `name` (dotted, e.g. 'llm.call'; the prefix is the
+    category). Yields the span so callers can add attributes; a no-op outside tracing().
+    Exceptions are recorded on the span and re-raised.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NO_SPAN
+        return
+    s = Span(name, _active_span.get(), attrs, tracer)
+    token = _active_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.end = time.perf_counter()
+        _active_span.reset(token)
+        tracer._finish(s)
+
+def start_span(name: str, **attrs):
+    """
+    Open a span without making it the active one; close it with end_span(). For code that
+    cannot wrap its work in a with-block, such as generators that yield while timed.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        return _NO_SPAN
+    return Span(name, _active_span.get(), attrs, tracer)
+
+def end_span(s, error: Optional[BaseException] = None) -> None:
+    if isinstance(s, _NoSpan) or s.end is not None:
+        return
+    if error is not None:
+        s.error = type(error).__name__
+    s.end = time.perf_counter()
+    s.tracer._finish(s)
+
+def current_span():
+    """The innermost open span, or a no-op stand-in."""
+    return _active_span.get() or _NO_SPAN
+
+def count(name: str, n: int = 1) -> None:
+    """Add to a run-level counter (no-op outside tracing())."""
+    tracer = _tracer.get()
+    if tracer is not None:
+        tracer.count(name, n)
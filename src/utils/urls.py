@@ -0,0 +1,48 @@
+# src/utils/urls.py
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that only track where a click came from
+_TRACKING_PARAMS = frozenset({
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl',
+    'ref_src', 'spm', 'si',
+})
+_DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+def _tracking(name: str) -> bool:
+    name = name.lower()
+    return name.startswith('utm_') or name in _TRACKING_PARAMS
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    Key under which equivalent URLs compare equal: no scheme, lowercase host without
+    'www.' or a default port, no trailing slash, no fragment, tracking parameters dropped
+    and the rest sorted; YouTube videos become youtube.com/watch?v=<id>. Returns None for
+    anything that does not look like an absolute http(s) URL.
+    """
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if scheme not in ('http', 'https') or not host:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    if port is not None and str(port) != _DEFAULT_PORTS[scheme]:
+        host = f'{host}:{port}'
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/')
+    params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _tracking(k)]
+    if host == 'youtu.be' and path:
+        host, params, path = 'youtube.com', params + [('v', path.lstrip('/'))], '/watch'
+    if host in ('m.youtube.com', 'youtube.com') and path == '/watch':
+        # only the video (and playlist) identify a watch page
+        host = 'youtube.com'
+        params = [(k, v) for k, v in params if k in ('v', 'list')]
+    query = urlencode(sorted(params))
+    return f'{host}{path}' + (f'?{query}' if query else '')
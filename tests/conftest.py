@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# tests import the code as `src.…`, like run_pipeline.py and the benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def offline(tmp_path, monkeypatch):
+    """Every test runs in a scratch directory with the persistent caches switched off."""
+    for name in ('LLM_CACHE_DISABLED', 'TOPIC_INDEX_DISABLED', 'QUESTION_BANK_DISABLED', 'SERPER_CACHE_DISABLED'):
+        monkeypatch.setenv(name, '1')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
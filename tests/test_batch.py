@@ -0,0 +1,34 @@
+import json
+
+from benchmarks.fakes import FakeSerperServer
+from src.pipeline.batch import run_batch
+from src.utils import llm, llm_backends
+
+
+def _results(path):
+    with open(path, encoding='utf-8') as f:
+        return {r['id']: r['results'] for r in map(json.loads, f)}
+
+
+def test_jobs_sharing_a_manifest_keep_their_own_checkpoints(tmp_path, monkeypatch):
+    prompts = []
+    llm_backends.register_backend('test-batch', lambda: llm_backends.StubBackend(
+        responder=lambda prompt, model: prompts.append(prompt) or llm_backends._stub_response(prompt)), probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-batch')
+    jobs = tmp_path / 'jobs.jsonl'
+    jobs.write_text('\n'.join(json.dumps(j) for j in [
+        {'id': 'a', 'topics': ['SQL joins'], 'learner': 'ann', 'generate_templates': False},
+        {'id': 'b', 'topics': ['Git rebase'], 'learner': 'bob', 'generate_templates': False},
+        {'id': 'c', 'topics': ['SQL joins'], 'learner': 'bob', 'generate_templates': False},
+    ]) + '\n')
+    manifest = str(tmp_path / 'manifest.jsonl')
+    with FakeSerperServer(latency=0):
+        run_batch(str(jobs), str(tmp_path / 'first.jsonl'), max_in_flight=1, checkpoint_path=manifest, resume=True)
+        assert prompts
+        del prompts[:]
+        run_batch(str(jobs), str(tmp_path / 'resumed.jsonl'), max_in_flight=1, checkpoint_path=manifest, resume=True)
+    # every job's projects and quizzes come from its own checkpoints
+    assert prompts == []
+    first, resumed = _results(tmp_path / 'first.jsonl'), _results(tmp_path / 'resumed.jsonl')
+    assert resumed == first
+    assert 'Git rebase' in resumed['b']['projects'][0]['title']
@@ -0,0 +1,75 @@
+
+import pytest
+
+from benchmarks.fakes import FakeSerperServer
+from src.pipeline.checkpoint import CheckpointManifest
+from src.pipeline.sequential_pipeline import run_pipeline
+from src.utils import extractive, llm
+from src.utils.llm_policy import get_policy, reset_policies
+
+
+def test_later_records_win_and_compact_drops_superseded_lines(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    m = CheckpointManifest(path)
+    for i in range(3):
+        m.put('quizzes', 'SQL', f'h{i}', {'n': i})
+    m.put('projects', 'p', 'hp', ['x'])
+    assert m.get('quizzes', 'SQL', 'h2') == {'n': 2}
+    assert m.get('quizzes', 'SQL', 'h0') is None
+    m.compact()
+    with open(path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 2
+    assert m.get('quizzes', 'SQL', 'h2') == {'n': 2} and m.get('projects', 'p', 'hp') == ['x']
+
+
+def test_half_written_line_is_dropped_on_load(tmp_path):
+    path = str(tmp_path / 'manifest.jsonl')
+    CheckpointManifest(path).put('materials', 'SQL', 'h', [1])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"stage": "materials", "unit": "Git", "ha')
+    m = CheckpointManifest(path)
+    m.put('materials', 'Git', 'h', [2])
+    reloaded = CheckpointManifest(path)
+    assert reloaded.get('materials', 'SQL', 'h') == [1] and reloaded.get('materials', 'Git', 'h') == [2]
+
+
+def test_a_crashed_default_run_can_be_resumed(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'stub')
+    path = str(tmp_path / 'manifest.jsonl')
+
+    def crash(stage, result):
+        if stage == 'quizzes':
+            raise KeyboardInterrupt
+
+    with FakeSerperServer(latency=0) as server:
+        with pytest.raises(KeyboardInterrupt):
+            run_pipeline(['SQL joins'], checkpoint_path=path, generate_templates=False, write_outputs=False,
+                         on_stage=crash)
+        assert len(CheckpointManifest(path)) == 2
+        searched = server.requests
+        manifest = CheckpointManifest(path)
+        run_pipeline(['SQL joins'], manifest=manifest, generate_templates=False, write_outputs=False, resume=True)
+        assert server.requests == searched
+        assert manifest.hits == 2 and len(manifest) == 3
+        # --force recomputes everything and records it again
+        run_pipeline(['SQL joins'], checkpoint_path=path, generate_templates=False, write_outputs=False, force=True)
+        assert server.requests == searched + 1
+    assert len(CheckpointManifest(path)) == 3
+
+
+def test_fallback_outputs_are_not_checkpointed(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'stub')
+    monkeypatch.setattr(extractive, 'SUMMARY_TIER', 'llm')
+    path = str(tmp_path / 'manifest.jsonl')
+    reset_policies()
+    get_policy('llama3.2:3b').breaker._open()
+    try:
+        with FakeSerperServer(latency=0):
+            results = run_pipeline(['SQL joins'], checkpoint_path=path, generate_templates=False,
+                                   write_outputs=False, resume=True, summary_batch_size=1)
+    finally:
+        reset_policies()
+    assert 'placeholder' in results['quizzes'][0]['questions'][0]['question']
+    assert results['materials'] and results['projects']
+    # snippets instead of summaries, placeholder quiz and projects: a resumed run retries all of them
+    assert len(CheckpointManifest(path)) == 0
@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from src.pipeline.dag import Stage, run_stages
+
+
+def _recording(log, name, value=None, fail=False):
+    def fn(deps):
+        log.append(name)
+        if fail:
+            raise RuntimeError(f'{name} failed')
+        return value if value is not None else {'from': name, 'deps': deps}
+    return fn
+
+
+@pytest.mark.parametrize('concurrent', [False, True], ids=['serial', 'concurrent'])
+def test_stages_run_after_their_dependencies(concurrent):
+    log = []
+    stages = [
+        Stage('report', _recording(log, 'report'), deps=['summary', 'quizzes']),
+        Stage('summary', _recording(log, 'summary', value='S'), deps=['materials']),
+        Stage('materials', _recording(log, 'materials', value='M')),
+        Stage('quizzes', _recording(log, 'quizzes', value='Q')),
+    ]
+    finished = []
+    out = run_stages(stages, concurrent=concurrent, on_result=lambda name, result: finished.append(name))
+    assert log.index('materials') < log.index('summary') < log.index('report')
+    assert log.index('quizzes') < log.index('report')
+    assert out['report'] == {'from': 'report', 'deps': {'summary': 'S', 'quizzes': 'Q'}}
+    assert sorted(finished) == sorted(log) and finished[-1] == 'report'
+    assert out['_errors'] == {} and out['_skipped'] == []
+
+
+def test_independent_stages_run_concurrently():
+    # each stage waits for the other one to start: only completes if they overlap
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(deps):
+        barrier.wait()
+        return threading.current_thread().name
+
+    out = run_stages([Stage('a', meet), Stage('b', meet),
+                      Stage('c', lambda deps: sorted(deps.values()), deps=['a', 'b'])])
+    assert out['_errors'] == {}
+    assert out['a'] != out['b'] and out['c'] == sorted([out['a'], out['b']])
+
+
+@pytest.mark.parametrize('concurrent', [False, True], ids=['serial', 'concurrent'])
+def test_failing_stage_is_contained_and_its_dependents_skipped(concurrent):
+    log = []
+    stages = [
+        Stage('projects', _recording(log, 'projects', fail=True)),
+        Stage('templates', _recording(log, 'templates'), deps=['projects']),
+        Stage('readme', _recording(log, 'readme'), deps=['templates']),
+        Stage('quizzes', _recording(log, 'quizzes', value='Q')),
+    ]
+    finished = {}
+    out = run_stages(stages, concurrent=concurrent, on_result=finished.__setitem__)
+    assert sorted(log) == ['projects', 'quizzes']
+    assert out['quizzes'] == 'Q' and out['projects'] is None
+    assert isinstance(out['_errors']['projects'], RuntimeError) and list(out['_errors']) == ['projects']
+    assert sorted(out['_skipped']) == ['readme', 'templates']
+    assert out['templates'] is None and out['readme'] is None
+    assert finished == {'projects': None, 'templates': None, 'readme': None, 'quizzes': 'Q'}
+
+
+@pytest.mark.parametrize('stages, message', [
+    ([Stage('a', len), Stage('a', len)], 'Duplicate'),
+    ([Stage('a', len, deps=['missing'])], 'unknown'),
+    ([Stage('a', len, deps=['b']), Stage('b', len, deps=['a'])], 'cycle'),
+])
+def test_invalid_graphs_are_rejected(stages, message):
+    with pytest.raises(ValueError, match=message):
+        run_stages(stages)
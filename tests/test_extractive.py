@@ -0,0 +1,25 @@
+from src.utils import extractive
+
+SNIPPET = 'Pandas is a Python library for data analysis. It provides DataFrame objects for tabular data.'
+ARTICLE = ' '.join([
+    'Pandas is a Python library for data analysis.',
+    'It provides DataFrame objects for tabular data.',
+    'DataFrames can be filtered, grouped and joined.',
+    'Missing values are handled with fillna and dropna.',
+    'Plotting is built in through matplotlib.',
+])
+
+
+def test_auto_keeps_short_snippets_local():
+    # a snippet no longer than the summary is its own summary
+    assert extractive.try_extractive(SNIPPET, 3, tier='auto') == SNIPPET
+
+
+def test_auto_condenses_texts_with_enough_sentences():
+    summary = extractive.try_extractive(ARTICLE, 3, tier='auto')
+    assert summary is not None and summary != ARTICLE
+    assert len(extractive.split_sentences(summary)) == 3
+
+
+def test_extractive_tier_always_extracts():
+    assert extractive.try_extractive(SNIPPET, 3, tier='extractive') == SNIPPET
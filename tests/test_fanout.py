@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+from src.utils.fanout import fan_out, stream_fan_out
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a child interpreter with a timeout: the failure mode is a hang, not an exception.
+_PIPELINE = """
+import json, sys
+sys.path.insert(0, {root!r})
+from src.pipeline.sequential_pipeline import run_pipeline
+r = run_pipeline(['Topic A', 'Topic B', 'Topic C'], checkpoint_path=None, concurrent=True, pool='process',
+                 topic_workers=2, write_outputs=False, generate_templates=False)
+print(json.dumps([len(q['questions']) for q in r['quizzes']]))
+"""
+
+
+def _square(x):
+    return x * x
+
+
+def test_process_pool_inside_concurrent_pipeline_finishes(tmp_path):
+    env = dict(os.environ, OLLAMA_BACKEND='stub', LLM_CACHE_DISABLED='1', TOPIC_INDEX_DISABLED='1',
+               QUESTION_BANK_DISABLED='1', SERPER_CACHE_DISABLED='1', SERPER_API_KEY='')
+    proc = subprocess.run([sys.executable, '-c', _PIPELINE.format(root=ROOT)], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == [5, 5, 5]
+
+
+def test_process_pool_keeps_input_order():
+    res = fan_out(_square, range(6), workers=3, mode='process')
+    assert [r.value for r in res] == [0, 1, 4, 9, 16, 25]
+    res = stream_fan_out(lambda emit: [emit(i) for i in range(6)], _square, workers=2, mode='process')
+    assert [r.value for r in res] == [0, 1, 4, 9, 16, 25]
@@ -0,0 +1,38 @@
+import threading
+
+from src.service.jobs import CANCELLED, DONE, RUNNING, JobManager
+
+
+def test_cancel_only_wins_while_queued():
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def runner(topics, on_stage):
+        runs.append(topics)
+        started.set()
+        release.wait(5)
+        return {'topics': topics}
+
+    manager = JobManager(runner, workers=1, max_queue=4)
+    manager.start()
+    try:
+        running = manager.submit({'topics': ['a']})
+        queued = manager.submit({'topics': ['b']})
+        assert started.wait(5)
+        assert running.status == RUNNING
+        assert not manager.cancel(running.id)
+        assert manager.cancel(queued.id)
+        assert not manager.cancel(queued.id)
+        release.set()
+        _, finished = running.events_since(0, 5)
+        while not finished:
+            _, finished = running.events_since(0, 5)
+    finally:
+        release.set()
+        manager.stop()
+    assert running.status == DONE and running.result == {'topics': ['a']}
+    assert queued.status == CANCELLED and queued.started_at is None
+    assert runs == [['a']]
+    assert [e['status'] for e in running.events if e['event'] == 'status'] == ['queued', 'running', 'done']
+    assert manager.stats()['completed'] == 1 and manager.stats()['busy'] == 0
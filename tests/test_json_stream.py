@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from src.utils.json_stream import JSONArrayStreamParser, iter_json_array
+
+ITEMS = [
+    {'question': 'What does "]" close?', 'options': ['[', ']', '{', '}'], 'answer_index': 1},
+    {'question': 'Escapes: \\" and \\\\ and é', 'nested': {'list': [1, [2, 3]], 'brace': '}{'}},
+    {'question': 'Last one', 'options': []},
+]
+TEXT = json.dumps(ITEMS)
+
+
+def _parse(chunks):
+    parser = JSONArrayStreamParser()
+    out = []
+    for chunk in chunks:
+        out += parser.feed(chunk)
+    return out, parser
+
+
+def test_every_chunk_boundary_gives_the_same_elements():
+    # splits land inside strings, between a backslash and the character it escapes, and on brackets
+    for cut in range(1, len(TEXT)):
+        assert _parse([TEXT[:cut], TEXT[cut:]])[0] == ITEMS, cut
+    out, parser = _parse(list(TEXT))
+    assert out == ITEMS and parser.done
+
+
+def test_elements_are_returned_as_soon_as_they_close():
+    parser = JSONArrayStreamParser()
+    first_end = TEXT.index('}, {') + 1
+    assert parser.feed(TEXT[:first_end - 1]) == []
+    assert parser.feed(TEXT[first_end - 1:first_end]) == ITEMS[:1]
+    assert not parser.done
+
+
+@pytest.mark.parametrize('preamble', [
+    'Sure, here are your questions:\n',
+    '```json\n',
+    'Here are [3] questions as requested.\n```json\n',
+])
+def test_text_before_the_array_is_skipped(preamble):
+    out, parser = _parse([preamble, TEXT, '\n```\nHope this helps!'])
+    assert out == ITEMS and parser.done
+
+
+def test_malformed_elements_are_skipped():
+    text = '[{"question": "ok 1"}, {"question": oops}, {"question": "ok 2",}, {"question": "ok 3"}]'
+    assert _parse([text])[0] == [{'question': 'ok 1'}, {'question': 'ok 3'}]
+
+
+def test_parsing_stops_at_the_closing_bracket():
+    pulled = []
+
+    def chunks():
+        for chunk in ['[{"a": 1}', ', {"a": 2}]', ' and also [{"a": 3}]', '{"a": 4}']:
+            pulled.append(chunk)
+            yield chunk
+
+    assert list(iter_json_array(chunks())) == [{'a': 1}, {'a': 2}]
+    assert len(pulled) == 2
+
+    out, parser = _parse(['[{"a": 1}] {"a": 2}'])
+    assert out == [{'a': 1}] and parser.done
+    assert parser.feed('[{"a": 3}]') == []
+
+
+def test_empty_array_is_done_without_elements():
+    out, parser = _parse(['Nothing to add: ', '[', ' ]'])
+    assert out == [] and parser.done
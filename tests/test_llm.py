@@ -0,0 +1,116 @@
+import asyncio
+
+from src.utils import extractive, llm, llm_backends
+from src.utils.llm_cache import LLMCache
+from src.utils.llm_policy import (LATENCY_MIN_SAMPLES, TIMEOUT_DEFAULT, TIMEOUT_MAX, TIMEOUT_MIN, TIMEOUT_MULTIPLIER,
+                                  ModelPolicy)
+from src.utils.tracing import tracing
+
+
+def _use_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv('LLM_CACHE_DISABLED')
+    cache = LLMCache(str(tmp_path / 'llm_cache.sqlite3'))
+    monkeypatch.setattr(llm, 'get_llm_cache', lambda: cache)
+    return cache
+
+
+def test_stub_answers_are_not_cached(tmp_path, monkeypatch):
+    cache = _use_cache(monkeypatch, tmp_path)
+    assert llm.call_ollama('Text:\nOne. Two.\n\nSummary:', backend='stub').startswith('Stub summary')
+    assert ''.join(llm.stream_ollama('Text:\nThree. Four.\n\nSummary:', backend='stub'))
+    assert cache.stats()['entries'] == 0
+    assert not llm.answers_cacheable('stub')
+
+
+def test_model_answers_are_cached(tmp_path, monkeypatch):
+    cache = _use_cache(monkeypatch, tmp_path)
+    calls = []
+    llm_backends.register_backend('test-cached', lambda: llm_backends.StubBackend(
+        responder=lambda prompt, model: calls.append(prompt) or 'answer', cacheable=True), probe=False)
+    assert llm.call_ollama('a prompt', backend='test-cached') == 'answer'
+    assert llm.call_ollama('a prompt', backend='test-cached') == 'answer'
+    assert len(calls) == 1 and cache.stats()['entries'] == 1
+
+
+def test_timeouts_are_derived_per_task():
+    policy = ModelPolicy('test-timeouts')
+    for _ in range(LATENCY_MIN_SAMPLES):
+        policy.record_success(1.0, 'summary')
+        policy.record_success(30.0, 'quiz')
+    assert policy.timeout_for(None, 'summary') == max(TIMEOUT_MIN, 1.0 * TIMEOUT_MULTIPLIER)
+    assert policy.timeout_for(None, 'quiz') == min(TIMEOUT_MAX, 30.0 * TIMEOUT_MULTIPLIER)
+    # a task without samples is not timed by the fast summaries
+    assert policy.timeout_for(None, 'projects') == TIMEOUT_DEFAULT
+    assert policy.timeout_for(5.0, 'quiz') == 5.0
+
+
+def test_async_paths_are_traced(monkeypatch):
+    def fail(prompt, model):
+        raise RuntimeError('model crashed')
+
+    llm_backends.register_backend('test-failing', lambda: llm_backends.StubBackend(responder=fail), probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-failing')
+    monkeypatch.setattr(extractive, 'SUMMARY_TIER', 'llm')
+    with tracing() as tracer:
+        out = asyncio.run(llm.safe_summarize_async('Some text. More text.', model='test-async'))
+    assert isinstance(out, llm.FallbackSummary)
+    assert tracer.counters.get('fallback.summary') == 1
+    outer = next(s for s in tracer.spans if s.name == 'llm.call_async')
+    inner = next(s for s in tracer.spans if s.name == 'llm.call')
+    assert inner.parent is outer and 'queued_s' in outer.attrs and outer.error == 'RuntimeError'
+
+
+def test_batch_answer_is_split_on_its_markers():
+    out = (
+        "Sure! Here are the summaries you asked for.\n\n"
+        "**SUMMARY 2:**\nSecond text summarized in a sentence.\n"
+        "> SUMMARY 1\nFirst text summarized in a sentence.\n"
+        "### SUMMARY 1\nA repeated section that must not replace the first one.\n"
+        "### SUMMARY 4\nOut of range for a batch of three texts.\n"
+        "### SUMMARY 3\ntoo short"
+    )
+    assert llm._split_batch_summaries(out, 3) == {
+        0: 'First text summarized in a sentence.',
+        1: 'Second text summarized in a sentence.',
+    }
+    assert llm._split_batch_summaries('No markers at all, just prose.', 2) == {}
+    assert llm._split_batch_summaries('', 2) == {}
+
+
+def test_texts_missing_from_the_batch_answer_are_summarized_one_by_one(monkeypatch):
+    prompts = []
+
+    def respond(prompt, model):
+        prompts.append(prompt)
+        if '### TEXT' in prompt:
+            return ("Here you go:\n### SUMMARY 3\nAbout the third text, briefly.\n"
+                    "### SUMMARY 1\nAbout the first text, briefly.\n")
+        return 'Summarized on its own: ' + prompt.split('Text:\n')[1].split('.')[0]
+
+    llm_backends.register_backend('test-batch', lambda: llm_backends.StubBackend(responder=respond), probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-batch')
+    monkeypatch.setattr(extractive, 'SUMMARY_TIER', 'llm')
+    texts = ['First text. It goes on.', 'Second text. It goes on.', 'Third text. It goes on.']
+    with tracing() as tracer:
+        out = llm.safe_summarize_batch(texts, batch_size=4)
+    assert out == ['About the first text, briefly.', 'Summarized on its own: Second text',
+                   'About the third text, briefly.']
+    assert len(prompts) == 2 and 'TEXT 3' in prompts[0] and 'Second text' in prompts[1]
+    assert tracer.counters.get('summary_batch.split_misses') == 1
+
+
+def test_unsplittable_batch_answer_falls_back_to_single_calls(monkeypatch):
+    prompts = []
+
+    def respond(prompt, model):
+        prompts.append(prompt)
+        return 'One summary for everything, without any markers.' if '### TEXT' in prompt else 'Single summary.'
+
+    llm_backends.register_backend('test-batch-prose', lambda: llm_backends.StubBackend(responder=respond),
+                                  probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-batch-prose')
+    monkeypatch.setattr(extractive, 'SUMMARY_TIER', 'llm')
+    out = llm.safe_summarize_batch(['A text. More.', 'B text. More.', 'C text. More.'], batch_size=2)
+    # one batch of two plus a batch of one (sent as a single call), then both texts of the first batch again
+    assert out == ['Single summary.'] * 3
+    assert len(prompts) == 4 and sum('### TEXT' in p for p in prompts) == 1
@@ -0,0 +1,90 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils import llm_backends
+from src.utils.llm_backends import OllamaHTTPBackend
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._send(200, {'models': []} if self.path == '/api/tags' else {'error': 'not found'})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        self.server.payloads.append(payload)
+        if payload.get('model') == 'missing':
+            self._send(404, {'error': "model 'missing' not found"})
+        elif not payload.get('prompt'):
+            self._send(200, {'done': True})
+        elif payload.get('stream'):
+            lines = [{'response': t, 'done': False} for t in ('Hello', ', ', 'world')] + [{'response': '', 'done': True}]
+            body = b''.join(json.dumps(line).encode('utf-8') + b'\n' for line in lines)
+            self._send(200, body, content_type='application/x-ndjson')
+        else:
+            self._send(200, {'response': ' Hello, world \n', 'done': True})
+
+    def _send(self, status, data, content_type='application/json'):
+        body = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _OllamaHandler)
+    server.daemon_threads = True
+    server.payloads = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OLLAMA_HOST', f'127.0.0.1:{server.server_address[1]}')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate_asks_to_keep_the_model_loaded(ollama):
+    backend = OllamaHTTPBackend()
+    assert backend.probe()
+    assert backend.generate('Say hello', 'llama3.2:3b', 5, options={'temperature': 0}) == 'Hello, world'
+    payload = ollama.payloads[-1]
+    assert payload['keep_alive'] == llm_backends.OLLAMA_KEEP_ALIVE
+    assert payload['stream'] is False and payload['options'] == {'temperature': 0}
+
+
+def test_stream_yields_tokens(ollama):
+    backend = OllamaHTTPBackend()
+    assert list(backend.stream('Say hello', 'llama3.2:3b', 5)) == ['Hello', ', ', 'world']
+    assert ollama.payloads[-1]['stream'] is True
+    assert ollama.payloads[-1]['keep_alive'] == llm_backends.OLLAMA_KEEP_ALIVE
+
+
+def test_preload_keeps_the_model_loaded(ollama):
+    assert OllamaHTTPBackend().preload('llama3.2:3b', timeout=5)
+    assert ollama.payloads[-1] == {'model': 'llama3.2:3b', 'keep_alive': llm_backends.OLLAMA_KEEP_ALIVE}
+
+
+def test_error_status_raises(ollama):
+    backend = OllamaHTTPBackend()
+    with pytest.raises(RuntimeError, match='404'):
+        backend.generate('Say hello', 'missing', 5)
+    with pytest.raises(RuntimeError, match='404'):
+        backend.stream('Say hello', 'missing', 5)
+
+
+def test_unreachable_server_is_a_connection_error(ollama, monkeypatch):
+    monkeypatch.setenv('OLLAMA_HOST', '127.0.0.1:1')
+    backend = OllamaHTTPBackend()
+    assert not backend.probe()
+    with pytest.raises(llm_backends.OllamaConnectionError):
+        backend.generate('Say hello', 'llama3.2:3b', 5)
@@ -0,0 +1,79 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from src.pipeline.outputs import RecordWriter, StageOutput
+
+
+def _tmp_files(directory):
+    return [n for n in os.listdir(directory) if '.tmp-' in n]
+
+
+def test_commit_renames_into_place(tmp_path):
+    path = tmp_path / 'out.ndjson'
+    writer = RecordWriter(str(path), 'ndjson')
+    writer.write({'a': 1})
+    assert not path.exists()
+    assert writer.commit() == str(path)
+    assert path.read_text(encoding='utf-8') == '{"a": 1}\n'
+    assert _tmp_files(tmp_path) == []
+
+
+def test_error_keeps_the_previous_output(tmp_path):
+    path = tmp_path / 'out.json'
+    path.write_text('["old"]\n', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with RecordWriter(str(path), 'json') as writer:
+            writer.write('new')
+            raise RuntimeError('stage failed')
+    assert json.loads(path.read_text(encoding='utf-8')) == ['old']
+    assert _tmp_files(tmp_path) == []
+
+
+@pytest.mark.parametrize('records', [[], [{'a': 1}], [{'a': 1}, {'b': 'ü'}]])
+def test_json_array(tmp_path, records):
+    path = tmp_path / 'out.json'
+    with RecordWriter(str(path), 'json') as writer:
+        for r in records:
+            writer.write(r)
+    assert json.loads(path.read_text(encoding='utf-8')) == records
+    assert writer.count == len(records)
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson'])
+def test_gzip(tmp_path, fmt):
+    path = tmp_path / f'out.{fmt}.gz'
+    records = [{'i': i} for i in range(3)]
+    with RecordWriter(str(path), fmt, compress=True) as writer:
+        for r in records:
+            writer.write(r)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    if fmt == 'json':
+        assert json.loads(text) == records
+    else:
+        assert [json.loads(line) for line in text.splitlines()] == records
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        RecordWriter(str(tmp_path / 'out.csv'), 'csv')
+
+
+def test_stage_output_writes_raw_copy_only_in_debug():
+    with StageOutput('quizzes', fmt='ndjson', compress=False, debug=True) as out:
+        out.write({'topic': 'SQL'})
+    assert out.summary() == {'path': os.path.join('data', 'examples', 'quizzes.ndjson'), 'records': 1}
+    assert os.path.exists(os.path.join('data', 'examples', 'raw', 'quizzes_raw.ndjson'))
+    with StageOutput('projects', fmt='json', compress=False, debug=False) as out:
+        out.write({'title': 'x'})
+    assert not os.path.exists(os.path.join('data', 'examples', 'raw', 'projects_raw.ndjson'))
+
+
+def test_disabled_stage_output_only_counts():
+    with StageOutput('materials', enabled=False) as out:
+        out.write({'title': 'x'})
+    assert out.path is None and out.count == 1
+    assert not os.path.exists(os.path.join('data', 'examples'))
@@ -0,0 +1,20 @@
+import json
+
+from benchmarks.fakes import FakeSerperServer
+from src.pipeline.sequential_pipeline import run_pipeline
+from src.utils import llm
+
+
+def test_streamed_materials_are_searched_together(monkeypatch):
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'stub')
+    topics = [f'Topic {i}' for i in range(10)]
+    with FakeSerperServer(latency=0) as server:
+        results = run_pipeline(topics, generate_templates=False, max_per_topic=2, keep_results=False,
+                               topic_workers=1, output_format='ndjson')
+        # one multi-query request for all ten topics, not one per group of topics
+        assert server.requests == 1
+    assert results['materials'] == []
+    with open(results['outputs']['materials']['path'], encoding='utf-8') as f:
+        titles = [json.loads(line)['title'] for line in f]
+    # written in topic order
+    assert [t.split(' tutorial')[0] for t in titles] == [t for t in topics for _ in range(2)]
@@ -0,0 +1,35 @@
+import os
+
+from src.agents import project_agent
+from src.tools.project_suggester import FallbackProjects
+from src.utils import llm, llm_backends
+from src.utils.llm_policy import get_policy, reset_policies
+
+
+def test_placeholder_projects_are_not_cached(tmp_path, monkeypatch):
+    # a stub that stands in for the real model: its answers may be cached
+    llm_backends.register_backend('test-model', lambda: llm_backends.StubBackend(cacheable=True), probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-model')
+    monkeypatch.setattr(project_agent, '_CACHE_DIR', str(tmp_path))
+    reset_policies()
+    get_policy('test-model').breaker._open()
+    try:
+        projects = project_agent.generate_project_ideas(['Pandas'], n=2, model='test-model')
+    finally:
+        reset_policies()
+    assert isinstance(projects, FallbackProjects) and len(projects) == 2
+    assert not os.listdir(tmp_path)
+
+    # once the model answers again its ideas are served and cached
+    projects = project_agent.generate_project_ideas(['Pandas'], n=2, model='test-model')
+    assert not isinstance(projects, FallbackProjects)
+    assert projects[0].title == 'Stub project 1 on Pandas'
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_stub_projects_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'stub')
+    monkeypatch.setattr(project_agent, '_CACHE_DIR', str(tmp_path))
+    projects = project_agent.generate_project_ideas(['Pandas'], n=2)
+    assert projects[0].title == 'Stub project 1 on Pandas'
+    assert not os.listdir(tmp_path)
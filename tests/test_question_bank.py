@@ -0,0 +1,83 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from src.agents import quiz_agent
+from src.models.quiz_models import MCQ
+from src.tools.question_bank import QuestionBank
+from src.utils import llm, llm_backends
+
+
+def _mcq(question, difficulty='medium'):
+    return MCQ(question=question, options=['a', 'b', 'c', 'd'], answer_index=0, explanation='', difficulty=difficulty)
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / 'bank.sqlite3'))
+    yield bank
+    bank.close()
+
+
+@pytest.fixture
+def model(monkeypatch, bank):
+    """Cacheable stub model answering quiz prompts with fresh questions; records how many each prompt asked for."""
+    asked = []
+
+    def respond(prompt, model):
+        n = int(re.search(r'Create (\d+) multiple-choice', prompt).group(1))
+        start = sum(asked)
+        asked.append(n)
+        return json.dumps([{'question': f'Generated question {start + i}?', 'options': ['a', 'b', 'c', 'd'],
+                            'answer_index': 1, 'explanation': '', 'difficulty': 'medium'} for i in range(n)])
+
+    llm_backends.register_backend('test-quiz', lambda: llm_backends.StubBackend(responder=respond, cacheable=True),
+                                  probe=False)
+    monkeypatch.setattr(llm, 'OLLAMA_BACKEND', 'test-quiz')
+    monkeypatch.setattr(quiz_agent, 'get_question_bank', lambda: bank)
+    return asked
+
+
+def test_sample_skips_questions_the_learner_has_seen(bank):
+    ids = bank.add('Python', [_mcq(f'Question {i}?') for i in range(6)])
+    bank.mark_seen('ada', ids[:4])
+    picked = bank.sample('python', 6, learner='ada')
+    assert sorted(i for i, _ in picked) == sorted(ids[4:])
+    assert len(bank.sample('python', 6)) == 6
+    assert bank.available('Python', learner='ada') == 2
+
+
+def test_sample_filters_on_difficulty(bank):
+    bank.add('Python', [_mcq('Easy one?', 'easy'), _mcq('Hard one?', 'hard'), _mcq('Hard two?', 'hard')])
+    hard = bank.sample('Python', 5, difficulty='hard')
+    assert sorted(m.question for _, m in hard) == ['Hard one?', 'Hard two?']
+    assert [m.question for _, m in bank.sample('Python', 5, difficulty='easy')] == ['Easy one?']
+    assert bank.sample('Python', 5, difficulty='medium') == []
+
+
+@pytest.mark.parametrize('run', [
+    lambda **kw: quiz_agent.generate_quiz_for_topic(**kw),
+    lambda **kw: asyncio.run(quiz_agent.generate_quiz_for_topic_async(**kw)),
+], ids=['sync', 'async'])
+def test_only_the_deficit_is_generated(bank, model, run):
+    bank.add('Python', [_mcq('Banked one?'), _mcq('Banked two?')])
+    quiz = run(topic='Python', n_questions=5, learner='ada')
+    assert model == [3]
+    assert len(quiz.questions) == 5 and not isinstance(quiz, quiz_agent.FallbackQuiz)
+    assert {'Banked one?', 'Banked two?'} <= {q.question for q in quiz.questions}
+    assert bank.stats()['questions'] == 5
+    # ada has now seen all five, so the next quiz is generated in full
+    run(topic='Python', n_questions=5, learner='ada')
+    assert model == [3, 5]
+
+
+def test_add_to_bank_drops_questions_the_bank_already_had(bank):
+    old = bank.add('Python', [_mcq('Already seen?'), _mcq('Already picked?')])
+    bank.mark_seen('ada', old[:1])
+    picked = [(old[1], _mcq('Already picked?'))]
+    new = [_mcq('Already seen?'), _mcq('already  PICKED?'), _mcq('Brand new?'), _mcq('Brand new?')]
+    usable = quiz_agent._add_to_bank(bank, 'Python', picked, new, 'ada')
+    assert [m.question for _, m in usable] == ['Brand new?']
+    assert bank.stats()['questions'] == 3
@@ -0,0 +1,113 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from src.utils import retry
+from src.utils.retry import DeadlineExceeded, RunContext, backoff_delay, call_with_retry, run_context
+
+
+class _Flaky:
+    def __init__(self, failures=None, duration=0.0):
+        self.failures = failures
+        self.duration = duration
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.duration:
+            time.sleep(self.duration)
+        if self.failures is None or self.calls <= self.failures:
+            raise ConnectionError(f'failure {self.calls}')
+        return 'ok'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry.time, 'sleep', slept.append)
+    return slept
+
+
+def test_retry_budget_is_shared_across_calls_and_threads(sleeps):
+    ctx = RunContext(retry_budget=3)
+    first, second = _Flaky(), _Flaky()
+    with run_context(ctx):
+        with pytest.raises(ConnectionError):
+            call_with_retry(first, attempts=5)
+        errors = []
+
+        def other_call():
+            try:
+                call_with_retry(second, attempts=5)
+            except ConnectionError as e:
+                errors.append(e)
+
+        # a worker thread running in a copy of the context draws from the same budget
+        t = threading.Thread(target=contextvars.copy_context().run, args=(other_call,))
+        t.start()
+        t.join(5)
+    assert first.calls == 4 and second.calls == 1 and len(errors) == 1
+    assert ctx.stats()['retries_used'] == 3 and ctx.stats()['retries_denied'] == 2
+    assert len(sleeps) == 3
+
+
+def test_success_after_retries_stays_within_attempts(sleeps):
+    with run_context(RunContext(retry_budget=10)) as ctx:
+        assert call_with_retry(_Flaky(failures=2), attempts=3) == 'ok'
+        with pytest.raises(ConnectionError):
+            call_with_retry(_Flaky(failures=3), attempts=3)
+    assert ctx.retries_used == 4 and len(sleeps) == 4
+
+
+def test_no_retry_errors_are_raised_at_once(sleeps):
+    calls = []
+
+    def invalid():
+        calls.append(True)
+        raise ValueError('bad argument')
+
+    with pytest.raises(ValueError):
+        call_with_retry(invalid, attempts=5)
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_passed_deadline_raises_without_calling():
+    fn = _Flaky(failures=0)
+    with run_context(RunContext(deadline_s=0.01)):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            call_with_retry(fn)
+    assert fn.calls == 0
+
+
+def test_retries_never_sleep_past_the_deadline(monkeypatch):
+    # the 10 s backoff does not fit in what is left: give up now instead of sleeping
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+    fn = _Flaky()
+    t0 = time.monotonic()
+    with run_context(RunContext(deadline_s=0.3, base_delay=10.0, max_delay=10.0)):
+        with pytest.raises(DeadlineExceeded) as exc:
+            call_with_retry(fn, attempts=5)
+    assert isinstance(exc.value.__cause__, ConnectionError)
+    assert fn.calls == 1 and time.monotonic() - t0 < 0.3
+
+    # the deadline passes during an attempt: the next one is not started
+    fn = _Flaky(duration=0.2)
+    with run_context(RunContext(deadline_s=0.3, base_delay=0.001, max_delay=0.001)):
+        with pytest.raises(DeadlineExceeded):
+            call_with_retry(fn, attempts=5)
+    assert fn.calls == 2
+
+
+def test_backoff_is_jittered_and_capped(sleeps, monkeypatch):
+    for attempt in range(12):
+        delays = [backoff_delay(attempt, 0.5, 4.0) for _ in range(200)]
+        assert all(0 <= d <= min(4.0, 0.5 * 2 ** attempt) for d in delays)
+        assert len(set(delays)) > 100
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+    with run_context(RunContext(base_delay=0.5, max_delay=3.0)):
+        with pytest.raises(ConnectionError):
+            call_with_retry(_Flaky(), attempts=6)
+    assert sleeps == [0.5, 1.0, 2.0, 3.0, 3.0]
@@ -0,0 +1,164 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeSerperServer
+from src.tools import serper_tool
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMCache, make_cache_key
+
+
+@pytest.mark.parametrize('status', [400, 422, 200], ids=['bad-request', 'unprocessable', 'unexpected-shape'])
+def test_rejected_batch_falls_back_to_single_queries(status):
+    queries = ['python tutorial', 'sql joins', 'git rebase']
+    with FakeSerperServer(latency=0, reject_batches=status) as server:
+        results = serper_tool.search_serper_batch(queries, api_key='k', max_results=2)
+        assert server.requests == 1 + len(queries)
+        # the endpoint is not cooled down, and later batches go straight to single queries
+        status_now = serper_tool.serper_endpoint_status()
+        assert status_now['endpoints'] == {} and status_now['no_batch'] == [server.url]
+        assert serper_tool.search_serper_batch(['docker volumes'], api_key='k', max_results=2)[0]
+        assert server.requests == 2 + len(queries)
+    assert [r[0]['title'] for r in results] == [f'{q} - result 0' for q in queries]
+
+
+def test_auth_error_fails_the_batch_without_single_queries():
+    with FakeSerperServer(latency=0, reject_batches=401) as server:
+        results = serper_tool.search_serper_batch(['python tutorial', 'sql joins'], api_key='k')
+        assert server.requests == 1
+        assert serper_tool.serper_endpoint_status()['endpoints'][server.url]['failures'] == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+DEAD_URL = 'http://127.0.0.1:1/search'   # connection refused
+
+
+def test_searches_reuse_one_connection():
+    with FakeSerperServer(latency=0) as server:
+        for i in range(5):
+            assert serper_tool.search_serper(f'query {i}', api_key='k', max_results=1)
+        assert server.requests == 5 and server.connections == 1
+
+
+def test_failing_endpoint_is_cooled_down_and_the_answering_one_kept(monkeypatch):
+    with FakeSerperServer(latency=0, extra_urls=[DEAD_URL]) as server:
+        assert serper_tool.search_serper('query 0', api_key='k')
+        status = serper_tool.serper_endpoint_status()
+        assert status['preferred'] == server.url
+        assert status['endpoints'][DEAD_URL]['failures'] == 1 and status['endpoints'][DEAD_URL]['cooldown_s'] > 0
+        assert serper_tool._endpoint_order() == [server.url, DEAD_URL]
+
+        # even once the cooldown is over, the endpoint that answered stays first
+        monkeypatch.setitem(serper_tool._endpoints[DEAD_URL], 'down_until', 0.0)
+        for i in range(1, 4):
+            assert serper_tool.search_serper(f'query {i}', api_key='k')
+        assert serper_tool.serper_endpoint_status()['endpoints'][DEAD_URL]['failures'] == 1
+        assert server.requests == 4 and server.connections == 1
+
+
+def test_cooling_endpoint_is_still_tried_as_a_last_resort():
+    with FakeSerperServer(latency=0) as server:
+        serper_tool.SERPER_SEARCH_URLS = [server.url, DEAD_URL]
+        serper_tool._mark_failed(server.url)
+        assert serper_tool._endpoint_order() == [DEAD_URL, server.url]
+        assert serper_tool.search_serper('query', api_key='k')
+        status = serper_tool.serper_endpoint_status()
+        assert status['preferred'] == server.url and server.url not in status['endpoints']
+        assert status['endpoints'][DEAD_URL]['failures'] == 1
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def search_cache(tmp_path, monkeypatch, clock):
+    """Search cache with a 100 s TTL and 100 s of staleness, on the test's clock."""
+    monkeypatch.setattr(serper_tool, 'SERPER_CACHE_TTL', 100.0)
+    monkeypatch.setattr(serper_tool, 'SERPER_CACHE_STALE', 100.0)
+    cache = LLMCache(str(tmp_path / 'serper_cache.sqlite3'), ttl_seconds=200.0)
+    monkeypatch.setattr(serper_tool, 'get_search_cache', lambda: cache)
+    yield cache
+    cache.close()
+
+
+def _seed(cache, query, title='cached result', max_results=5):
+    key = make_cache_key('serper', serper_tool._normalize_query(query), {'num': max_results})
+    cache.set(key, json.dumps([{'title': title, 'link': 'https://example.org', 'snippet': '', 'source': None}]))
+    return key
+
+
+def _wait_for_refreshes():
+    deadline = time.monotonic() + 5
+    while serper_tool._refreshing:
+        assert time.monotonic() < deadline, 'background refresh never finished'
+        time.sleep(0.01)
+
+
+def test_fresh_entry_is_served_without_a_request(search_cache, clock):
+    with FakeSerperServer(latency=0) as server:
+        _seed(search_cache, 'python tutorial')
+        clock.now += 99
+        assert serper_tool.search_serper('Python  Tutorial', api_key='k')[0]['title'] == 'cached result'
+        assert serper_tool.search_serper_batch(['python tutorial'], api_key='k')[0][0]['title'] == 'cached result'
+        assert server.requests == 0 and not serper_tool._refreshing
+
+
+def test_stale_entry_is_served_while_it_is_refreshed(search_cache, clock):
+    with FakeSerperServer(latency=0.3) as server:
+        key = _seed(search_cache, 'python tutorial')
+        clock.now += 150
+        t0 = time.monotonic()
+        results = serper_tool.search_serper('python tutorial', api_key='k')
+        assert time.monotonic() - t0 < 0.2 and results[0]['title'] == 'cached result'
+        # a second caller meanwhile gets the stale entry too, without a second refresh
+        assert serper_tool.search_serper_batch(['python tutorial'], api_key='k')[0][0]['title'] == 'cached result'
+        _wait_for_refreshes()
+        assert server.requests == 1
+    value, age = search_cache.get_entry(key)
+    assert age == 0 and json.loads(value)[0]['title'] == 'python tutorial - result 0'
+
+
+def test_stale_entry_is_not_served_when_disallowed(search_cache, clock):
+    with FakeSerperServer(latency=0) as server:
+        _seed(search_cache, 'python tutorial')
+        clock.now += 150
+        results = serper_tool.search_serper('python tutorial', api_key='k', allow_stale=False)
+        assert results[0]['title'] == 'python tutorial - result 0'
+        assert server.requests == 1 and not serper_tool._refreshing
+
+
+def test_expired_entry_is_searched_again(search_cache, clock):
+    with FakeSerperServer(latency=0) as server:
+        key = _seed(search_cache, 'python tutorial')
+        clock.now += 201
+        assert search_cache.get_entry(key) is None
+        assert serper_tool.search_serper('python tutorial', api_key='k')[0]['title'] == 'python tutorial - result 0'
+        assert server.requests == 1 and not serper_tool._refreshing
+    assert search_cache.get_entry(key)[1] == 0
+
+
+def test_failed_refresh_keeps_the_stale_entry(search_cache, clock, monkeypatch):
+    monkeypatch.setattr(serper_tool, 'SERPER_SEARCH_URLS', [DEAD_URL])
+    serper_tool.reset_serper_endpoints()
+    key = _seed(search_cache, 'python tutorial')
+    clock.now += 150
+    for _ in range(2):
+        assert serper_tool.search_serper('python tutorial', api_key='k')[0]['title'] == 'cached result'
+        _wait_for_refreshes()
+    value, age = search_cache.get_entry(key)
+    assert age == 150 and json.loads(value)[0]['title'] == 'cached result'
+    assert serper_tool.serper_endpoint_status()['endpoints'][DEAD_URL]['failures'] == 2
+    serper_tool.reset_serper_endpoints()
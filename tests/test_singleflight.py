@@ -0,0 +1,65 @@
+import threading
+import time
+
+from benchmarks.fakes import FakeSerperServer
+from src.tools import serper_tool
+from src.utils.retry import DeadlineExceeded
+from src.utils.singleflight import SingleFlight, get_group
+
+
+def _wait_for_follower(group: SingleFlight, n: int = 1) -> None:
+    deadline = time.monotonic() + 5
+    while group.coalesced < n:
+        assert time.monotonic() < deadline, 'follower never joined'
+        time.sleep(0.005)
+
+
+def test_follower_retries_after_leader_deadline():
+    group = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(True)
+        if len(calls) == 1:
+            release.wait(5)
+            raise DeadlineExceeded('leader ran out of time')
+        return 'answer'
+
+    errors = []
+
+    def leader():
+        try:
+            group.do('key', work)
+        except DeadlineExceeded as e:
+            errors.append(e)
+
+    t = threading.Thread(target=leader)
+    t.start()
+    while not calls:
+        time.sleep(0.005)
+    out = []
+    follower = threading.Thread(target=lambda: out.append(group.do('key', work)))
+    follower.start()
+    _wait_for_follower(group)
+    release.set()
+    t.join(5)
+    follower.join(5)
+    assert len(errors) == 1
+    assert out == ['answer'] and len(calls) == 2
+
+
+def test_batch_search_joins_an_in_flight_search():
+    group = get_group('serper')
+    before = group.coalesced
+    with FakeSerperServer(latency=0.3) as server:
+        single = []
+        t = threading.Thread(target=lambda: single.append(serper_tool.search_serper('python tutorial', api_key='k')))
+        t.start()
+        while group.stats()['in_flight'] == 0:
+            time.sleep(0.005)
+        batch = serper_tool.search_serper_batch(['Python  tutorial'], api_key='k')
+        t.join(5)
+        assert server.requests == 1
+    assert group.coalesced == before + 1
+    assert batch == single and batch[0] is not single[0]
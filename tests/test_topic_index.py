@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from src.utils import topic_index
+from src.utils.topic_index import TopicIndex
+
+
+def _unit(**components):
+    """Vector with the given components on the first axes (a=0, b=1, ...), normalized."""
+    vec = np.zeros(topic_index._DIM, dtype=np.float32)
+    for axis, value in components.items():
+        vec[ord(axis) - ord('a')] = value
+    return vec / np.linalg.norm(vec)
+
+
+VECTORS = {
+    'pandas': _unit(a=1.0),
+    'pandas dataframes': _unit(a=0.75, b=np.sqrt(1 - 0.75 ** 2)),   # cosine 0.75 to 'pandas'
+    'pandas plotting': _unit(a=0.9, c=np.sqrt(1 - 0.9 ** 2)),       # cosine 0.9 to 'pandas'
+    'sql joins': _unit(d=1.0),
+    'docker': _unit(e=1.0),
+    'python 2': _unit(f=1.0),
+    'python 3': _unit(f=1.0),
+}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fixed_vectors(monkeypatch):
+    monkeypatch.setattr(topic_index, 'vectorize', lambda topic: VECTORS[topic.lower()])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(topic_index, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def index(tmp_path, clock):
+    index = TopicIndex(str(tmp_path / 'topics.sqlite3'))
+    yield index
+    index.close()
+
+
+def _materials(topic):
+    return [{'topic': topic, 'title': f'{topic} guide'}]
+
+
+def test_match_at_the_threshold_is_reused(index):
+    index.add('Pandas', _materials('Pandas'))
+    match, = index.nearest(['Pandas dataframes'], min_similarity=0.75)
+    assert match.topic == 'Pandas' and match.similarity == pytest.approx(0.75)
+    assert match.materials == _materials('Pandas')
+    assert index.nearest(['Pandas dataframes'], min_similarity=0.76) == [None]
+
+
+def test_nearest_of_several_topics_wins(index):
+    index.add('Pandas plotting', _materials('Pandas plotting'))
+    index.add('Pandas dataframes', _materials('Pandas dataframes'))
+    index.add('SQL joins', _materials('SQL joins'))
+    pandas, sql = index.nearest(['Pandas', 'SQL joins'], min_similarity=0.7)
+    assert pandas.topic == 'Pandas plotting' and pandas.similarity == pytest.approx(0.9)
+    assert sql.topic == 'SQL joins' and sql.similarity == pytest.approx(1.0)
+    assert index.stats()['hits'] == 2
+
+
+def test_no_match(index, clock):
+    assert index.nearest(['Pandas']) == [None]
+    index.add('Pandas', _materials('Pandas'))
+    index.add('Python 3', _materials('Python 3'))
+    # unrelated topic, same vector but a different version, and a match that is too old
+    assert index.nearest(['Docker', 'Python 2']) == [None, None]
+    clock.now += 100
+    assert index.nearest(['Pandas'], max_age=50) == [None]
+    assert index.nearest(['Pandas'], max_age=200)[0].topic == 'Pandas'
+    assert index.stats()['misses'] == 4
+
+
+def test_oldest_topics_are_evicted(tmp_path, clock):
+    index = TopicIndex(str(tmp_path / 'topics.sqlite3'), max_entries=3)
+    for topic in ['Pandas', 'SQL joins', 'Docker']:
+        index.add(topic, _materials(topic))
+        clock.now += 1
+    # re-adding a topic refreshes it, so 'SQL joins' is now the oldest
+    index.add('Pandas', _materials('Pandas v2'))
+    clock.now += 1
+    index.add('Python 3', _materials('Python 3'))
+    assert len(index) == 3
+    assert index.nearest(['SQL joins']) == [None]
+    assert [m.topic for m in index.nearest(['Pandas', 'Docker', 'Python 3'])] == ['Pandas', 'Docker', 'Python 3']
+    assert index.nearest(['Pandas'])[0].materials == _materials('Pandas v2')
+    index.close()
+    reopened = TopicIndex(str(tmp_path / 'topics.sqlite3'), max_entries=3)
+    assert len(reopened) == 3 and reopened.nearest(['SQL joins']) == [None]
+    reopened.close()
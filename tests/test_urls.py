@@ -0,0 +1,41 @@
+import pytest
+
+from src.utils.urls import canonical_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    # scheme and host case, www.
+    ('HTTPS://Example.COM/Docs/Intro', 'example.com/Docs/Intro'),
+    ('http://www.example.com/docs', 'example.com/docs'),
+    ('https://example.com/docs', 'example.com/docs'),
+    # default ports are dropped, others kept
+    ('http://example.com:80/docs', 'example.com/docs'),
+    ('https://example.com:443/docs', 'example.com/docs'),
+    ('https://example.com:8443/docs', 'example.com:8443/docs'),
+    ('http://example.com:443/docs', 'example.com:443/docs'),
+    # tracking parameters
+    ('https://example.com/docs?utm_source=x&UTM_Medium=y&gclid=1&fbclid=2', 'example.com/docs'),
+    ('https://example.com/docs?page=2&utm_campaign=z&ref_src=tw', 'example.com/docs?page=2'),
+    # fragment
+    ('https://example.com/docs#section-2', 'example.com/docs'),
+    ('https://example.com/docs?page=2#top', 'example.com/docs?page=2'),
+    # trailing and repeated slashes
+    ('https://example.com/docs/', 'example.com/docs'),
+    ('https://example.com/', 'example.com'),
+    ('https://example.com//docs//intro/', 'example.com/docs/intro'),
+    # query order, blank values kept
+    ('https://example.com/search?q=pandas&lang=en', 'example.com/search?lang=en&q=pandas'),
+    ('https://example.com/search?lang=en&q=pandas', 'example.com/search?lang=en&q=pandas'),
+    ('https://example.com/search?b=&a=1', 'example.com/search?a=1&b='),
+    # YouTube watch pages
+    ('https://youtu.be/abc123?t=42', 'youtube.com/watch?v=abc123'),
+    ('https://m.youtube.com/watch?v=abc123&feature=share&list=PL1', 'youtube.com/watch?list=PL1&v=abc123'),
+    # not absolute http(s) URLs
+    (None, None),
+    ('', None),
+    ('ftp://example.com/file', None),
+    ('/relative/path', None),
+    ('https://example.com:99999/docs', None),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected